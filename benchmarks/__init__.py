@@ -0,0 +1,2 @@
+# Benchmarks for the greet language server.  Run them from the project root,
+# e.g. `python -m benchmarks.bench_lark`.
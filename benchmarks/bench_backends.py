@@ -0,0 +1,91 @@
+"""Runs every parser backend over the same generated corpus.
+
+   The corpus is split into documents of --doc-lines lines.  For each backend
+   this reports throughput, the latency of parsing one document (diagnostics and
+   statements) at several percentiles, and the peak memory allocated parsing the
+   whole corpus as a single document.  Peak memory comes from tracemalloc, so it
+   only covers Python allocations: tree-sitter's own C allocations aren't counted.
+
+   Correctness is measured against the corpus itself: the lines each backend
+   reports as errors are compared with the lines that really are malformed.
+
+   Usage: python -m benchmarks.bench_backends [--lines N] [--doc-lines N] [--backends ...]
+"""
+import argparse
+import re
+import statistics
+import time
+import tracemalloc
+from typing import List, Set
+
+from server.backends import BACKENDS, get_backend
+
+from .corpus import generate_lines
+
+# What a valid line of the generated corpus looks like
+_VALID_LINE = re.compile(r"\s*(name:\s*[A-Za-z]+|(Hello|Goodbye)\s+[A-Za-z]+)?\s*$")
+
+
+def _malformed_lines(lines: List[str]) -> Set[int]:
+    return {i for i, line in enumerate(lines) if _VALID_LINE.fullmatch(line) is None}
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _peak_bytes(fn, *args) -> int:
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=100_000)
+    arg_parser.add_argument("--doc-lines", type=int, default=200)
+    arg_parser.add_argument("--error-density", type=float, default=0.05)
+    arg_parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = arg_parser.parse_args()
+
+    lines = generate_lines(args.lines, args.error_density)
+    documents = ["\n".join(lines[i:i + args.doc_lines]) + "\n"
+                 for i in range(0, len(lines), args.doc_lines)]
+    whole = "\n".join(lines) + "\n"
+    malformed = _malformed_lines(lines)
+
+    print(f"{args.lines:,} lines in {len(documents):,} documents of {args.doc_lines} lines, "
+          f"{len(malformed):,} malformed")
+    print(f"{'backend':<12} {'lines/s':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'peak MiB':>9} {'found':>7} {'missed':>7} {'false':>7}")
+
+    for name in args.backends:
+        backend = get_backend(name)
+        # Warm up: loads grammars and parse tables
+        backend.parse(documents[0])
+
+        latencies: List[float] = []
+        reported: Set[int] = set()
+        for doc_num, document in enumerate(documents):
+            start = time.perf_counter()
+            result = backend.parse(document)
+            latencies.append(time.perf_counter() - start)
+            first_line = doc_num * args.doc_lines
+            reported.update(first_line + d.range.start.line for d in result.diagnostics)
+
+        peak = _peak_bytes(backend.parse, whole)
+        print(f"{name:<12} {args.lines / sum(latencies):>10,.0f} "
+              f"{statistics.median(latencies) * 1000:>8.2f} "
+              f"{_percentile(latencies, 90) * 1000:>8.2f} "
+              f"{_percentile(latencies, 99) * 1000:>8.2f} "
+              f"{max(latencies) * 1000:>8.2f} "
+              f"{peak / (1024 * 1024):>9.1f} "
+              f"{len(reported & malformed):>7,} {len(malformed - reported):>7,} {len(reported - malformed):>7,}")
+
+
+if __name__ == "__main__":
+    main()
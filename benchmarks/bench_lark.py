@@ -0,0 +1,59 @@
+"""Compares the throughput of lark's Earley and LALR parsers on generated greet sources.
+
+   Usage: python -m benchmarks.bench_lark [--lines 1000 10000 ...] [--repeat N]
+"""
+import argparse
+import time
+
+from lark import Lark
+
+from server import lark_parser
+
+from .corpus import generate
+
+
+def _best_of(repeat: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _build(algorithm: str) -> None:
+    lark_parser._parsers.pop(algorithm, None)
+    lark_parser.get_parser(algorithm)
+
+
+def _build_uncached() -> None:
+    Lark(lark_parser.grammar, start="start", parser="lalr", lexer="contextual")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    algorithms = [lark_parser.EARLEY, lark_parser.LALR]
+
+    print(f"{'build':<16} {'ms':>8}")
+    # Build once first so the LALR on-disk cache is warm, as it is on a normal start
+    for algorithm in algorithms:
+        _build(algorithm)
+    for algorithm in algorithms:
+        print(f"{algorithm:<16} {_best_of(args.repeat, _build, algorithm) * 1000:>8.1f}")
+    print(f"{'lalr (no cache)':<16} {_best_of(args.repeat, _build_uncached) * 1000:>8.1f}")
+    print()
+
+    print(f"{'lines':>10} {'algorithm':<10} {'seconds':>10} {'lines/s':>12}")
+    for lines in args.lines:
+        source = generate(lines)
+        for algorithm in algorithms:
+            seconds = _best_of(args.repeat, lark_parser.parse, source, algorithm)
+            print(f"{lines:>10} {algorithm:<10} {seconds:>10.3f} {lines / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compares the single-pass scanner in server/parser.py with regex-per-line validation.
+
+   The regex-per-line baseline is the server's own `_parse_greet`.  Also reports
+   the memory held by the compact token arrays against one Token object per token.
+
+   Usage: python -m benchmarks.bench_parser [--lines 10000 100000 ...] [--repeat N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from server import parser as greet_parser
+from server import server
+
+from .corpus import generate
+
+
+def _best_of(repeat: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_bytes(fn, *args) -> int:
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, nargs="+", default=[10_000, 100_000])
+    arg_parser.add_argument("--error-density", type=float, default=0.05)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    candidates = {
+        "regex per line": server._parse_greet,
+        "scan only": greet_parser._scan,
+        "scan + parse": greet_parser.parse,
+    }
+
+    print(f"{'lines':>10} {'approach':<16} {'seconds':>10} {'lines/s':>12}")
+    for lines in args.lines:
+        source = generate(lines, args.error_density)
+        for name, fn in candidates.items():
+            seconds = _best_of(args.repeat, fn, source)
+            print(f"{lines:>10} {name:<16} {seconds:>10.3f} {lines / seconds:>12,.0f}")
+
+    source = generate(args.lines[0], args.error_density)
+    arrays = _peak_bytes(greet_parser._scan, source)
+    objects = _peak_bytes(lambda s: list(greet_parser._scan(s)), source)
+    print()
+    print(f"token storage for {args.lines[0]} lines: arrays {arrays / 1024:,.0f} KiB, "
+          f"Token objects {objects / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
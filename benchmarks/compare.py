@@ -0,0 +1,51 @@
+"""Compares two benchmark suite result files and flags regressions.
+
+   A benchmark regresses if its median time in the new results exceeds the old
+   by more than --threshold (a fraction).  Exits with status 1 if any did.
+
+   Usage: python -m benchmarks.compare OLD.json NEW.json [--threshold 0.1]
+"""
+import argparse
+import json
+import sys
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("old")
+    arg_parser.add_argument("new")
+    arg_parser.add_argument("--threshold", type=float, default=0.1)
+    args = arg_parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'benchmark':<32} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    regressions = 0
+    for name in sorted(old["results"].keys() | new["results"].keys()):
+        before = old["results"].get(name, {}).get("median_ms")
+        after = new["results"].get(name, {}).get("median_ms")
+        if before is None or after is None:
+            print(f"{name:<32} {_ms(before):>10} {_ms(after):>10}")
+            continue
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<32} {before:>10.3f} {after:>10.3f} {change:>+8.0%}{flag}")
+
+    if regressions:
+        print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Deterministic generator for synthetic .greet corpora used by the benchmarks.
+
+   Usage: python -m benchmarks.corpus --lines N [--error-density D] [--seed S] [-o FILE]
+"""
+import argparse
+import random
+import sys
+from typing import List
+
+NAMES = ["Daljit", "Petunia", "Brenda", "Bob", "Linda", "Thelma", "Louise",
+         "Esmerelda", "Bobby", "Francesca", "Frederic", "Benny"]
+
+SALUTATIONS = ["Hello", "Goodbye"]
+
+# Lines the greet server rejects, in the style of real typos
+MALFORMED = ["Wotcha {name}", "Hello {name}24", "hello {name}", "name {name}",
+             "Goodbye {name} again", "Hello"]
+
+
+def generate_lines(lines: int, error_density: float = 0.0, seed: int = 0,
+                   declarations: bool = True) -> List[str]:
+    """Generates `lines` lines of greet source.
+
+       Roughly one line in ten declares a name (if `declarations` is set), the rest
+       greet a declared name.  `error_density` is the fraction of lines replaced by
+       a malformed statement.  The same arguments always produce the same output.
+    """
+    rng = random.Random(seed)
+    names = list(NAMES)
+    result: List[str] = []
+
+    for line_num in range(lines):
+        if error_density and rng.random() < error_density:
+            result.append(rng.choice(MALFORMED).format(name=rng.choice(names)))
+        elif declarations and line_num % 10 == 0:
+            name = f"{rng.choice(NAMES)}{_suffix(line_num)}"
+            names.append(name)
+            result.append(f"name: {name}")
+        else:
+            result.append(f"{rng.choice(SALUTATIONS)} {rng.choice(names)}")
+
+    return result
+
+
+def generate(lines: int, error_density: float = 0.0, seed: int = 0,
+             declarations: bool = True) -> str:
+    "Generates greet source as a single string; see generate_lines"
+    return "\n".join(generate_lines(lines, error_density, seed, declarations)) + "\n"
+
+
+def _suffix(n: int) -> str:
+    "a letters-only suffix so generated names stay valid and distinct"
+    letters = []
+    while True:
+        n, r = divmod(n, 26)
+        letters.append(chr(ord("a") + r))
+        if n == 0:
+            return "".join(reversed(letters))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, required=True)
+    arg_parser.add_argument("--error-density", type=float, default=0.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--no-declarations", action="store_true")
+    arg_parser.add_argument("-o", "--output", help="file to write (default: standard output)")
+    args = arg_parser.parse_args()
+
+    source = generate(args.lines, args.error_density, args.seed, not args.no_declarations)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+
+
+if __name__ == "__main__":
+    main()
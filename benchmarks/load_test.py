@@ -0,0 +1,233 @@
+"""Load test for one server process serving many clients over TCP.
+
+   Starts `python -m server --tcp` on a workspace of generated files and connects
+   --clients simulated editors to it at once.  Each opens a document of its own,
+   not saved to disk, that declares a name no other client's does; then --rounds
+   times it edits the document and asks for completions and definitions.  Reported:
+
+   - latency: median, 95th percentile and worst round trip of each kind of
+     request, over all the clients
+   - throughput: requests answered per second, all the clients together
+   - memory: the server's resident set size with every client connected (Linux only)
+
+   Each client also checks that it sees the names declared on disk and its own
+   unsaved name, but no other client's.  The process exits with status 1 if any
+   check fails.
+
+   Usage: python -m benchmarks.load_test [--clients N] [--rounds N] [--files N] [--lines N]
+"""
+import argparse
+import os
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+from pygls.uris import from_fs_path
+
+from .corpus import generate_lines
+from .lsp_client import ROOT, TcpLspClient
+
+HOST = "127.0.0.1"
+
+# How long a client waits for the workspace to be indexed before giving up
+INDEX_TIMEOUT_IN_SECONDS = 30
+
+
+class ClientResult(NamedTuple):
+    # kind of request -> seconds each took
+    latencies: Dict[str, List[float]]
+    # checks that failed
+    problems: List[str]
+
+
+class LoadResult(NamedTuple):
+    latencies: Dict[str, List[float]]
+    problems: List[str]
+    seconds: float
+    # the server's resident set size with every client connected; None if unknown
+    rss_bytes: int | None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def client_name(client: int) -> str:
+    "a name for the client to declare: greet names are letters only"
+    letters = ""
+    while True:
+        client, digit = divmod(client, 26)
+        letters = string.ascii_lowercase[digit] + letters
+        if client == 0:
+            return f"Client{letters}"
+
+
+def make_workspace(workdir: str, files: int, lines: int) -> List[str]:
+    "writes files .greet files of lines lines each to workdir, returning the names they declare"
+    declared = []
+    for i in range(files):
+        source = generate_lines(lines, seed=i)
+        declared += [line[len("name: "):] for line in source if line.startswith("name: ")]
+        with open(os.path.join(workdir, f"file{i}.greet"), "w") as f:
+            f.write("\n".join(source) + "\n")
+    return declared
+
+
+def _rss_bytes(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _labels(completion: dict) -> List[str]:
+    return [item["label"] for item in completion["items"]]
+
+
+def run_client(client: int, port: int, workdir: str, rounds: int, disk_name: str,
+               connected: threading.Barrier) -> ClientResult:
+    latencies: Dict[str, List[float]] = {}
+    problems: List[str] = []
+
+    def timed(kind: str, fn):
+        start = time.perf_counter()
+        result = fn()
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        return result
+
+    name = client_name(client)
+    uri = from_fs_path(os.path.join(workdir, f"unsaved{client}.greet"))
+    lines = [f"name: {name}"]
+    lsp = TcpLspClient(HOST, port)
+    try:
+        timed("initialize", lambda: lsp.initialize(from_fs_path(workdir)))
+
+        def open_document():
+            lsp.notify("textDocument/didOpen", {"textDocument": {
+                "uri": uri, "languageId": "greet", "version": 1, "text": "\n".join(lines) + "\n"}})
+            lsp.wait_for(lambda m: m.get("method") == "textDocument/publishDiagnostics"
+                         and m["params"]["uri"] == uri)
+        timed("open", open_document)
+        connected.wait()
+
+        for version in range(2, rounds + 2):
+            lines.append(f"Hello {name}")
+            lsp.notify("textDocument/didChange", {
+                "textDocument": {"uri": uri, "version": version},
+                "contentChanges": [{"text": "\n".join(lines) + "\n"}]})
+            position = {"line": len(lines) - 1, "character": len("Hello Cl")}
+            completion = timed("completion", lambda: lsp.request("textDocument/completion", {
+                "textDocument": {"uri": uri}, "position": position}))
+            others = [label for label in _labels(completion) if label.startswith("Client") and label != name]
+            if name not in _labels(completion) or others:
+                problems.append(f"{name} completed {_labels(completion)}")
+            definition = timed("definition", lambda: lsp.request("textDocument/definition", {
+                "textDocument": {"uri": uri}, "position": position}))
+            if [link["targetUri"] for link in definition or []] != [uri]:
+                problems.append(f"{name} found its definition at {definition}")
+
+        # The workspace is indexed in the background, so may not be done yet
+        lines.append(f"Hello {disk_name}")
+        lsp.notify("textDocument/didChange", {
+            "textDocument": {"uri": uri, "version": rounds + 2},
+            "contentChanges": [{"text": "\n".join(lines) + "\n"}]})
+        position = {"line": len(lines) - 1, "character": len(lines[-1])}
+        deadline = time.monotonic() + INDEX_TIMEOUT_IN_SECONDS
+        while disk_name not in _labels(timed("completion", lambda: lsp.request("textDocument/completion", {
+                "textDocument": {"uri": uri}, "position": position}))):
+            if time.monotonic() > deadline:
+                problems.append(f"{name} never saw {disk_name}, declared on disk")
+                break
+            time.sleep(0.1)
+    finally:
+        lsp.close()
+    return ClientResult(latencies, problems)
+
+
+def run_load_test(clients: int, rounds: int, files: int, lines: int,
+                  server_args: List[str] = ()) -> LoadResult:
+    with tempfile.TemporaryDirectory() as workdir:
+        disk_name = make_workspace(workdir, files, lines)[0]
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "server", "--tcp", "--host", HOST,
+                                   "--port", str(port), "--no-cache", *server_args],
+                                  cwd=workdir, env=dict(os.environ, PYTHONPATH=ROOT),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        rss: List[int | None] = [None]
+        # Every client has connected and opened its document
+        connected = threading.Barrier(clients, action=lambda: rss.__setitem__(0, _rss_bytes(server.pid)))
+        results: List[ClientResult] = []
+        threads = []
+
+        def run(client: int):
+            try:
+                results.append(run_client(client, port, workdir, rounds, disk_name, connected))
+            except Exception as e:
+                connected.abort()
+                results.append(ClientResult({}, [f"{client_name(client)} failed: {e!r}"]))
+
+        start = time.perf_counter()
+        try:
+            for client in range(clients):
+                thread = threading.Thread(target=run, args=(client,))
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+        seconds = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = {}
+    problems: List[str] = []
+    for result in results:
+        for kind, samples in result.latencies.items():
+            latencies.setdefault(kind, []).extend(samples)
+        problems += result.problems
+    return LoadResult(latencies, problems, seconds, rss[0])
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--clients", type=int, default=20)
+    arg_parser.add_argument("--rounds", type=int, default=50, help="edits, completions and definitions per client")
+    arg_parser.add_argument("--files", type=int, default=100, help="files in the workspace")
+    arg_parser.add_argument("--lines", type=int, default=200, help="lines per file")
+    args = arg_parser.parse_args()
+
+    result = run_load_test(args.clients, args.rounds, args.files, args.lines)
+
+    print(f"{'request':<12} {'count':>7} {'median ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for kind, samples in result.latencies.items():
+        print(f"{kind:<12} {len(samples):>7} {_percentile(samples, 0.5) * 1000:>10.2f} "
+              f"{_percentile(samples, 0.95) * 1000:>10.2f} {max(samples) * 1000:>10.2f}")
+    requests = sum(len(samples) for samples in result.latencies.values())
+    print(f"\n{args.clients} clients, {requests} requests in {result.seconds:.2f}s "
+          f"({requests / result.seconds:,.0f} requests/s)")
+    if result.rss_bytes is not None:
+        print(f"server memory with every client connected: {result.rss_bytes / 2**20:.1f} MiB")
+    for problem in result.problems:
+        print(problem)
+    if result.problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""A minimal, blocking LSP client for driving `python -m server` over stdio or TCP in benchmarks."""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Message = Dict[str, Any]
+
+
+class LspClient:
+    """Starts the server as a subprocess and exchanges JSON-RPC messages with it.
+
+       Requests the server sends to the client (e.g. to create a progress token)
+       are answered with a null result; other notifications are discarded unless
+       something is waiting for them.
+    """
+
+    def __init__(self, server_args: List[str], cwd: str):
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        self._process = subprocess.Popen([sys.executable, "-m", "server", *server_args],
+                                         cwd=cwd, env=env,
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._reader = self._process.stdout
+        self._writer = self._process.stdin
+        self._next_id = 0
+
+    def _send(self, message: Message) -> None:
+        body = json.dumps(message).encode("utf-8")
+        self._writer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self._writer.flush()
+
+    def _receive(self) -> Message:
+        length = None
+        while True:
+            line = self._reader.readline()
+            if not line:
+                raise EOFError("server exited")
+            line = line.strip()
+            if not line:
+                break
+            name, value = line.split(b":", 1)
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        return json.loads(self._reader.read(length))
+
+    def notify(self, method: str, params: Any) -> None:
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def wait_for(self, accept: Callable[[Message], bool]) -> Message:
+        "reads messages until one is accepted, answering any requests from the server on the way"
+        while True:
+            message = self._receive()
+            if "method" in message and "id" in message:
+                self._send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+            if accept(message):
+                return message
+
+    def request(self, method: str, params: Any) -> Any:
+        self._next_id += 1
+        request_id = self._next_id
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        response = self.wait_for(lambda m: m.get("id") == request_id and "method" not in m)
+        if "error" in response:
+            raise RuntimeError(f"{method} failed: {response['error']}")
+        return response.get("result")
+
+    def initialize(self, root_uri: str) -> Any:
+        result = self.request("initialize", {"processId": os.getpid(), "rootUri": root_uri,
+                                             "capabilities": {}})
+        self.notify("initialized", {})
+        return result
+
+    def close(self) -> None:
+        try:
+            self.request("shutdown", None)
+            self.notify("exit", None)
+            self._process.wait(timeout=5)
+        except (EOFError, OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+
+
+class TcpLspClient(LspClient):
+    """The same, connected to a server already listening on host:port.  Closing
+       it ends this client's session; the server carries on."""
+
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        # The server may still be starting
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._socket = socket.create_connection((host, port), timeout=timeout)
+                break
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        # Otherwise a request sent straight after a notification waits for the server's delayed ACK
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+        self._writer = self._socket.makefile("wb")
+        self._next_id = 0
+
+    def close(self) -> None:
+        try:
+            self.request("shutdown", None)
+            self.notify("exit", None)
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._reader.close()
+            self._writer.close()
+            self._socket.close()
@@ -0,0 +1,132 @@
+"""Measures how long the server takes to start.
+
+   - import: `python -X importtime -m server --help`, i.e. importing the server
+     and everything it needs, with the modules that took longest to import
+   - initialize: from starting `python -m server` to its response to `initialize`
+
+   Each is the median of --runs runs, checked against a budget relative to a
+   baseline measured the same way on the same machine: importing lsprotocol and
+   pygls, which the server can't start without, in a fresh interpreter.  So the
+   budgets hold on a slow machine as well as a fast one, and cover only what the
+   server adds.  The process exits with status 1 if either is over, or if any
+   of DEFERRED_MODULES was imported at startup.  tests/test_startup.py checks
+   the deferred modules but not the times, which vary too much to test.
+
+   Usage: python -m benchmarks.startup [--runs N] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from pygls.uris import from_fs_path
+
+from .lsp_client import ROOT, LspClient
+
+# What the server needs that it can't do without, imported for the baseline
+BASELINE_IMPORT = "import lsprotocol.types, pygls.server"
+
+# Most times the baseline the server's import, and its response to initialize, may take
+IMPORT_BUDGET_RATIO = 1.5
+INITIALIZE_BUDGET_RATIO = 1.5
+
+# Modules only needed by some backends, commands, transports or requests, so not imported at startup
+DEFERRED_MODULES = ["lark", "tree_sitter", "sqlite3", "server.lark_parser", "server.tree_sitter_parser",
+                    "server.check", "server.indexing", "server.pull_diagnostics", "server.sessions",
+                    "server.stats", "server.symbol_cache"]
+
+
+def import_times(args: Tuple[str, ...] = ("-m", "server", "--help")) -> Dict[str, Tuple[int, int]]:
+    """module -> (self, cumulative) microseconds to import it, running python with args,
+       by default the server's entry point"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    stderr = subprocess.run([sys.executable, "-X", "importtime", *args],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stderr
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def import_seconds(times: Dict[str, Tuple[int, int]]) -> float:
+    "total time spent importing: every module's own time, summed"
+    return sum(own for own, _ in times.values()) / 1e6
+
+
+def baseline_seconds() -> Tuple[float, float]:
+    """seconds spent importing what the server can't do without, and to run a
+       process that imports it and exits"""
+    import_time = import_seconds(import_times(("-c", BASELINE_IMPORT)))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", BASELINE_IMPORT], cwd=ROOT, check=True)
+    return import_time, time.perf_counter() - start
+
+
+def initialize_seconds(workdir: str) -> float:
+    "seconds from starting the server to its response to initialize"
+    start = time.perf_counter()
+    client = LspClient(["--no-cache"], cwd=workdir)
+    try:
+        client.request("initialize", {"processId": os.getpid(), "rootUri": from_fs_path(workdir),
+                                      "capabilities": {}})
+        return time.perf_counter() - start
+    finally:
+        client.close()
+
+
+def measure(runs: int) -> Tuple[Tuple[float, float], Tuple[float, float], Dict[str, Tuple[int, int]]]:
+    """median (import, baseline import) and (initialize, baseline process) seconds over
+       runs, and the import times of the last run"""
+    imports: List[float] = []
+    initializes: List[float] = []
+    baselines: List[Tuple[float, float]] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            times = import_times()
+            imports.append(import_seconds(times))
+            initializes.append(initialize_seconds(workdir))
+            baselines.append(baseline_seconds())
+    baseline_import, baseline_process = (statistics.median(column) for column in zip(*baselines))
+    return ((statistics.median(imports), baseline_import),
+            (statistics.median(initializes), baseline_process), times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = arg_parser.parse_args()
+
+    import_time, initialize_time, times = measure(args.runs)
+
+    print(f"{'module':<40} {'self ms':>9} {'total ms':>9}")
+    for module, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{module:<40} {own / 1000:>9.1f} {cumulative / 1000:>9.1f}")
+    ours = sum(own for module, (own, _) in times.items() if module.split(".")[0] == "server")
+    print(f"\nserver's own modules: {ours / 1000:.1f} ms")
+    loaded = [module for module in DEFERRED_MODULES if module in times]
+    if loaded:
+        print(f"imported at startup but should be deferred: {', '.join(loaded)}")
+
+    over = False
+    for name, (seconds, baseline), ratio in [("import", import_time, IMPORT_BUDGET_RATIO),
+                                             ("initialize", initialize_time, INITIALIZE_BUDGET_RATIO)]:
+        flag = ""
+        if seconds > baseline * ratio:
+            flag = "  OVER BUDGET"
+            over = True
+        print(f"{name:<12} {seconds * 1000:>8.1f} ms  {seconds / baseline:.2f}x baseline of "
+              f"{baseline * 1000:.0f} ms (budget {ratio:.2f}x){flag}")
+    if over or loaded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
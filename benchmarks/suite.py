@@ -0,0 +1,206 @@
+"""Benchmark suite for the greet server.
+
+   Generates a corpus of each size and times the server's main operations on it,
+   both as direct calls and as LSP round-trips against `python -m server`:
+
+   - parse: `_parse_greet` directly; over LSP, didOpen until publishDiagnostics.
+     The server caches parse results by content, so each run's document
+     starts with a declaration of its own to make sure it's parsed
+   - semantic_tokens: the full-document encoding / semanticTokens/full
+   - definition: looking up a greeted name / textDocument/definition
+   - completion: completing a name after a salutation / textDocument/completion
+   - edit: applying a one-character incremental change in the middle of the
+     document (direct only)
+
+   Results are written as JSON, one entry per operation and size, with sorted
+   keys so that two runs diff cleanly; compare them with benchmarks.compare.
+
+   Usage: python -m benchmarks.suite [--sizes 1000 10000 ...] [--output FILE] [--no-lsp]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from lsprotocol.types import (CompletionParams, DefinitionParams, Position, Range,
+                              TextDocumentContentChangeEvent_Type1,
+                              TextDocumentIdentifier, TextDocumentItem, TextDocumentSyncKind)
+from pygls.uris import from_fs_path
+from pygls.workspace import Workspace
+
+from server import semantic_tokens, server
+from server.index import scan_symbols
+
+from .corpus import generate_lines
+from .lsp_client import ROOT, LspClient
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Lookups are timed at this many positions in each document
+LOOKUPS = 50
+
+Results = Dict[str, Dict[str, float]]
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    return {"median_ms": round(statistics.median(samples) * 1000, 3),
+            "min_ms": round(min(samples) * 1000, 3),
+            "runs": len(samples)}
+
+
+def _time(fn: Callable[[], object], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _lookup_positions(lines: List[str]) -> List[Tuple[int, int]]:
+    """(line, character) of the name in evenly spaced greetings: the start of the
+       name, so completion sees an empty prefix, plus one character for definition
+    """
+    greetings = [i for i, line in enumerate(lines) if line.startswith(("Hello ", "Goodbye "))]
+    step = max(1, len(greetings) // LOOKUPS)
+    return [(i, lines[i].index(" ") + 1) for i in greetings[::step][:LOOKUPS]]
+
+
+def _position(line: int, character: int) -> Dict[str, int]:
+    return {"line": line, "character": character}
+
+
+def run_direct(lines: List[str], runs: int, results: Results) -> None:
+    size = len(lines)
+    source = "\n".join(lines) + "\n"
+
+    results[f"direct/parse/{size}"] = _stats(_time(lambda: server._parse_greet(source), runs))
+    results[f"direct/semantic_tokens/{size}"] = _stats(_time(lambda: semantic_tokens.encode(source), runs))
+
+    uri = "file:///bench/corpus.greet"
+    ls = server.GreetLanguageServer("bench", "v0")
+    ls.lsp.workspace = Workspace("file:///bench", TextDocumentSyncKind.Incremental)
+    ls.workspace.put_document(TextDocumentItem(uri=uri, language_id="greet", version=1, text=source))
+    ls.index.update(uri, scan_symbols(source))
+    document = TextDocumentIdentifier(uri=uri)
+
+    positions = _lookup_positions(lines)
+    definition, completion = [], []
+    for line, character in positions:
+        definition += _time(lambda: server.definition(ls, DefinitionParams(
+            text_document=document, position=Position(line=line, character=character + 1))), 1)
+        completion += _time(lambda: server.completion(ls, CompletionParams(
+            text_document=document, position=Position(line=line, character=character))), 1)
+    results[f"direct/definition/{size}"] = _stats(definition)
+    results[f"direct/completion/{size}"] = _stats(completion)
+
+    # Typing a character and deleting it again, so the document ends as it started
+    middle = Position(line=size // 2, character=0)
+    after = Position(line=size // 2, character=1)
+    text_doc = ls.workspace.get_document(uri)
+    insert = TextDocumentContentChangeEvent_Type1(range=Range(start=middle, end=middle), text="x")
+    delete = TextDocumentContentChangeEvent_Type1(range=Range(start=middle, end=after), text="")
+    results[f"direct/edit/{size}"] = _stats(_time(
+        lambda: (text_doc.apply_change(insert), text_doc.apply_change(delete)), runs))
+
+
+def _run_name(run: int) -> str:
+    "a name unique to run, spelled in letters as names must be"
+    return "Run" + "".join(chr(ord("a") + int(digit)) for digit in str(run))
+
+
+def run_lsp(lines: List[str], runs: int, results: Results, workdir: str) -> None:
+    size = len(lines)
+    source = "\n".join(lines) + "\n"
+    # An empty workspace, so the server has nothing to index in the background
+    client = LspClient(["--no-cache", "--debounce", "0"], cwd=workdir)
+    try:
+        client.initialize(from_fs_path(workdir))
+
+        parse = []
+        for run in range(runs):
+            uri = from_fs_path(os.path.join(workdir, f"corpus{run}.greet"))
+            start = time.perf_counter()
+            # Unlike the previous runs' sources, so not in the parse cache
+            client.notify("textDocument/didOpen", {"textDocument": {
+                "uri": uri, "languageId": "greet", "version": 1,
+                "text": f"name: {_run_name(run)}\n{source}"}})
+            client.wait_for(lambda m: m.get("method") == "textDocument/publishDiagnostics"
+                            and m["params"]["uri"] == uri)
+            parse.append(time.perf_counter() - start)
+            if run < runs - 1:
+                client.notify("textDocument/didClose", {"textDocument": {"uri": uri}})
+        results[f"lsp/parse/{size}"] = _stats(parse)
+
+        document = {"uri": uri}
+        results[f"lsp/semantic_tokens/{size}"] = _stats(_time(
+            lambda: client.request("textDocument/semanticTokens/full", {"textDocument": document}), runs))
+
+        definition, completion = [], []
+        for line, character in _lookup_positions(lines):
+            # After the run's declaration
+            line += 1
+            definition += _time(lambda: client.request("textDocument/definition", {
+                "textDocument": document, "position": _position(line, character + 1)}), 1)
+            completion += _time(lambda: client.request("textDocument/completion", {
+                "textDocument": document, "position": _position(line, character)}), 1)
+        results[f"lsp/definition/{size}"] = _stats(definition)
+        results[f"lsp/completion/{size}"] = _stats(completion)
+    finally:
+        client.close()
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    arg_parser.add_argument("--error-density", type=float, default=0.05)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=5,
+                            help="runs of each whole-document operation; fewer for the largest sizes")
+    arg_parser.add_argument("--no-lsp", action="store_true", help="only time direct calls")
+    arg_parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    args = arg_parser.parse_args()
+
+    commit = _commit()
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{commit or 'results'}.json")
+
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            lines = generate_lines(size, args.error_density, args.seed)
+            runs = max(1, min(args.repeat, 1_000_000 // size))
+            run_direct(lines, runs, results)
+            if not args.no_lsp:
+                run_lsp(lines, runs, results, workdir)
+
+    print(f"{'benchmark':<32} {'median ms':>10} {'min ms':>10} {'runs':>5}")
+    for name, stats in results.items():
+        print(f"{name:<32} {stats['median_ms']:>10.3f} {stats['min_ms']:>10.3f} {stats['runs']:>5}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit,
+                   "python": platform.python_version(),
+                   "platform": platform.platform(),
+                   "parameters": {"error_density": args.error_density, "seed": args.seed,
+                                  "repeat": args.repeat},
+                   "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
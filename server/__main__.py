@@ -15,23 +15,36 @@
 # limitations under the License.                                           #
 ############################################################################
 import argparse
-import logging
+import os
+import sys
 
-from .server import greet_server
+# The server is only imported once it's known to be needed.  Worker processes
+# are spawned by importing this module afresh, and neither they nor `check`
+# need the server, its event loop or pygls's protocol machinery.
 
-logging.basicConfig(filename="pygls.log", level=logging.DEBUG, filemode="w")
+
+def default_cache_path() -> str:
+    "the symbol cache file's default location, under the user's cache directory"
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "greet-lsp", "symbols.sqlite3")
 
 
 def add_arguments(parser):
-    parser.description = "simple greet server example"
+    from . import logs
+    from .backends import BACKENDS, DEFAULT_BACKEND
+    from .parse_service import DEFAULT_INLINE_THRESHOLD, PROCESS, THREAD
+    from .server import (DEBOUNCE_INTERVAL_IN_SECONDS, MAX_DIAGNOSTICS, PARSE_LOG_INTERVAL_IN_SECONDS,
+                         STATS_DUMP_INTERVAL_IN_SECONDS)
+
+    parser.description = "simple greet server example.  Run with 'check' to check files instead."
 
     parser.add_argument(
         "--tcp", action="store_true",
-        help="Use TCP server"
+        help="Use TCP server, serving each client that connects in a session of its own"
     )
     parser.add_argument(
         "--ws", action="store_true",
-        help="Use WebSocket server"
+        help="Use WebSocket server, with a session for each client as for --tcp"
     )
     parser.add_argument(
         "--host", default="127.0.0.1",
@@ -41,13 +54,91 @@ def add_arguments(parser):
         "--port", type=int, default=2087,
         help="Bind to this port"
     )
+    parser.add_argument(
+        "--debounce", type=float, default=DEBOUNCE_INTERVAL_IN_SECONDS,
+        help="Seconds to wait after the last edit before parsing a document"
+    )
+    parser.add_argument(
+        "--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND,
+        help="Parser used to check documents"
+    )
+    parser.add_argument(
+        "--max-diagnostics", type=int, default=MAX_DIAGNOSTICS,
+        help="Most diagnostics published for a document; 0 for no limit"
+    )
+    parser.add_argument(
+        "--parse-pool", choices=[THREAD, PROCESS], default=THREAD,
+        help="Kind of worker pool used to parse large documents"
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, default=None,
+        help="Number of parse pool workers (default: decided by the pool)"
+    )
+    parser.add_argument(
+        "--inline-threshold", type=int, default=DEFAULT_INLINE_THRESHOLD,
+        help="Documents shorter than this many characters are parsed inline"
+    )
+    parser.add_argument(
+        "--cache-file", default=default_cache_path(),
+        help="File that caches scanned symbols between runs"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Don't cache scanned symbols between runs"
+    )
+    parser.add_argument(
+        "--log-level", choices=logs.LOG_LEVELS, default=logs.DEFAULT_LOG_LEVEL,
+        help="Least severe messages written to the log file"
+    )
+    parser.add_argument(
+        "--log-file", default=logs.DEFAULT_LOG_FILE,
+        help="File the server logs to, replaced on each start"
+    )
+    parser.add_argument(
+        "--parse-log-interval", type=float, default=PARSE_LOG_INTERVAL_IN_SECONDS,
+        help="Least seconds between 'Parsing greeting...' messages to the client"
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Record per-method statistics, returned by the greet/stats command"
+    )
+    parser.add_argument(
+        "--stats-file", default=None,
+        help="Also write the statistics to this file in Prometheus text format (implies --stats)"
+    )
+    parser.add_argument(
+        "--stats-interval", type=float, default=STATS_DUMP_INTERVAL_IN_SECONDS,
+        help="Seconds between writes of --stats-file"
+    )
 
 
 def main():
+    if sys.argv[1:2] == ["check"]:
+        from . import check
+        sys.exit(check.main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser()
     add_arguments(parser)
     args = parser.parse_args()
 
+    from . import logs
+    from .backends import get_backend
+    from .parse_service import ParseService
+    from .server import greet_server
+
+    # Configured here rather than at import so spawned worker processes don't truncate the log
+    logs.configure(args.log_level, args.log_file)
+
+    greet_server.diagnostics_scheduler.debounce_interval = args.debounce
+    greet_server.parse_log.interval = args.parse_log_interval
+    greet_server.backend = get_backend(args.backend)
+    greet_server.max_diagnostics = args.max_diagnostics or None
+    greet_server.parse_service = ParseService(args.parse_pool, args.parse_workers,
+                                              args.inline_threshold)
+    greet_server.symbol_cache_path = None if args.no_cache else args.cache_file
+    if args.stats or args.stats_file:
+        greet_server.enable_stats(args.stats_file, args.stats_interval)
+
     if args.tcp:
         greet_server.start_tcp(args.host, args.port)
     elif args.ws:
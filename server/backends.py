@@ -0,0 +1,230 @@
+from typing import Any, Dict, List, NamedTuple
+
+from lsprotocol.types import Diagnostic, Position, Range, TextDocumentContentChangeEvent
+
+from . import parser as greet_parser
+from . import regex_parser
+from .cancellation import CancellationToken
+from .line_cache import LineCache, LineChecker, LineIndex, line_count
+from .parser import DIAGNOSTIC_SOURCE, Greeting, NameDefinition, UnrecognisedStatement
+
+Statements = List[NameDefinition | Greeting | UnrecognisedStatement]
+
+
+class ParseResult(NamedTuple):
+    diagnostics: List[Diagnostic]
+    statements: Statements
+
+
+class DocumentState:
+    """What a backend keeps about an open document, so that its diagnostics can be
+       brought up to date after an edit without parsing all of it again.
+
+       While `is_valid` is False the server parses the whole document with the
+       backend's `check`, and hands the result to `seed`, along with whatever
+       `prepare` made of the same source; after that, `refresh` returns the
+       diagnostics for the edits applied since, given the document's line index
+       if it has one.  This default keeps nothing, so every change means a full
+       parse.
+
+       `prepare` is for work as slow as the full parse, such as building a syntax
+       tree.  It may run on a worker thread while edits are applied to the state,
+       so it mustn't change the state; the other methods run on the event loop.
+    """
+
+    @property
+    def is_valid(self) -> bool:
+        return False
+
+    def invalidate(self) -> None:
+        pass
+
+    def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
+        pass
+
+    def prepare(self, source: str) -> Any:
+        return None
+
+    def seed(self, source: str, diagnostics: List[Diagnostic], prepared: Any = None) -> None:
+        pass
+
+    def refresh(self, source: str, lines: LineIndex | None = None) -> List[Diagnostic]:
+        raise NotImplementedError
+
+
+class LineDocumentState(DocumentState):
+    "For backends that check each line on its own: only edited lines are checked again"
+
+    def __init__(self, check_line: LineChecker):
+        self.cache = LineCache(check_line)
+
+    @property
+    def is_valid(self) -> bool:
+        return self.cache.is_valid
+
+    def invalidate(self) -> None:
+        self.cache.invalidate()
+
+    def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
+        self.cache.apply_change(change)
+
+    def seed(self, source: str, diagnostics: List[Diagnostic], prepared: Any = None) -> None:
+        self.cache.seed(line_count(source), diagnostics)
+
+    def refresh(self, source: str, lines: LineIndex | None = None) -> List[Diagnostic]:
+        return self.cache.refresh(source, lines)
+
+
+class Backend:
+    """One way of checking greet source.
+
+       `check` and `parse` must be safe to run on the parse service's worker
+       pool, so backends are module-level singletons that hold no unpicklable
+       state.
+    """
+    name: str
+    # Changed whenever the diagnostics the backend finds in a source may change, so
+    # those cached from an earlier version are dropped
+    version: int
+    # True if diagnostic columns count UTF-16 code units, as LSP's do; otherwise
+    # they count code points, i.e. index the Python string
+    utf16_columns = False
+
+    def check(self, source: str, limit: int | None = None,
+              token: CancellationToken | None = None) -> List[Diagnostic]:
+        """returns the diagnostics for source, or the first limit of them.  Stops with
+           Cancelled if token is cancelled, where the backend has checkpoints: this
+           default parses the document in one call, so has none."""
+        return self.parse(source).diagnostics[:limit]
+
+    def parse(self, source: str) -> ParseResult:
+        "returns the diagnostics and statements for source"
+        raise NotImplementedError
+
+    def document_state(self) -> DocumentState:
+        "returns new state for re-checking an open document incrementally"
+        return DocumentState()
+
+
+class RegexBackend(Backend):
+    "The original line-by-line regex.  It doesn't know about name declarations."
+    name = "regex"
+    # Bump when regex_parser.py's patterns or messages change
+    version = 1
+
+    def check(self, source: str, limit: int | None = None,
+              token: CancellationToken | None = None) -> List[Diagnostic]:
+        # Stops checking once it has limit diagnostics
+        return regex_parser.parse(source, limit, token)
+
+    def parse(self, source: str) -> ParseResult:
+        return ParseResult(regex_parser.parse(source), regex_parser.parse_statements(source))
+
+    def document_state(self) -> DocumentState:
+        return LineDocumentState(regex_parser.check_line)
+
+
+class ScannerBackend(Backend):
+    "The single-pass scanner in parser.py"
+    name = "scanner"
+    # The scanner's grammar version, which the symbol cache is keyed by as well
+    version = greet_parser.GRAMMAR_VERSION
+
+    def check(self, source: str, limit: int | None = None,
+              token: CancellationToken | None = None) -> List[Diagnostic]:
+        return greet_parser.parse(source, token)[:limit]
+
+    def parse(self, source: str) -> ParseResult:
+        return ParseResult(*greet_parser.parse_all(source))
+
+    def document_state(self) -> DocumentState:
+        return LineDocumentState(greet_parser.check_line)
+
+
+def _lark_diagnostic(error, lines: List[str]) -> Diagnostic:
+    _, line, column = error.args
+    # lark counts from 1; the error runs to the end of its line
+    line_num, start = line - 1, column - 1
+    end = len(lines[line_num].rstrip()) if line_num < len(lines) else start
+    return Diagnostic(range=Range(start=Position(line=line_num, character=start),
+                                  end=Position(line=line_num, character=max(start, end))),
+                      message=error.label,
+                      source=DIAGNOSTIC_SOURCE)
+
+
+class LarkBackend(Backend):
+    "The lark LALR parser, with error recovery"
+    name = "lark"
+    # Bump when lark_parser.py's grammar or error examples change
+    version = 1
+
+    def parse(self, source: str) -> ParseResult:
+        from . import lark_parser
+
+        tree, errors = lark_parser.parse_tree(source)
+        lines = source.splitlines()
+        diagnostics = [_lark_diagnostic(error, lines) for error in errors]
+        statements = lark_parser.tree_statements(tree) if tree is not None else []
+        return ParseResult(diagnostics, statements)
+
+
+class TreeSitterDocumentState(DocumentState):
+    """Keeps the document's tree-sitter tree, re-parsing incrementally after each edit.
+       The first tree is built by `prepare`, so like any full parse it's off the
+       event loop for a large document.
+    """
+
+    def __init__(self):
+        self.document = None
+
+    @property
+    def is_valid(self) -> bool:
+        return self.document is not None
+
+    def invalidate(self) -> None:
+        self.document = None
+
+    def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
+        if self.document is not None:
+            self.document.apply_change(change)
+
+    def prepare(self, source: str):
+        from .tree_sitter_parser import TreeSitterDocument
+        return TreeSitterDocument(source)
+
+    def seed(self, source: str, diagnostics: List[Diagnostic], prepared: Any = None) -> None:
+        self.document = prepared if prepared is not None else self.prepare(source)
+
+    def refresh(self, source: str, lines: LineIndex | None = None) -> List[Diagnostic]:
+        return self.document.diagnostics()
+
+
+class TreeSitterBackend(Backend):
+    "The tree-sitter grammar in tree-sitter-greet"
+    name = "tree-sitter"
+    # Bump when tree-sitter-greet's grammar, or the messages made from its errors, change
+    version = 1
+    utf16_columns = True
+
+    def parse(self, source: str) -> ParseResult:
+        from .tree_sitter_parser import TreeSitterDocument
+
+        document = TreeSitterDocument(source)
+        return ParseResult(document.diagnostics(), document.statements())
+
+    def document_state(self) -> DocumentState:
+        return TreeSitterDocumentState()
+
+
+# Backends by name.  Lark and tree-sitter are only imported when used.
+BACKENDS: Dict[str, Backend] = {backend.name: backend for backend in
+                                [RegexBackend(), ScannerBackend(), LarkBackend(), TreeSitterBackend()]}
+
+DEFAULT_BACKEND = RegexBackend.name
+
+
+def get_backend(name: str = DEFAULT_BACKEND) -> Backend:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend '{name}', expected one of {', '.join(BACKENDS)}") from None
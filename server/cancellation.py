@@ -0,0 +1,121 @@
+import logging
+from threading import Lock
+from typing import Callable, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Characters of source worked through between checks for cancellation
+CHECKPOINT_CHARACTERS = 128 * 1024
+
+
+class Cancelled(Exception):
+    "Raised at a checkpoint once the work it's in has been cancelled"
+
+    def __init__(self, done: int, total: int):
+        super().__init__(f"cancelled after {done} of {total}")
+        self.done = done
+        self.total = total
+
+
+class CancellationToken:
+    """Lets the event loop stop work running elsewhere, e.g. on a worker thread.
+
+       The loop calls `cancel`; the work calls `checkpoint` every so often with how
+       far it's got, and stops with Cancelled at the first one after the cancel.
+       `on_cancelled` is told how much of the work was done, and how much there was.
+    """
+
+    def __init__(self, on_cancelled: Callable[[int, int], None] | None = None):
+        self.cancelled = False
+        self._on_cancelled = on_cancelled
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def abandoned(self, done: int, total: int) -> None:
+        "report the work stopped after done units of total"
+        if self._on_cancelled is not None:
+            self._on_cancelled(done, total)
+
+    def checkpoint(self, done: int, total: int) -> None:
+        "raise Cancelled, having reported how far the work got, if it's been cancelled"
+        if self.cancelled:
+            self.abandoned(done, total)
+            raise Cancelled(done, total)
+
+
+def blocks(source: str, token: CancellationToken, size: int | None = None) -> Iterator[str]:
+    """yields source in pieces of about size characters, by default CHECKPOINT_CHARACTERS,
+       each ending at a line break; there's a checkpoint before each"""
+    size = size or CHECKPOINT_CHARACTERS
+    start, total = 0, len(source)
+    while start < total:
+        token.checkpoint(start, total)
+        end = source.find("\n", start + size)
+        end = total if end == -1 else end + 1
+        yield source[start:end]
+        start = end
+
+
+class CancelledWork:
+    "What's recorded for each kind of work"
+
+    def __init__(self):
+        self.cancelled = 0
+        self.done = 0
+        self.saved = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"cancelled": self.cancelled, "done": self.done, "saved": self.saved}
+
+
+class CancellationStats:
+    """Counts the work cancelled, by kind, and how much of it was done first and
+       how much saved.  Work is measured in whatever units its kind counts in:
+       characters of source, or locations found.  Each cancellation is logged too.
+
+       Tokens may report from worker threads, so recording takes a lock.
+    """
+
+    def __init__(self):
+        self.kinds: Dict[str, CancelledWork] = {}
+        self._lock = Lock()
+
+    def token(self, kind: str) -> CancellationToken:
+        "a token for a piece of work of the given kind, recording here if it's cancelled"
+        return CancellationToken(lambda done, total: self.record(kind, done, total))
+
+    def record(self, kind: str, done: int, total: int) -> None:
+        with self._lock:
+            work = self.kinds.get(kind)
+            if work is None:
+                work = self.kinds[kind] = CancelledWork()
+            work.cancelled += 1
+            work.done += done
+            work.saved += total - done
+        logger.info("Cancelled %s after %d of %d; %.0f%% saved",
+                    kind, done, total, 100 * (total - done) / total if total else 0)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {kind: work.to_dict() for kind, work in sorted(self.kinds.items())}
+
+
+class LatestRequests:
+    """The token of the latest request of some kind for each document.  Starting
+       another cancels the one before, whose result would be out of date by the
+       time it was sent.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    def start(self, uri: str, token: CancellationToken) -> None:
+        previous = self._tokens.get(uri)
+        if previous is not None:
+            previous.cancel()
+        self._tokens[uri] = token
+
+    def finish(self, uri: str, token: CancellationToken) -> None:
+        if self._tokens.get(uri) is token:
+            del self._tokens[uri]
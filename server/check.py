@@ -0,0 +1,197 @@
+"""Checks .greet files without an editor: `python -m server check PATH...`
+
+   Directories are searched for .greet files.  Files are checked in chunks on
+   a pool of worker processes with the same backends the server uses, and the
+   results are written as each chunk completes, in the order the files were
+   found: one JSON object per file (--format jsonl), or a SARIF log
+   (--format sarif).  With --cache-file, files whose content was checked the
+   same way on an earlier run, by this or the server, aren't checked again.
+   Exits with status 1 if any file has a diagnostic or can't be read.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import Executor
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple, Type
+
+from pygls.uris import from_fs_path
+
+from .backends import BACKENDS, DEFAULT_BACKEND, Backend, get_backend
+from .indexing import GREET_EXTENSION, find_greet_files
+from .parse_service import process_pool
+from .parser import DIAGNOSTIC_SOURCE
+from .symbol_cache import CheckResult, SymbolCache, check_files
+
+JSONL = "jsonl"
+SARIF = "sarif"
+
+# Files handed to a worker at a time
+CHECK_CHUNK_SIZE = 32
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_RULE = "greet-syntax"
+# Stands in for the SARIF results while the rest of the log is serialised
+_RESULTS = "\0results\0"
+
+
+def run_checks(paths: List[str], backend_name: str = DEFAULT_BACKEND, limit: int | None = None,
+               executor: Executor | None = None, chunk_size: int = CHECK_CHUNK_SIZE,
+               cache_path: str | None = None) -> Iterator[CheckResult]:
+    """Yields the result for each of paths in order, checking them in chunks on
+       executor, or here if there isn't one."""
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if executor is None:
+        results = (check_files(chunk, backend_name, limit, cache_path) for chunk in chunks)
+    else:
+        results = executor.map(check_files, chunks, [backend_name] * len(chunks), [limit] * len(chunks),
+                               [cache_path] * len(chunks))
+    for chunk_results in results:
+        yield from chunk_results
+
+
+def expand_paths(arguments: Iterable[str]) -> List[str]:
+    "the files named, and the .greet files under the directories named"
+    paths: List[str] = []
+    for argument in arguments:
+        if os.path.isdir(argument):
+            paths.extend(sorted(find_greet_files([argument])))
+        else:
+            paths.append(argument)
+    return paths
+
+
+class ResultWriter:
+    """Writes the results of a check to output as they come, in one of the
+       --format formats.  backend is the one that found the diagnostics, for
+       formats that describe them.
+    """
+
+    def __init__(self, output: IO[str], backend: Backend):
+        self.output = output
+        self.backend = backend
+
+    def write(self, result: CheckResult) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        "finishes the output once every result is written"
+
+
+class JsonLinesWriter(ResultWriter):
+    "Writes one JSON object per file, with the diagnostics as the backend gave them"
+
+    def write(self, result: CheckResult) -> None:
+        record = {"path": result.path, "diagnostics": result.diagnostics}
+        if result.error is not None:
+            record["error"] = result.error
+        self.output.write(json.dumps(record) + "\n")
+
+
+class SarifWriter(ResultWriter):
+    """Writes a SARIF 2.1.0 log with one run, streaming its results as they come.
+       The run's column kind is whatever the backend's diagnostic columns count."""
+
+    def __init__(self, output: IO[str], backend: Backend):
+        super().__init__(output, backend)
+        self._first = True
+        run_header = {"tool": {"driver": {"name": DIAGNOSTIC_SOURCE, "rules": [
+                          {"id": SARIF_RULE, "shortDescription": {"text": "Invalid greet syntax"}}]}},
+                      "columnKind": "utf16CodeUnits" if backend.utf16_columns else "unicodeCodePoints"}
+        # The log is written either side of its results array, which is streamed in between
+        log = {"$schema": SARIF_SCHEMA, "version": "2.1.0", "runs": [dict(run_header, results=_RESULTS)]}
+        head, self._tail = json.dumps(log).split(json.dumps(_RESULTS))
+        self.output.write(head + "[\n")
+
+    def _write_result(self, result: dict) -> None:
+        if not self._first:
+            self.output.write(",\n")
+        self._first = False
+        self.output.write(json.dumps(result))
+
+    def write(self, result: CheckResult) -> None:
+        uri = from_fs_path(os.path.abspath(result.path))
+        if result.error is not None:
+            self._write_result({"ruleId": SARIF_RULE, "level": "error",
+                                "message": {"text": f"Can't check file: {result.error}"},
+                                "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri}}}]})
+        for diagnostic in result.diagnostics:
+            start, end = diagnostic["range"]["start"], diagnostic["range"]["end"]
+            region = {"startLine": start["line"] + 1, "startColumn": start["character"] + 1,
+                      "endLine": end["line"] + 1, "endColumn": end["character"] + 1}
+            self._write_result({"ruleId": SARIF_RULE, "level": "error",
+                                "message": {"text": diagnostic["message"]},
+                                "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri},
+                                                                    "region": region}}]})
+
+    def close(self) -> None:
+        self.output.write("\n]" + self._tail + "\n")
+
+
+WRITERS: Dict[str, Type[ResultWriter]] = {JSONL: JsonLinesWriter, SARIF: SarifWriter}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m server check",
+                                     description=f"Check {GREET_EXTENSION} files")
+    parser.add_argument("paths", nargs="+", help=f"Files, or directories to search for {GREET_EXTENSION} files")
+    parser.add_argument("--format", choices=list(WRITERS), default=JSONL)
+    parser.add_argument("--output", help="File to write results to (default: standard output)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument("--max-diagnostics", type=int, default=0,
+                        help="Most diagnostics reported per file; 0 for no limit")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: one per CPU); 1 checks files in this process")
+    parser.add_argument("--chunk-size", type=int, default=CHECK_CHUNK_SIZE,
+                        help="Files handed to a worker at a time")
+    parser.add_argument("--cache-file", default=None,
+                        help="File that caches each file's diagnostics between runs, "
+                             "such as the server's symbol cache (default: none)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    paths = expand_paths(args.paths)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    backend = get_backend(args.backend)
+    writer = WRITERS[args.format](output, backend)
+    workers = args.workers or os.cpu_count() or 1
+    executor = process_pool(workers) if workers > 1 and len(paths) > args.chunk_size else None
+    limit = args.max_diagnostics or None
+    cache = None
+    if args.cache_file is not None:
+        try:
+            cache = SymbolCache(args.cache_file)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Can't open cache {args.cache_file}, so checking every file: {e}", file=sys.stderr)
+    fresh: List[Tuple[bytes, List[Dict[str, Any]]]] = []
+    failed = diagnostics = 0
+    try:
+        for result in run_checks(paths, args.backend, limit, executor, args.chunk_size,
+                                 cache.path if cache is not None else None):
+            writer.write(result)
+            diagnostics += len(result.diagnostics)
+            if result.diagnostics or result.error is not None:
+                failed += 1
+            if cache is not None and result.fresh:
+                fresh.append((result.digest, result.diagnostics))
+                if len(fresh) >= args.chunk_size:
+                    cache.put_diagnostics(fresh, backend, limit)
+                    fresh = []
+        writer.close()
+    finally:
+        if cache is not None:
+            if fresh:
+                cache.put_diagnostics(fresh, backend, limit)
+            cache.close()
+        if executor is not None:
+            executor.shutdown()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed else 0.0
+    print(f"{len(paths)} files checked in {elapsed:.2f}s ({rate:,.0f} files/s): "
+          f"{diagnostics} diagnostics, {failed} files with problems", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,109 @@
+from lsprotocol.types import (INITIALIZE, TEXT_DOCUMENT_DIAGNOSTIC, InitializeParams, InitializeResult,
+                              Position, TextDocumentContentChangeEvent, TextDocumentContentChangeEvent_Type1)
+from pygls.protocol import lsp_method
+from pygls.workspace import Document, Workspace
+
+from .line_cache import LineIndex
+from .stats_protocol import StatsProtocol
+
+
+class GreetDocument(Document):
+    """A pygls Document that keeps a LineIndex of its source.
+
+       pygls applies an edit by splitting the whole document into lines and
+       joining them up again, and handlers using `lines` split it on every
+       request.  Here the offsets an edit spans are found with the index, the
+       source is spliced there, and handlers get lines and offsets from the index.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._line_index: LineIndex | None = None
+
+    @property
+    def line_index(self) -> LineIndex:
+        "the index of the document's lines, made when first needed"
+        if self._line_index is None:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def line(self, line: int) -> str:
+        "the text of line, without its line break; empty past the last line"
+        return self.line_index.line(self.source, line)
+
+    def text_of_lines(self, first: int, last: int) -> str:
+        "the text of lines first to last inclusive, line breaks and all"
+        index = self.line_index
+        return self.source[index.line_start(first):index.line_start(last + 1)]
+
+    def _offset(self, position: Position) -> int:
+        """the offset of an LSP position, whose character counts UTF-16 code units; one
+           inside a surrogate pair is taken to be after it"""
+        index = self.line_index
+        start = index.line_start(position.line)
+        end = index.line_start(position.line + 1)
+        source = self.source
+        if source[start:start + position.character].isascii():
+            return min(start + position.character, end)
+        # Characters outside the BMP are two code units, so walk the line to the position
+        offset, units = start, 0
+        while offset < end and units < position.character:
+            units += 2 if ord(source[offset]) > 0xFFFF else 1
+            offset += 1
+        return offset
+
+    def offset_at_position(self, position: Position) -> int:
+        return self._offset(position)
+
+    def _apply_incremental_change(self, change: TextDocumentContentChangeEvent_Type1) -> None:
+        start = self._offset(change.range.start)
+        end = max(start, self._offset(change.range.end))
+        source = self.source
+        self._source = source[:start] + change.text + source[end:]
+        self._line_index.apply_edit(start, end, change.text, self._source)
+
+    def _apply_full_change(self, change: TextDocumentContentChangeEvent) -> None:
+        super()._apply_full_change(change)
+        self._line_index = None
+
+
+class GreetWorkspace(Workspace):
+    "A pygls Workspace whose documents are GreetDocuments"
+
+    @classmethod
+    def of(cls, workspace: Workspace) -> "GreetWorkspace":
+        "a GreetWorkspace with the root, folders and documents of a pygls one"
+        greet_workspace = cls(workspace.root_uri, workspace._sync_kind, list(workspace.folders.values()))
+        for uri, doc in workspace.documents.items():
+            greet_workspace._docs[uri] = greet_workspace._create_document(
+                uri, source=doc.source, version=doc.version, language_id=doc.language_id)
+        return greet_workspace
+
+    def _create_document(self, doc_uri: str, source: str | None = None,
+                         version: int | None = None, language_id: str | None = None) -> GreetDocument:
+        return GreetDocument(doc_uri, source=source, version=version,
+                             language_id=language_id, sync_kind=self._sync_kind)
+
+
+class DocumentProtocol(StatsProtocol):
+    """The server's protocol: pygls makes the workspace when the client initializes,
+       and it's replaced with a GreetWorkspace as it's set.  pygls 1.0 doesn't know
+       pull diagnostics either, so they're added to the capabilities it works out."""
+
+    @lsp_method(INITIALIZE)
+    def lsp_initialize(self, params: InitializeParams) -> InitializeResult:
+        result = super().lsp_initialize(params)
+        options = self.fm.feature_options.get(TEXT_DOCUMENT_DIAGNOSTIC)
+        if options is not None:
+            result.capabilities.diagnostic_provider = options
+        return result
+
+    @property
+    def workspace(self) -> GreetWorkspace | None:
+        return self._workspace
+
+    @workspace.setter
+    def workspace(self, workspace: Workspace | None):
+        if workspace is not None and not isinstance(workspace, GreetWorkspace):
+            workspace = GreetWorkspace.of(workspace)
+        self._workspace = workspace
@@ -0,0 +1,307 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from lsprotocol.types import Location, Position, Range
+
+from .cancellation import CancellationToken, blocks
+from .parser import _scan, _statement_spans, Greeting, NameDefinition, TokenList
+
+# A name and where it appears: (name, line, start column, end column).
+# Plain tuples so they're cheap to hold in bulk and can cross process boundaries.
+Symbol = Tuple[str, int, int, int]
+
+
+class DocumentSymbols(NamedTuple):
+    "The names a document declares, and the names its greetings use"
+    declarations: List[Symbol]
+    references: List[Symbol]
+
+
+def scan_symbols(source: str, token: CancellationToken | None = None) -> DocumentSymbols:
+    """returns the names declared by `name:` statements in source, and the names greeted.
+       Given a token, source is scanned a block at a time, checking for cancellation
+       between blocks."""
+    symbols = DocumentSymbols([], [])
+    if token is None:
+        _add_symbols(_scan(source), symbols, 0)
+        return symbols
+
+    line = 0
+    for block in blocks(source, token):
+        tokens = _scan(block)
+        _add_symbols(tokens, symbols, line)
+        line += len(tokens.line_starts) - 1
+    return symbols
+
+
+def read_source(path: str) -> str | None:
+    """returns the text of the file at path, read as a document that isn't open is,
+       or None if it can't be.  Run on the parse service's pool, so it's here rather
+       than in the server, which its workers needn't import."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _add_symbols(tokens: TokenList, symbols: DocumentSymbols, line_offset: int) -> None:
+    "adds the symbols in tokens, which start on line line_offset, to symbols"
+    for first, end, kind in _statement_spans(tokens):
+        if kind is NameDefinition:
+            entries = symbols.declarations
+        elif kind is Greeting:
+            entries = symbols.references
+        else:
+            continue
+        name = tokens[first + 1]
+        entries.append((name.token_value, name.line + line_offset, name.start_col, name.end_col))
+
+
+def location(uri: str, symbol: Symbol) -> Location:
+    "where symbol is, in the document uri"
+    _, line, start, end = symbol
+    return Location(uri=uri, range=Range(start=Position(line=line, character=start),
+                                         end=Position(line=line, character=end)))
+
+
+# name -> uri -> the symbols for that name in the document
+_NameMap = Dict[str, Dict[str, List[Symbol]]]
+
+
+def _add(names: _NameMap, uri: str, symbols: List[Symbol]) -> List[str]:
+    "adds symbols to names, returning the names that weren't there before"
+    added: List[str] = []
+    for symbol in symbols:
+        by_uri = names.get(symbol[0])
+        if by_uri is None:
+            by_uri = names[symbol[0]] = {}
+            added.append(symbol[0])
+        by_uri.setdefault(uri, []).append(symbol)
+    return added
+
+
+def _remove(names: _NameMap, uri: str, symbols: List[Symbol]) -> List[str]:
+    "removes uri's symbols from names, returning the names no longer there at all"
+    removed: List[str] = []
+    for name, *_ in symbols:
+        by_uri = names.get(name)
+        if by_uri is None:
+            continue
+        by_uri.pop(uri, None)
+        if not by_uri:
+            del names[name]
+            removed.append(name)
+    return removed
+
+
+def _locations(names: _NameMap, name: str) -> List[Location]:
+    return [location(uri, symbol)
+            for uri, symbols in names.get(name, {}).items()
+            for symbol in symbols]
+
+
+class SortedNames:
+    """A set of names kept in case-insensitive order, so those starting with a
+       given prefix can be found by binary search rather than by checking every name.
+
+       Changes are buffered until the next lookup.  A few are then inserted in
+       place; many, e.g. after indexing the workspace, are merged by re-sorting.
+    """
+
+    def __init__(self):
+        # (casefolded name, name) pairs, in order
+        self._keys: List[Tuple[str, str]] = []
+        self._added: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    def __len__(self) -> int:
+        self._flush()
+        return len(self._keys)
+
+    def add(self, name: str) -> None:
+        if name in self._removed:
+            self._removed.discard(name)
+        else:
+            self._added.add(name)
+
+    def discard(self, name: str) -> None:
+        if name in self._added:
+            self._added.discard(name)
+        else:
+            self._removed.add(name)
+
+    def _flush(self) -> None:
+        if not self._added and not self._removed:
+            return
+        keys = self._keys
+        if len(self._added) + len(self._removed) > len(keys) // 8:
+            removed = self._removed
+            keys = [key for key in keys if key[1] not in removed]
+            keys.extend((name.casefold(), name) for name in self._added)
+            keys.sort()
+            self._keys = keys
+        else:
+            for name in self._removed:
+                key = (name.casefold(), name)
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    del keys[i]
+            for name in self._added:
+                insort(keys, (name.casefold(), name))
+        self._added.clear()
+        self._removed.clear()
+
+    def keys_with_prefix(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        "yields the (casefolded name, name) pairs of the names starting with prefix, in order"
+        self._flush()
+        folded = prefix.casefold()
+        keys = self._keys
+        i = bisect_left(keys, (folded,))
+        while i < len(keys) and keys[i][0].startswith(folded):
+            yield keys[i]
+            i += 1
+
+    def with_prefix(self, prefix: str, limit: int) -> Tuple[List[str], bool]:
+        """returns up to limit names starting with prefix, ignoring case, in order;
+           and whether there were more than limit of them
+        """
+        return _take(self.keys_with_prefix(prefix), limit)
+
+
+def _take(keys: Iterator[Tuple[str, str]], limit: int) -> Tuple[List[str], bool]:
+    "the names of up to limit keys, and whether there were more"
+    names: List[str] = []
+    for _, name in keys:
+        if len(names) == limit:
+            return names, True
+        names.append(name)
+    return names, False
+
+
+class WorkspaceIndex:
+    """Index of the names declared and greeted across the workspace.
+
+       Maps each name to the documents that declare it, and (an inverted index) to
+       the documents whose greetings use it.  Each document's own symbols are kept
+       too, so a document can be re-indexed without touching the entries for any
+       other.  Looking a name up is a dictionary lookup, however many documents
+       are indexed.
+    """
+
+    def __init__(self):
+        self._declarations: _NameMap = {}
+        self._references: _NameMap = {}
+        self._documents: Dict[str, DocumentSymbols] = {}
+        # every declared name, for completion
+        self.declared_names = SortedNames()
+
+    def __contains__(self, uri: str) -> bool:
+        return uri in self._documents
+
+    def __len__(self) -> int:
+        "number of documents indexed"
+        return len(self._documents)
+
+    def update(self, uri: str, symbols: DocumentSymbols) -> None:
+        "replace the index entries for uri with the given symbols"
+        self.remove(uri)
+        self._documents[uri] = symbols
+        for name in _add(self._declarations, uri, symbols.declarations):
+            self.declared_names.add(name)
+        _add(self._references, uri, symbols.references)
+
+    def remove(self, uri: str) -> None:
+        "drop all the index entries for uri"
+        symbols = self._documents.pop(uri, None)
+        if symbols is not None:
+            for name in _remove(self._declarations, uri, symbols.declarations):
+                self.declared_names.discard(name)
+            _remove(self._references, uri, symbols.references)
+
+    def names_with_prefix(self, prefix: str, limit: int) -> Tuple[List[str], bool]:
+        """returns up to limit declared names starting with prefix, ignoring case, in
+           order; and whether there were more than limit of them"""
+        return self.declared_names.with_prefix(prefix, limit)
+
+    def declaring_uris(self, name: str) -> Iterable[str]:
+        "the documents that declare name"
+        return self._declarations.get(name, {}).keys()
+
+    def definitions(self, name: str) -> List[Location]:
+        "returns the locations where name is declared"
+        return _locations(self._declarations, name)
+
+    def references(self, name: str) -> List[Location]:
+        "returns the locations of the greetings that use name"
+        return _locations(self._references, name)
+
+
+class SessionIndex:
+    """One client's view of a workspace index shared with other clients.
+
+       The shared index holds what's on disk.  The documents this client has open
+       are indexed in an overlay of its own, whose entries replace the shared ones
+       for those documents, so unsaved edits are only seen by the client making
+       them.  Lookups merge the two.
+    """
+
+    def __init__(self, shared: WorkspaceIndex):
+        self.shared = shared
+        self._open = WorkspaceIndex()
+
+    def __contains__(self, uri: str) -> bool:
+        return uri in self._open or uri in self.shared
+
+    def update(self, uri: str, symbols: DocumentSymbols) -> None:
+        "index an open document's symbols for this client only"
+        self._open.update(uri, symbols)
+
+    def remove(self, uri: str) -> None:
+        "drop an open document's entries, so the shared ones for it show through again"
+        self._open.remove(uri)
+
+    def _merged(self, mine: List[Location], shared: List[Location]) -> List[Location]:
+        return mine + [loc for loc in shared if loc.uri not in self._open]
+
+    def definitions(self, name: str) -> List[Location]:
+        "returns the locations where name is declared"
+        return self._merged(self._open.definitions(name), self.shared.definitions(name))
+
+    def references(self, name: str) -> List[Location]:
+        "returns the locations of the greetings that use name"
+        return self._merged(self._open.references(name), self.shared.references(name))
+
+    def _symbols(self, mine: _NameMap, shared: _NameMap, name: str) -> List[Tuple[str, List[Symbol]]]:
+        return list(mine.get(name, {}).items()) + [
+            (uri, symbols) for uri, symbols in shared.get(name, {}).items() if uri not in self._open]
+
+    def declaration_symbols(self, name: str) -> List[Tuple[str, List[Symbol]]]:
+        """each document that declares name, with its declarations: what `definitions`
+           returns the locations of, for callers that make them a few at a time"""
+        return self._symbols(self._open._declarations, self.shared._declarations, name)
+
+    def reference_symbols(self, name: str) -> List[Tuple[str, List[Symbol]]]:
+        "each document whose greetings use name, with those greetings"
+        return self._symbols(self._open._references, self.shared._references, name)
+
+    def _declared_elsewhere(self, name: str) -> bool:
+        "True if a document that isn't open here declares name"
+        return any(uri not in self._open for uri in self.shared.declaring_uris(name))
+
+    def names_with_prefix(self, prefix: str, limit: int) -> Tuple[List[str], bool]:
+        """returns up to limit declared names starting with prefix, ignoring case, in
+           order; and whether there were more than limit of them"""
+        shared = (key for key in self.shared.declared_names.keys_with_prefix(prefix)
+                  if self._declared_elsewhere(key[1]))
+        return _take(_unique(merge(self._open.declared_names.keys_with_prefix(prefix), shared)), limit)
+
+
+def _unique(keys: Iterator[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    "the sorted keys given, without repeats"
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+        previous = key
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, NamedTuple
+
+from pygls.uris import from_fs_path
+
+from .index import DocumentSymbols, WorkspaceIndex, scan_symbols
+from .symbol_cache import SymbolCache, content_hash
+
+GREET_EXTENSION = ".greet"
+
+# Files are sent to workers in chunks, to amortise the cost of each hand-off
+INDEX_CHUNK_SIZE = 64
+
+
+def find_greet_files(roots: Iterable[str]) -> List[str]:
+    "returns the path of every .greet file under the given root directories"
+    paths: List[str] = []
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Skip hidden directories such as .git
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            paths.extend(os.path.join(dirpath, f) for f in filenames if f.endswith(GREET_EXTENSION))
+    return paths
+
+
+class ScanResult(NamedTuple):
+    path: str
+    # hash of the file's content; None if it couldn't be read
+    digest: bytes | None
+    symbols: DocumentSymbols | None
+    # True if the file was scanned, False if its symbols came from the cache
+    fresh: bool
+
+
+def _read_cache(cache_path: str | None, digests: List[bytes]) -> Dict[bytes, DocumentSymbols]:
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        cache = SymbolCache(cache_path, readonly=True)
+        try:
+            return cache.get_many(digests)
+        finally:
+            cache.close()
+    except sqlite3.Error:
+        # A missing or damaged cache just means scanning everything
+        return {}
+
+
+def scan_files(paths: List[str], cache_path: str | None = None) -> List[ScanResult]:
+    """Scans each file for symbols, unless the symbol cache at cache_path already
+       holds them for the file's current content.  Runs in a worker process, so
+       everything it returns is plain, picklable data.  Workers only read the
+       cache; the caller stores fresh results.
+    """
+    contents: Dict[str, bytes | None] = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                contents[path] = f.read()
+        except OSError:
+            contents[path] = None
+
+    digests = {path: content_hash(content) for path, content in contents.items() if content is not None}
+    cached = _read_cache(cache_path, list(digests.values()))
+
+    results: List[ScanResult] = []
+    for path, content in contents.items():
+        if content is None:
+            results.append(ScanResult(path, None, None, False))
+            continue
+        digest = digests[path]
+        if digest in cached:
+            results.append(ScanResult(path, digest, cached[digest], False))
+            continue
+        try:
+            source = content.decode("utf-8")
+        except UnicodeDecodeError:
+            results.append(ScanResult(path, None, None, False))
+            continue
+        results.append(ScanResult(path, digest, scan_symbols(source), True))
+    return results
+
+
+async def index_files(index: WorkspaceIndex, paths: List[str], executor: Executor,
+                      on_progress: Callable[[int, int], None],
+                      is_open: Callable[[str], bool] = lambda uri: False,
+                      cache: SymbolCache | None = None,
+                      chunk_size: int = INDEX_CHUNK_SIZE) -> int:
+    """Scans paths on executor and adds their symbols to index, calling
+       on_progress(files done, total files) as each chunk completes.
+
+       Files whose symbols are in cache aren't parsed again, and fresh scans are
+       added to it.  Files for which is_open(uri) is true are skipped, for an
+       index that should hold an open document's unsaved contents rather than
+       the file on disk.  Cancelling the calling task cancels any chunks not yet started.  Returns
+       the number of files indexed.
+    """
+    loop = asyncio.get_running_loop()
+    cache_path = cache.path if cache is not None else None
+    futures = [loop.run_in_executor(executor, scan_files, paths[i:i + chunk_size], cache_path)
+               for i in range(0, len(paths), chunk_size)]
+
+    done = 0
+    indexed = 0
+    try:
+        for future in asyncio.as_completed(futures):
+            results = await future
+            for result in results:
+                uri = from_fs_path(result.path)
+                if is_open(uri):
+                    continue
+                if result.symbols is None:
+                    index.remove(uri)
+                else:
+                    index.update(uri, result.symbols)
+                    indexed += 1
+            if cache is not None:
+                cache.put_many([(r.digest, r.symbols) for r in results if r.fresh])
+            done += len(results)
+            on_progress(done, len(paths))
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return indexed
@@ -1,4 +1,10 @@
-from lark import Lark, UnexpectedInput
+from functools import lru_cache
+from typing import Dict, List, Tuple, Type
+
+from lark import Lark, Token, Tree, UnexpectedCharacters, UnexpectedInput, UnexpectedToken
+
+from . import parser as greet_parser
+from .parser import Greeting, NameDefinition, TokenType
 
 grammar = r"""
 start       : statement+
@@ -22,10 +28,42 @@ GOODBYE     : "Goodbye"
 %ignore WS
 """
 
-_parser = Lark(grammar, start="start")
+EARLEY = "earley"
+LALR = "lalr"
+
+DEFAULT_ALGORITHM = LALR
+
+_parsers: Dict[str, Lark] = {}
+
+
+def get_parser(algorithm: str = DEFAULT_ALGORITHM) -> Lark:
+    """Returns the parser for the given algorithm, building it on first use.
+
+       The LALR parser uses the contextual lexer, and is cached on disk by lark
+       (keyed on a hash of the grammar and options) so later starts load the
+       parse tables instead of re-analysing the grammar.  Earley can't be cached.
+    """
+    try:
+        return _parsers[algorithm]
+    except KeyError:
+        pass
+
+    if algorithm == LALR:
+        # Positions let statements locate the "name:" keyword, which lark filters out
+        parser = Lark(grammar, start="start", parser="lalr", lexer="contextual", cache=True,
+                      propagate_positions=True)
+    elif algorithm == EARLEY:
+        parser = Lark(grammar, start="start", parser="earley")
+    else:
+        raise ValueError(f"Unknown parser algorithm '{algorithm}', expected '{EARLEY}' or '{LALR}'")
+
+    _parsers[algorithm] = parser
+    return parser
 
 
 class GreetSyntaxError(SyntaxError):
+    label = "Syntax error"
+
     def __str__(self):
         context, line, column = self.args
         return f"{self.label} at line {line}, column {column}"
@@ -37,23 +75,164 @@ class GreetMalformedGreeting(GreetSyntaxError):
     label = "Malformed greeting"
 
 
-def parse(input: str):
+# Examples of each kind of error, used to classify the errors found in real input
+_ERROR_EXAMPLES: Dict[Type[GreetSyntaxError], List[str]] = {
+    GreetMalformedName: ["name ",
+                         "nam:",
+                         "nme:",
+                         "name:",
+                         "name: Bobby24",
+                         "name: Bobby McFadyen",
+                         "name: 24"],
+    GreetMalformedGreeting: ["hello",
+                             "goodbye",
+                             "Hello",
+                             "Hello 24",
+                             "Hello Bobby24",
+                             "Hello Bobby McFadyen",
+                             "Goodbye 24"]
+}
+
+# Tokens that can start a statement, i.e. that can follow an incomplete one
+_STATEMENT_STARTS = {"HELLO", "GOODBYE", "$END"}
+
+
+def _error_keys(ue: UnexpectedInput) -> List[Tuple]:
+    """keys for looking up an LALR error in the classification table, most specific first.
+       As with lark's match_examples, an exact token match beats a token type match,
+       which beats matching on parser state alone.
+    """
+    state = ue.state.position
+    token = getattr(ue, "token", None)
+    if token is None:
+        return [(state, None), (state,)]
+    return [(state, token.type, str(token)), (state, token.type), (state,)]
+
+
+@lru_cache(maxsize=None)
+def _error_table() -> Dict[Tuple, Type[GreetSyntaxError]]:
+    """Maps LALR parser state and offending token to the kind of error.
+
+       Built once, by parsing each example, so classifying an error is a dictionary
+       lookup rather than the re-parse of every example that match_examples does.
+    """
+    table: Dict[Tuple, Type[GreetSyntaxError]] = {}
+    parser = get_parser(LALR)
+    for exc_class, examples in _ERROR_EXAMPLES.items():
+        for example in examples:
+            try:
+                parser.parse(example)
+            except UnexpectedInput as ue:
+                for key in _error_keys(ue):
+                    table.setdefault(key, exc_class)
+    return table
+
+
+def _classify(ue: UnexpectedInput, input: str) -> GreetSyntaxError:
+    "convert an error from the LALR parser into the matching GreetSyntaxError"
+    table = _error_table()
+    for key in _error_keys(ue):
+        if key in table:
+            exc_class = table[key]
+            break
+    else:
+        exc_class = GreetSyntaxError
+    return exc_class(ue.get_context(input), ue.line, ue.column)
+
+
+def parse(input: str, algorithm: str = DEFAULT_ALGORITHM):
+    parser = get_parser(algorithm)
     try:
-        _parser.parse(input)
+        parser.parse(input)
     except UnexpectedInput as ue:
-        exc_class = ue.match_examples(_parser.parse, {
-            GreetMalformedName: ["name ",
-                                 "nam:",
-                                 "nme:"],
-            GreetMalformedGreeting: ["hello",
-                                     "goodbye"]
-        }, use_accepts=True)
+        if algorithm == LALR:
+            raise _classify(ue, input) from ue
+
+        exc_class = ue.match_examples(parser.parse, _ERROR_EXAMPLES, use_accepts=True)
 
         if not exc_class:
             raise
         raise exc_class(ue.get_context(input), ue.line, ue.column)
 
 
+def parse_tree(input: str) -> Tuple[Tree | None, List[GreetSyntaxError]]:
+    """Parses input with the LALR parser, recovering from errors.  Returns the parse
+       tree, or None if the input couldn't be parsed at all, and every syntax error
+       found.  At most one error is reported per line.
+    """
+    errors: List[GreetSyntaxError] = []
+    error_lines = set()
+
+    def record(ue: UnexpectedInput):
+        if ue.line not in error_lines:
+            error_lines.add(ue.line)
+            errors.append(_classify(ue, input))
+
+    def on_error(ue: UnexpectedInput) -> bool:
+        record(ue)
+        if isinstance(ue, UnexpectedCharacters):
+            # Skip the rest of the line; the parser resumes at the next one
+            state = ue.interactive_parser.lexer_thread.state
+            start = state.line_ctr.char_pos
+            end = input.find("\n", start)
+            state.line_ctr.feed(input[start:] if end == -1 else input[start:end])
+            if "NAME" in ue.allowed:
+                # The skipped characters were the name: stand in for it, as below
+                ue.interactive_parser.feed_token(Token("NAME", ""))
+        elif isinstance(ue, UnexpectedToken) and "NAME" in ue.accepts and ue.token.type in _STATEMENT_STARTS:
+            # A statement is missing its name: complete it so the next one parses
+            ue.interactive_parser.feed_token(Token("NAME", ""))
+            if ue.token.type != "$END":
+                ue.interactive_parser.feed_token(ue.token)
+        # Anything else is a stray token, which is skipped
+        return True
+
+    try:
+        tree = get_parser(LALR).parse(input, on_error=on_error)
+    except UnexpectedInput as ue:
+        # Unrecoverable, e.g. the input has no statements at all
+        record(ue)
+        tree = None
+
+    return tree, errors
+
+
+def parse_errors(input: str) -> List[GreetSyntaxError]:
+    """Parses input with the LALR parser, recovering from errors, and returns every
+       syntax error found.  At most one error is reported per line.
+    """
+    return parse_tree(input)[1]
+
+
+def _token(token: Token, token_type: TokenType) -> greet_parser.Token:
+    # lark counts lines and columns from 1
+    return greet_parser.Token(token.column - 1, token.end_column - 1, token_type, str(token), token.line - 1)
+
+
+def tree_statements(tree: Tree) -> List[NameDefinition | Greeting]:
+    "converts a parse tree from the LALR parser into statements"
+    statements: List[NameDefinition | Greeting] = []
+    for statement in tree.children:
+        node = statement.children[0]
+        if node.data == "name_decl":
+            name = node.children[0]
+            if not name:
+                # Filled in by error recovery
+                continue
+            keyword_start = node.meta.column - 1
+            keyword = greet_parser.Token(keyword_start, keyword_start + len(TokenType.NAME_KEYWORD.value),
+                                         TokenType.NAME_KEYWORD, TokenType.NAME_KEYWORD.value,
+                                         node.meta.line - 1)
+            statements.append(NameDefinition(keyword, _token(name, TokenType.NAME)))
+        else:
+            salutation_node, name = node.children
+            if not name:
+                continue
+            salutation = salutation_node.children[0]
+            statements.append(Greeting(_token(salutation, TokenType[salutation.type]),
+                                       _token(name, TokenType.NAME)))
+    return statements
+
 
 if __name__ == "__main__":
 
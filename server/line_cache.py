@@ -0,0 +1,273 @@
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from lsprotocol.types import (Diagnostic,
+                              Position,
+                              Range,
+                              TextDocumentContentChangeEvent,
+                              TextDocumentContentChangeEvent_Type1)
+
+
+# Validates a single line, returning a diagnostic for it or None if it's fine.
+LineChecker = Callable[[int, str], Optional[Diagnostic]]
+
+
+def _moved(diagnostic: Diagnostic, line_num: int) -> Diagnostic:
+    "return a copy of a single-line diagnostic, moved to the given line"
+    return Diagnostic(
+        range=Range(
+            start=Position(line=line_num, character=diagnostic.range.start.character),
+            end=Position(line=line_num, character=diagnostic.range.end.character)
+        ),
+        message=diagnostic.message,
+        source=diagnostic.source
+    )
+
+
+# Where str.splitlines() ends a line, and the breaks other than \n among them
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+_OTHER_LINE_BREAKS = re.compile(r"[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def line_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) offsets of each line of text, excluding its line break.  Lines
+       are split as str.splitlines() splits them, but none of text is copied."""
+    if _OTHER_LINE_BREAKS.search(text) is None:
+        # The usual case, and quicker to search for
+        start, length, find = 0, len(text), text.find
+        while start < length:
+            end = find("\n", start)
+            if end < 0:
+                end = length
+            yield start, end
+            start = end + 1
+        return
+
+    start = 0
+    for match in _LINE_BREAK.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def line_count(text: str) -> int:
+    "len(text.splitlines()), without making the list"
+    if _OTHER_LINE_BREAKS.search(text) is None:
+        return text.count("\n") + (not text.endswith("\n") and text != "")
+    return sum(1 for _ in line_spans(text))
+
+
+# The characters str.splitlines() ends a line at
+LINE_BREAK_CHARACTERS = "\r\n\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+class LineIndex:
+    """Where each line of a document starts, for converting between positions
+       and offsets in its text without splitting it into lines.
+
+       A line starts at 0 and after every line break, so text ending in a line
+       break has an empty last line, as an editor shows it.  Breaks are where
+       str.splitlines() makes them.  The starts are kept in an array, eight bytes
+       a line; finding the line an offset is on is a binary search.
+
+       An edit only rescans the lines around it.  The lines after it all move by
+       the same amount, so rather than adding that to each, it's recorded as owed
+       by every line from the first of them on, and settled for the lines between
+       there and the next edit when that comes.  So while typing in one place,
+       updating the index takes the same time however long the document.
+    """
+
+    def __init__(self, text):
+        # Signed, as a line's entry can be less than what the lines before it owe
+        self._starts = array("q", self._starts_between(text, 0, len(text), True))
+        self._length = len(text)
+        # The lines from _shift_from on start _shift later than _starts has them
+        self._shift_from = len(self._starts)
+        self._shift = 0
+
+    @staticmethod
+    def _starts_between(text, start: int, end: int, to_end: bool) -> List[int]:
+        """the offsets of the lines that start in text[start:end], which starts a line
+           and ends at the start of one; or if to_end, ends the text"""
+        starts = list(accumulate(map(len, text[start:end].splitlines(True)), initial=start))
+        # That's where each line ends, and the last ends at end: only a line start
+        # if it's the empty line after a final line break
+        starts.pop()
+        if to_end and (end == 0 or text[end - 1] in LINE_BREAK_CHARACTERS):
+            starts.append(end)
+        return starts
+
+    def __len__(self) -> int:
+        "number of lines, including an empty last one"
+        return len(self._starts)
+
+    @property
+    def line_count(self) -> int:
+        "number of lines as str.splitlines() counts them, i.e. without an empty last one"
+        return len(self._starts) - (self.line_start(len(self._starts) - 1) == self._length)
+
+    def line_start(self, line: int) -> int:
+        "the offset of the start of line; the end of the text for a line past the last"
+        if line >= len(self._starts):
+            return self._length
+        if line >= self._shift_from:
+            return self._starts[line] + self._shift
+        return self._starts[line]
+
+    def line(self, text, line: int, keepends: bool = False):
+        "line's text, from the text indexed, with or without its line break; empty past the last line"
+        contents = text[self.line_start(line):self.line_start(line + 1)]
+        return contents if keepends else contents.rstrip(LINE_BREAK_CHARACTERS)
+
+    def offset_at(self, position: Position) -> int:
+        "the offset of position, which is clamped to the end of its line, line break and all"
+        return min(self.line_start(position.line) + position.character, self.line_start(position.line + 1))
+
+    def position_at(self, offset: int) -> Position:
+        "the position of offset"
+        starts, shift_from = self._starts, self._shift_from
+        offset = max(0, min(offset, self._length))
+        if shift_from < len(starts) and offset >= starts[shift_from] + self._shift:
+            line = bisect_right(starts, offset - self._shift, shift_from) - 1
+        else:
+            line = bisect_right(starts, offset, 0, shift_from) - 1
+        return Position(line=line, character=offset - self.line_start(line))
+
+    def apply_edit(self, start: int, end: int, replacement, text) -> None:
+        "update the index for text[start:end] having been replaced, giving text"
+        # The line before the edit too, in case its \r now ends in \r\n, and the
+        # line after, in case the edit's \r is followed by its \n
+        first = max(self.position_at(start).line - 1, 0)
+        last = min(self.position_at(end).line + 2, len(self._starts))
+        delta = len(replacement) - (end - start)
+        self._settle(last)
+
+        to_end = last == len(self._starts)
+        rescan_end = len(text) if to_end else self.line_start(last) + delta
+        starts = self._starts_between(text, self._starts[first], rescan_end, to_end)
+        self._starts[first:last] = array("q", starts)
+        self._shift_from += len(starts) - (last - first)
+        self._owe(first + len(starts), delta)
+        self._length = len(text)
+
+    def _settle(self, line: int) -> None:
+        "pay what's owed by the lines before line"
+        if self._shift_from < line:
+            starts, shift = self._starts, self._shift
+            for i in range(self._shift_from, line):
+                starts[i] += shift
+            self._shift_from = line
+
+    def _owe(self, line: int, delta: int) -> None:
+        "record that the lines from line on start delta later; line is never after _shift_from"
+        if not delta:
+            return
+        starts = self._starts
+        if self._shift and len(starts) - self._shift_from < self._shift_from - line:
+            # Nearer the end: pay off what's owed there instead
+            for i in range(self._shift_from, len(starts)):
+                starts[i] += self._shift
+            self._shift = 0
+        # The lines between don't owe what the ones after them already did
+        for i in range(line, self._shift_from):
+            starts[i] -= self._shift
+        self._shift_from, self._shift = line, self._shift + delta
+
+
+def _line_breaks(text: str) -> int:
+    "number of line breaks in text, counted the same way as str.splitlines()"
+    return len((text + "x").splitlines()) - 1
+
+
+class LineCache:
+    """Per-document cache of the diagnostic (if any) for each line.
+
+       Incremental didChange edits are spliced into the cache so only the lines
+       they touch are re-validated.  Diagnostics for untouched lines are reused
+       as-is, or moved if an edit above them added or removed lines.
+    """
+
+    def __init__(self, check_line: LineChecker):
+        self._check_line = check_line
+        # one entry per line; None until the whole document has been validated once
+        self._diagnostics: List[Optional[Diagnostic]] | None = None
+        self._dirty: Set[int] = set()
+        # line contents -> the diagnostic produced for it, wherever it was seen
+        self._verdicts: Dict[str, Optional[Diagnostic]] = {}
+
+    @property
+    def is_valid(self) -> bool:
+        "True if the cache holds a validated document, so refresh only checks dirty lines"
+        return self._diagnostics is not None
+
+    def seed(self, line_count: int, diagnostics: List[Diagnostic]) -> None:
+        "populate the cache from diagnostics produced by a full parse of a line_count line document"
+        self._diagnostics = [None] * line_count
+        for diagnostic in diagnostics:
+            self._diagnostics[diagnostic.range.start.line] = diagnostic
+        self._dirty.clear()
+
+    def invalidate(self) -> None:
+        "forget all cached lines; the next refresh validates the whole document"
+        self._diagnostics = None
+        self._dirty.clear()
+
+    def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
+        "record a didChange content change, marking the lines it touches as dirty"
+        if self._diagnostics is None:
+            return
+
+        if not isinstance(change, TextDocumentContentChangeEvent_Type1) or "\r" in change.text:
+            # Whole-document replacement, or an edit that may merge line endings
+            self.invalidate()
+            return
+
+        start = change.range.start.line
+        end = change.range.end.line
+        new_count = _line_breaks(change.text) + 1
+        delta = new_count - (end - start + 1)
+
+        self._diagnostics[start:end + 1] = [None] * new_count
+
+        if delta:
+            self._dirty = {i if i < start else i + delta for i in self._dirty if i < start or i > end}
+        self._dirty.update(range(start, start + new_count))
+
+    def refresh(self, source: str, lines: LineIndex | None = None) -> List[Diagnostic]:
+        """bring the cache up to date with source and return the document's diagnostics.
+           Only the dirty lines are read from source, found with lines, its index, if given"""
+        if lines is None:
+            lines = LineIndex(source)
+        count = lines.line_count
+
+        if self._diagnostics is None or len(self._diagnostics) != count:
+            self._diagnostics = [None] * count
+            dirty = range(count)
+        else:
+            dirty = sorted(i for i in self._dirty if i < count)
+        self._dirty = set()
+
+        if len(self._verdicts) > max(1024, 2 * count):
+            self._verdicts.clear()
+
+        for line_num in dirty:
+            line_contents = lines.line(source, line_num)
+            try:
+                diagnostic = self._verdicts[line_contents]
+            except KeyError:
+                diagnostic = self._verdicts[line_contents] = self._check_line(line_num, line_contents)
+            self._diagnostics[line_num] = diagnostic
+
+        diagnostics: List[Diagnostic] = []
+        for line_num, diagnostic in enumerate(self._diagnostics):
+            if diagnostic is None:
+                continue
+            if diagnostic.range.start.line != line_num:
+                diagnostic = self._diagnostics[line_num] = _moved(diagnostic, line_num)
+            diagnostics.append(diagnostic)
+
+        return diagnostics
@@ -0,0 +1,59 @@
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable
+
+DEFAULT_LOG_FILE = "pygls.log"
+DEFAULT_LOG_LEVEL = "WARNING"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues records without formatting them: the listener's thread does that.
+
+       The records never leave the process, so they needn't be made picklable,
+       and the event loop is spared formatting whole messages for pygls's traces.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure(level: str = DEFAULT_LOG_LEVEL, path: str = DEFAULT_LOG_FILE) -> QueueListener:
+    """Send log records at or above level to the file at path, which is truncated.
+       Records are written by a background thread, so logging never waits on the
+       disk; the thread is stopped, and the queue flushed, at exit."""
+    file_handler = logging.FileHandler(path, mode="w")
+    file_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, file_handler)
+    root = logging.getLogger()
+    root.addHandler(_DeferredQueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RateLimiter:
+    """Allows something at most once per interval, e.g. a message to the client.
+
+       `suppressed` counts the times it was refused.
+    """
+
+    def __init__(self, interval: float, clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.suppressed = 0
+        self._clock = clock
+        self._last: float | None = None
+
+    def allow(self) -> bool:
+        now = self._clock()
+        if self._last is not None and now - self._last < self.interval:
+            self.suppressed += 1
+            return False
+        self._last = now
+        return True
@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Tuple, TypeVar
+
+from lsprotocol.types import Diagnostic
+
+from .cancellation import CancellationToken
+
+T = TypeVar("T")
+
+THREAD = "thread"
+PROCESS = "process"
+
+DEFAULT_INLINE_THRESHOLD = 64 * 1024   # characters
+
+# Most full parses whose diagnostics are kept, and most characters of source kept for them
+PARSE_CACHE_SIZE = 256
+PARSE_CACHE_CHARACTERS = 32 * 1024 * 1024
+
+
+def process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Returns a new process pool.  Forking a process that's running the server's IO
+       threads can deadlock the child, so workers start from a clean interpreter.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+class ParseService:
+    """Runs parsing functions on a worker pool so they don't block the event loop.
+
+       Sources shorter than `inline_threshold` characters are parsed inline: for
+       those the cost of handing work to the pool outweighs the parse itself.
+       Functions given to a process pool must be picklable, i.e. defined at module
+       level, as must their arguments and results.
+    """
+
+    def __init__(self, mode: str = THREAD, max_workers: int | None = None,
+                 inline_threshold: int = DEFAULT_INLINE_THRESHOLD):
+        if mode not in (THREAD, PROCESS):
+            raise ValueError(f"Unknown parse service mode '{mode}', expected '{THREAD}' or '{PROCESS}'")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        "the worker pool, created on first use"
+        if self._executor is None:
+            if self.mode == PROCESS:
+                self._executor = process_pool(self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="greet-parse")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], source: str, *args,
+                  token: CancellationToken | None = None) -> T:
+        """return fn(source, *args), computed on the worker pool if source is large.
+
+           If a token is given, fn is passed it too, and it's cancelled if the
+           caller is, so fn can stop at its next checkpoint rather than running to
+           the end for nothing.  A process pool can't share the token: work handed
+           to one runs to the end once it's started.
+        """
+        if token is not None and self.mode == THREAD:
+            fn = functools.partial(fn, token=token)
+        if len(source) < self.inline_threshold:
+            return fn(source, *args)
+
+        future = self.executor.submit(fn, source, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if token is not None:
+                if future.cancel():
+                    # Still queued: none of it was done
+                    token.abandoned(0, len(source))
+                else:
+                    token.cancel()
+            raise
+
+    async def run_in_thread(self, fn: Callable[..., T], source: str, *args) -> T:
+        """return fn(source, *args), computed on a worker thread if source is large.
+           For work whose result can't be sent back from a process, such as a
+           syntax tree, so it's a thread whatever the pool."""
+        if len(source) < self.inline_threshold:
+            return fn(source, *args)
+        if self.mode == THREAD:
+            return await asyncio.wrap_future(self.executor.submit(fn, source, *args))
+        return await asyncio.to_thread(fn, source, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ParseCache:
+    """The diagnostics of the most recent full parses, by backend, source and
+       limit, most recently used last.
+
+       Several clients often open the same file, and one client reopens files it
+       has closed; either way a source that's been parsed before isn't parsed
+       again.  Sources are keys, so a hit is an exact match, never a hash collision.
+       `hits` and `misses` count lookups.
+    """
+
+    def __init__(self, size: int = PARSE_CACHE_SIZE, characters: int = PARSE_CACHE_CHARACTERS):
+        self.size = size
+        self.characters = characters
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[object, str, int | None], List[Diagnostic]] = OrderedDict()
+        self._characters = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, backend: object, source: str, limit: int | None) -> List[Diagnostic] | None:
+        "the diagnostics cached for source, or None if backend hasn't parsed it with this limit"
+        key = (backend, source, limit)
+        diagnostics = self._entries.get(key)
+        if diagnostics is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        # Callers may keep the list they're given
+        return list(diagnostics)
+
+    def put(self, backend: object, source: str, limit: int | None,
+            diagnostics: List[Diagnostic]) -> None:
+        if len(source) > self.characters:
+            return
+        key = (backend, source, limit)
+        if self._entries.pop(key, None) is not None:
+            self._characters -= len(source)
+        self._entries[key] = list(diagnostics)
+        self._characters += len(source)
+        while len(self._entries) > self.size or self._characters > self.characters:
+            (_, evicted, _), _ = self._entries.popitem(last=False)
+            self._characters -= len(evicted)
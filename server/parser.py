@@ -1,13 +1,16 @@
-
+from array import array
 from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from typing import Iterator, List, Sequence, Tuple, Type, overload
 
 from lsprotocol.types import (Diagnostic,
                               Position,
                               Range)
 import re
 
+from .cancellation import CancellationToken, blocks
+from .line_cache import LINE_BREAK_CHARACTERS
+
 
 class TokenType(Enum):
     "Enum of the different token types that can be found in a .greet file."
@@ -15,15 +18,16 @@ class TokenType(Enum):
     HELLO = "Hello"
     GOODBYE = "Goodbye"
     NAME = "[a-zA-Z]+"
-    UNRECOGNISED = "S+" # any non-whitespace
+    UNRECOGNISED = r"[^a-zA-Z\s]+" # any run of non-whitespace that can't start a name
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     start_col: int
     end_col: int
     token_type: TokenType
     token_value: str
+    line: int
 
 @dataclass
 class Statement:
@@ -48,16 +52,134 @@ class UnrecognisedStatement(Statement):
     contents: List[Token]
 
 
-def _scan(source: str) -> List[Token]:
+DIAGNOSTIC_SOURCE = "GreetLanguageServer"
+
+# Bump whenever the grammar, or what's scanned from it, changes: anything cached
+# from scans made under another version is then discarded.
+GRAMMAR_VERSION = 2
+
+_TOKEN_TYPES = list(TokenType)
+
+# Keywords only count as keywords if they aren't the start of a longer name
+_KEYWORD_END = "(?![a-zA-Z])"
+
+# One pattern for every token type, tried in order.  Each alternative is a
+# numbered group, so match.lastindex - 1 is the token type's index in
+# _TOKEN_TYPES; the final group matches a line break, wherever str.splitlines()
+# ends a line, as the line index and line cache do.  Leading spaces and tabs
+# are consumed as part of the match rather than as tokens of their own.
+_MASTER = re.compile(r"[ \t]*(?:" + "|".join([
+    f"({re.escape(TokenType.NAME_KEYWORD.value)})",
+    f"({TokenType.HELLO.value}{_KEYWORD_END})",
+    f"({TokenType.GOODBYE.value}{_KEYWORD_END})",
+    f"({TokenType.NAME.value})",
+    f"({TokenType.UNRECOGNISED.value})",
+    rf"(\r\n|[{re.escape(LINE_BREAK_CHARACTERS)}])",
+]) + ")")
+_NEWLINE = len(_TOKEN_TYPES) + 1
+
+_NAME_KEYWORD = _TOKEN_TYPES.index(TokenType.NAME_KEYWORD)
+_SALUTATIONS = (_TOKEN_TYPES.index(TokenType.HELLO), _TOKEN_TYPES.index(TokenType.GOODBYE))
+# Keywords are names too when they're in a name's position, e.g. "Hello Goodbye"
+_NAMES = (_TOKEN_TYPES.index(TokenType.NAME),) + _SALUTATIONS
+
+
+class TokenList(Sequence[Token]):
+    """The tokens in a source file, stored as parallel arrays of line, start column,
+       end column and token type.  Token objects are only created when accessed.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.lines = array("L")
+        self.start_cols = array("L")
+        self.end_cols = array("L")
+        self.types = array("B")
+        self.line_starts = array("Q", [0])
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @overload
+    def __getitem__(self, index: int) -> Token: ...
+    @overload
+    def __getitem__(self, index: slice) -> List[Token]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        line = self.lines[index]
+        line_start = self.line_starts[line]
+        start_col = self.start_cols[index]
+        end_col = self.end_cols[index]
+        return Token(start_col, end_col, _TOKEN_TYPES[self.types[index]],
+                     self.source[line_start + start_col:line_start + end_col], line)
+
+
+def _scan(source: str) -> TokenList:
     "scan the supplied source, splitting it into a list of tokens"
-    return []
+    tokens = TokenList(source)
+    add_line, add_start, add_end, add_type = (tokens.lines.append, tokens.start_cols.append,
+                                              tokens.end_cols.append, tokens.types.append)
+    add_line_start = tokens.line_starts.append
+
+    line = 0
+    line_start = 0
+    for match in _MASTER.finditer(source):
+        kind = match.lastindex
+        if kind == _NEWLINE:
+            line += 1
+            line_start = match.end()
+            add_line_start(line_start)
+            continue
+        start, end = match.span(kind)
+        add_line(line)
+        add_start(start - line_start)
+        add_end(end - line_start)
+        add_type(kind - 1)
 
+    return tokens
 
-def _parse(tokens: List[Token]) -> List[NameDefinition | Greeting]:
+
+def _statement_spans(tokens: TokenList) -> Iterator[Tuple[int, int, Type[Statement]]]:
+    """yields (first, end, kind) for each statement: its tokens are tokens[first:end] and
+       kind is NameDefinition, Greeting or UnrecognisedStatement.  Works on the token
+       arrays alone, so no Token objects are created.
+    """
+    lines, types = tokens.lines, tokens.types
+
+    # Each line holds one statement
+    first = 0
+    count = len(types)
+    while first < count:
+        line = lines[first]
+        end = first + 1
+        while end < count and lines[end] == line:
+            end += 1
+
+        kind: Type[Statement] = UnrecognisedStatement
+        if end - first == 2 and types[first + 1] in _NAMES:
+            if types[first] == _NAME_KEYWORD:
+                kind = NameDefinition
+            elif types[first] in _SALUTATIONS:
+                kind = Greeting
+        yield first, end, kind
+        first = end
+
+
+def _parse(tokens: TokenList) -> List[NameDefinition | Greeting | UnrecognisedStatement]:
     """parse a list of tokens into a list of valid statements - name definitions or greetings - 
        and any errors found
     """
-    return []
+    statements: List[NameDefinition | Greeting | UnrecognisedStatement] = []
+
+    for first, end, kind in _statement_spans(tokens):
+        if kind is UnrecognisedStatement:
+            statements.append(UnrecognisedStatement(tokens[first:end]))
+        else:
+            statements.append(kind(tokens[first], tokens[first + 1]))
+
+    return statements
 
 
 def parse_definition(line: str) -> NameDefinition | None:
@@ -67,36 +189,61 @@ def parse_definition(line: str) -> NameDefinition | None:
         return None
     
 
-def parse(source: str) -> List[Diagnostic]:
-    
-    diagnostics: List[Diagnostic] = []
+def parse_statements(source: str) -> List[NameDefinition | Greeting | UnrecognisedStatement]:
+    "scan and parse source in a single pass, returning its statements"
+    return _parse(_scan(source))
 
-    greeting = re.compile(r'^(Hello|Goodbye)\s+([a-zA-Z]+)\s*$')
 
-    lines = [line.rstrip() for line in source.splitlines()]
-    for line_num, line_contents in enumerate(lines):
-        if len(line_contents) == 0:
-            # Don't treat blank lines as an error
+def _diagnostics(tokens: TokenList, line_offset: int = 0) -> List[Diagnostic]:
+    "a diagnostic for each unrecognised statement in tokens, which start on line line_offset"
+    diagnostics: List[Diagnostic] = []
+
+    for first, end, kind in _statement_spans(tokens):
+        if kind is not UnrecognisedStatement:
             continue
-        
-        tokens = _scan(line_contents)
-        statements = _parse(tokens)
-
-        unrecognised_tokens = [t for t in tokens if t.token_type == TokenType.UNRECOGNISED]
-        unrecognised_statements = [s for s in statements if type(s) == UnrecognisedStatement]
-
-
-        match = re.match(greeting, line_contents)
-        if match is None:
-            d = Diagnostic(
-                    range=Range(
-                        start=Position(line=line_num, character=0),
-                        end=Position(line=line_num, character=len(line_contents))
-                    ),
-                    message="Greeting must be either 'Hello <name>' or 'Goodbye <name>'",
-                    source=type(greet_server).__name__
-                )
-            diagnostics.append(d)
-
- 
+
+        line = tokens.lines[first] + line_offset
+        if tokens.types[first] == _NAME_KEYWORD:
+            message = "Name declaration must be 'name: <name>'"
+        else:
+            message = "Greeting must be either 'Hello <name>' or 'Goodbye <name>'"
+        d = Diagnostic(
+                range=Range(
+                    start=Position(line=line, character=tokens.start_cols[first]),
+                    end=Position(line=line, character=tokens.end_cols[end - 1])
+                ),
+                message=message,
+                source=DIAGNOSTIC_SOURCE
+            )
+        diagnostics.append(d)
+
+    return diagnostics
+
+
+def parse(source: str, token: CancellationToken | None = None) -> List[Diagnostic]:
+    """returns the diagnostics for source.  Given a token, it's scanned a block at a
+       time, checking for cancellation between blocks."""
+    if token is None:
+        return _diagnostics(_scan(source))
+
+    diagnostics: List[Diagnostic] = []
+    line = 0
+    for block in blocks(source, token):
+        tokens = _scan(block)
+        diagnostics += _diagnostics(tokens, line)
+        line += len(tokens.line_starts) - 1
     return diagnostics
+
+
+def parse_all(source: str) -> Tuple[List[Diagnostic], List[NameDefinition | Greeting | UnrecognisedStatement]]:
+    "returns the diagnostics and the statements for source, from a single scan"
+    tokens = _scan(source)
+    return _diagnostics(tokens), _parse(tokens)
+
+
+def check_line(line_num: int, line: str) -> Diagnostic | None:
+    """Checks a single line, returning its diagnostic if it's invalid.  Each line
+       holds one statement, so lines can be checked independently of each other.
+    """
+    diagnostics = _diagnostics(_scan(line), line_num)
+    return diagnostics[0] if diagnostics else None
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import Callable, Dict, List
+
+from lsprotocol.types import Diagnostic
+
+# A burst of this many publishes in one interval is sent straight away...
+DEFAULT_BURST = 10
+DEFAULT_INTERVAL_IN_SECONDS = 0.1
+# ...and beyond it, at most this many are sent per interval
+DEFAULT_BATCH_SIZE = 50
+
+
+class DiagnosticsPublisher:
+    """Publishes each document's diagnostics only when they've changed.
+
+       The diagnostics last sent for each document are kept, and sending the same
+       again is skipped: `unchanged` counts those.  Publishes are sent straight
+       away until `burst` have gone in one interval, as when many documents are
+       opened at once.  After that they're queued and sent in batches of at most
+       `batch_size` per interval; a document queued again before its batch goes
+       is only sent once, and `coalesced` counts the publishes replaced that way.
+    """
+
+    def __init__(self, send: Callable[[str, List[Diagnostic]], None],
+                 burst: int = DEFAULT_BURST, interval: float = DEFAULT_INTERVAL_IN_SECONDS,
+                 batch_size: int = DEFAULT_BATCH_SIZE, clock: Callable[[], float] = time.monotonic):
+        self.burst = burst
+        self.interval = interval
+        self.batch_size = batch_size
+        self.published = 0
+        self.unchanged = 0
+        self.coalesced = 0
+        self._send = send
+        self._clock = clock
+        self._sent: Dict[str, List[Diagnostic]] = {}
+        self._pending: Dict[str, List[Diagnostic]] = {}
+        self._flush: asyncio.TimerHandle | None = None
+        self._window_start = float("-inf")
+        self._window_count = 0
+
+    @property
+    def suppressed(self) -> int:
+        "publishes that were never sent"
+        return self.unchanged + self.coalesced
+
+    def publish(self, uri: str, diagnostics: List[Diagnostic]) -> None:
+        if self._pending.pop(uri, None) is not None:
+            self.coalesced += 1
+        if self._sent.get(uri) == diagnostics:
+            self.unchanged += 1
+            return
+
+        if self._take_slot():
+            self._publish_now(uri, diagnostics)
+        else:
+            self._pending[uri] = diagnostics
+            if self._flush is None:
+                delay = self._window_start + self.interval - self._clock()
+                self._flush = asyncio.get_running_loop().call_later(max(0, delay), self._send_batch)
+
+    def forget(self, uri: str) -> None:
+        "drop what's been sent for a closed document, so it's published afresh if reopened"
+        self._sent.pop(uri, None)
+        self._pending.pop(uri, None)
+
+    def close(self) -> None:
+        "drop any queued publishes, e.g. because the client has gone"
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        self._pending.clear()
+
+    def _take_slot(self) -> bool:
+        "True if another publish can be sent in the current interval"
+        if self._pending:
+            # Keep the queued ones in order
+            return False
+        now = self._clock()
+        if now - self._window_start >= self.interval:
+            self._window_start, self._window_count = now, 0
+        if self._window_count >= self.burst:
+            return False
+        self._window_count += 1
+        return True
+
+    def _publish_now(self, uri: str, diagnostics: List[Diagnostic]) -> None:
+        self._send(uri, diagnostics)
+        self._sent[uri] = list(diagnostics)
+        self.published += 1
+
+    def _send_batch(self) -> None:
+        self._flush = None
+        batch = list(self._pending)[:self.batch_size]
+        self._window_start, self._window_count = self._clock(), len(batch)
+        for uri in batch:
+            self._publish_now(uri, self._pending.pop(uri))
+        if self._pending:
+            self._flush = asyncio.get_running_loop().call_later(self.interval, self._send_batch)
@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from lsprotocol.types import Diagnostic
+
+from .backends import get_backend
+from .symbol_cache import check_files, content_hash
+
+
+def result_id(backend_name: str, limit: int | None, content: bytes) -> str:
+    """the resultId of the diagnostics for content: the same content checked the same
+       way has the same diagnostics, whichever client asks and however often it's
+       reconnected since"""
+    return _result_id(backend_name, limit, content_hash(content))
+
+
+def _result_id(backend_name: str, limit: int | None, digest: bytes) -> str:
+    # With the backend's version, so results from before it changed aren't taken as current
+    return f"{backend_name}:{get_backend(backend_name).version}:{limit or 0}:{digest.hex()}"
+
+
+class ResultIds:
+    """The resultId of each open document's diagnostics.  A document's content is
+       only hashed again when its version changes; one without a version, i.e.
+       not open, is hashed every time.
+    """
+
+    def __init__(self):
+        # uri -> (version, resultId)
+        self._ids: Dict[str, Tuple[int | None, str]] = {}
+
+    def get(self, uri: str, version: int | None, source: str,
+            backend_name: str, limit: int | None) -> str:
+        known = self._ids.get(uri)
+        if known is not None and known[0] == version:
+            return known[1]
+        current = result_id(backend_name, limit, source.encode("utf-8"))
+        if version is not None:
+            self._ids[uri] = (version, current)
+        return current
+
+    def forget(self, uri: str) -> None:
+        self._ids.pop(uri, None)
+
+
+class FileReport(NamedTuple):
+    path: str
+    result_id: str
+    # None if the file hasn't changed since the client's previous result
+    diagnostics: List[Diagnostic] | None
+    # hash of the file's content
+    digest: bytes = b""
+    # the diagnostics as JSON, if they were checked here rather than found in the cache
+    fresh: List[Dict[str, Any]] | None = None
+
+
+def diagnose_files(paths: List[str], previous: Dict[str, str], backend_name: str,
+                   limit: int | None, cache_path: str | None = None) -> List[FileReport]:
+    """Checks each file with the named backend, unless its resultId is the one in
+       previous for its path, or the cache at cache_path holds its diagnostics.
+       Files that can't be read are left out.  Runs on the parse service's pool,
+       so takes and returns picklable data; the caller stores fresh diagnostics."""
+    from pygls.protocol import default_converter
+
+    def unchanged(path: str, digest: bytes) -> bool:
+        return previous.get(path) == _result_id(backend_name, limit, digest)
+
+    structure = default_converter().structure
+    reports: List[FileReport] = []
+    for result in check_files(paths, backend_name, limit, cache_path, unchanged):
+        if result.error is not None:
+            continue
+        diagnostics = None if result.diagnostics is None else structure(result.diagnostics, List[Diagnostic])
+        reports.append(FileReport(result.path, _result_id(backend_name, limit, result.digest), diagnostics,
+                                  result.digest, result.diagnostics if result.fresh else None))
+    return reports
@@ -0,0 +1,79 @@
+import re
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from lsprotocol.types import Diagnostic, Position, Range
+
+from .cancellation import CancellationToken
+from .line_cache import line_spans
+from .parser import DIAGNOSTIC_SOURCE, Greeting, Token, TokenType, UnrecognisedStatement
+
+_GREETING = re.compile(r'^(Hello|Goodbye)\s+([a-zA-Z]+)\s*$')
+# The same, for matching a whole line in place in the source: `^` wouldn't match there
+_GREETING_LINE = re.compile(r'(Hello|Goodbye)\s+([a-zA-Z]+)\s*')
+_BLANK_LINE = re.compile(r'\s*')
+
+# Lines checked between checks for cancellation
+CHECKPOINT_LINES = 4096
+
+
+def _diagnostic(line_num: int, length: int) -> Diagnostic:
+    return Diagnostic(
+            range=Range(
+                start=Position(line=line_num, character=0),
+                end=Position(line=line_num, character=length)
+            ),
+            message="Greeting must be either 'Hello <name>' or 'Goodbye <name>'",
+            source=DIAGNOSTIC_SOURCE
+        )
+
+
+def check_line(line_num: int, line: str) -> Optional[Diagnostic]:
+    """Checks a single line of a greeting file.  Returns a diagnostic if it's invalid, None otherwise"""
+    line_contents = line.rstrip()
+    if len(line_contents) == 0:
+        # Don't treat blank lines as an error
+        return None
+
+    if _GREETING.match(line_contents) is None:
+        return _diagnostic(line_num, len(line_contents))
+    return None
+
+
+def iter_diagnostics(source: str, token: CancellationToken | None = None) -> Iterator[Diagnostic]:
+    """Yields the diagnostics for a greeting file as its lines are checked.  Each line
+       is matched where it lies in source rather than being copied out, so however
+       big the file, the only memory used is for the diagnostics the caller keeps.
+       Given a token, checks every CHECKPOINT_LINES lines whether it's been cancelled."""
+    for line_num, (start, end) in enumerate(line_spans(source)):
+        if token is not None and line_num % CHECKPOINT_LINES == 0:
+            token.checkpoint(start, len(source))
+        if (_GREETING_LINE.fullmatch(source, start, end) is None
+                and _BLANK_LINE.fullmatch(source, start, end) is None):
+            yield _diagnostic(line_num, len(source[start:end].rstrip()))
+
+
+def parse(source: str, limit: int | None = None,
+          token: CancellationToken | None = None) -> List[Diagnostic]:
+    """Parses a greeting file.  Generates diagnostic messages for any problems found,
+       stopping after limit of them if given, or if token is cancelled"""
+    return list(islice(iter_diagnostics(source, token), limit))
+
+
+def parse_statements(source: str) -> List[Greeting | UnrecognisedStatement]:
+    """returns the greetings in source, one per line, and an unrecognised statement
+       for any other line that isn't blank.  The regex knows nothing of name declarations.
+    """
+    statements: List[Greeting | UnrecognisedStatement] = []
+    for line_num, line in enumerate(source.splitlines()):
+        match = _GREETING.match(line.rstrip())
+        if match is not None:
+            salutation = TokenType.HELLO if match.group(1) == TokenType.HELLO.value else TokenType.GOODBYE
+            statements.append(Greeting(
+                Token(match.start(1), match.end(1), salutation, match.group(1), line_num),
+                Token(match.start(2), match.end(2), TokenType.NAME, match.group(2), line_num)))
+        elif line.strip():
+            contents = line.rstrip()
+            statements.append(UnrecognisedStatement(
+                [Token(0, len(contents), TokenType.UNRECOGNISED, contents, line_num)]))
+    return statements
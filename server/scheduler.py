@@ -0,0 +1,65 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict
+
+
+class DiagnosticsScheduler:
+    """Coalesces diagnostics work per document.
+
+       Each call to `schedule` waits `debounce_interval` seconds before running
+       its work.  Scheduling a newer version of a document cancels any work still
+       pending or running for an older version, so only the latest version gets
+       parsed and published.  `skipped` counts the parses dropped that way.
+    """
+
+    def __init__(self, debounce_interval: float):
+        self.debounce_interval = debounce_interval
+        self.skipped = 0
+        self.completed = 0
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._versions: Dict[str, int | None] = {}
+
+    def schedule(self, uri: str, version: int | None,
+                 work: Callable[[], Awaitable[Any] | Any]) -> asyncio.Task:
+        "run work for the given document version once the debounce interval expires"
+        self.track(uri, version)
+        task = asyncio.ensure_future(self._run(uri, work))
+        self._pending[uri] = task
+        return task
+
+    def track(self, uri: str, version: int | None) -> None:
+        "record version as the latest for uri, superseding any work pending for older versions"
+        self.cancel(uri)
+        self._versions[uri] = version
+
+    def cancel(self, uri: str) -> None:
+        "cancel any work pending for uri, e.g. because it's been superseded or closed"
+        task = self._pending.pop(uri, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.skipped += 1
+
+    def forget(self, uri: str) -> None:
+        "cancel pending work and drop all state for a closed document"
+        self.cancel(uri)
+        self._versions.pop(uri, None)
+
+    def cancel_all(self) -> None:
+        "cancel the work pending for every document, e.g. because the client has gone"
+        for uri in list(self._pending):
+            self.cancel(uri)
+
+    def is_current(self, uri: str, version: int | None) -> bool:
+        "True if version is the latest one scheduled for uri"
+        return self._versions.get(uri) == version
+
+    async def _run(self, uri: str, work: Callable[[], Awaitable[Any] | Any]) -> None:
+        try:
+            await asyncio.sleep(self.debounce_interval)
+            result = work()
+            if inspect.isawaitable(result):
+                await result
+            self.completed += 1
+        finally:
+            if self._pending.get(uri) is asyncio.current_task():
+                del self._pending[uri]
@@ -0,0 +1,125 @@
+from array import array
+from typing import Dict, List, NamedTuple
+
+from lsprotocol.types import SemanticTokensEdit
+
+from .cancellation import CancellationToken, blocks
+from .parser import _scan, _statement_spans, _NAME_KEYWORD, _NAMES, _SALUTATIONS, TokenList
+
+# Semantic token types, in legend order: a token's type is its index here.
+# "salutation" and "name" aren't standard LSP types, so the extension declares
+# them in package.json as subtypes of "keyword" and "variable".
+KEYWORD = 0
+SALUTATION = 1
+NAME = 2
+TOKEN_TYPES = ["keyword", "salutation", "name"]
+
+
+def _token_type(token_type: int, first: bool) -> int | None:
+    "the semantic token type for a scanned token, or None if it isn't highlighted"
+    if token_type == _NAME_KEYWORD:
+        return KEYWORD
+    if first and token_type in _SALUTATIONS:
+        return SALUTATION
+    if token_type in _NAMES:
+        # Includes keywords in a name's position, e.g. "Hello Goodbye"
+        return NAME
+    return None
+
+
+def encode(source: str, line_offset: int = 0, token: CancellationToken | None = None) -> List[int]:
+    """Encodes the semantic tokens in source, as relative positions in the form
+       https://microsoft.github.io/language-server-protocol/specification#textDocument_semanticTokens
+       describes.  line_offset is the line source starts on in its document, for
+       encoding just part of one.  A single scan, so linear in the size of source.
+       Given a token, it's scanned a block at a time, checking for cancellation
+       between blocks.
+    """
+    data = array("L")
+    if token is None:
+        _encode(_scan(source), data, -line_offset)
+        return data.tolist()
+
+    last_line = -line_offset
+    for block in blocks(source, token):
+        tokens = _scan(block)
+        # The next block's lines count from its own first line
+        last_line = _encode(tokens, data, last_line) - (len(tokens.line_starts) - 1)
+    return data.tolist()
+
+
+def _encode(tokens: TokenList, data: array, last_line: int) -> int:
+    """appends the encoding of tokens to data, given the line of the token before
+       them counted from their first line; returns the line of the last of them"""
+    lines, start_cols, end_cols, types = tokens.lines, tokens.start_cols, tokens.end_cols, tokens.types
+
+    append = data.append
+    last_start = 0
+    for first, end, _ in _statement_spans(tokens):
+        for i in range(first, end):
+            token_type = _token_type(types[i], i == first)
+            if token_type is None:
+                continue
+            line, start = lines[i], start_cols[i]
+            if line != last_line:
+                last_start = 0
+            append(line - last_line)
+            append(start - last_start)
+            append(end_cols[i] - start)
+            append(token_type)
+            append(0)
+            last_line, last_start = line, start
+
+    return last_line
+
+
+def diff(previous: List[int], current: List[int]) -> List[SemanticTokensEdit]:
+    """returns the edits that turn previous into current: a single edit replacing
+       whatever lies between their common prefix and common suffix, if anything does
+    """
+    limit = min(len(previous), len(current))
+    prefix = 0
+    while prefix < limit and previous[prefix] == current[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and previous[-1 - suffix] == current[-1 - suffix]):
+        suffix += 1
+
+    if prefix == len(previous) == len(current):
+        return []
+    return [SemanticTokensEdit(start=prefix,
+                               delete_count=len(previous) - prefix - suffix,
+                               data=current[prefix:len(current) - suffix])]
+
+
+class _Result(NamedTuple):
+    result_id: str
+    data: List[int]
+
+
+class SemanticTokensCache:
+    """The semantic tokens last sent for each document, so that a delta request
+       can be answered with just what changed since.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, _Result] = {}
+        self._next_id = 0
+
+    def store(self, uri: str, data: List[int]) -> str:
+        "remember data as the latest result for uri, returning its result id"
+        self._next_id += 1
+        result_id = str(self._next_id)
+        self._results[uri] = _Result(result_id, data)
+        return result_id
+
+    def previous(self, uri: str, result_id: str) -> List[int] | None:
+        "the data sent for uri as result_id, or None if that's no longer the latest result"
+        result = self._results.get(uri)
+        if result is None or result.result_id != result_id:
+            return None
+        return result.data
+
+    def forget(self, uri: str) -> None:
+        self._results.pop(uri, None)
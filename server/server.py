@@ -18,23 +18,32 @@
 ############################################################################
 import asyncio
 import json
-import re
+import logging
+import os
+import sys
 import time
 import uuid
 from json import JSONDecodeError
-from typing import List, Optional
+from threading import Event
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple
 
 # Command and notification names
-from lsprotocol.types import (TEXT_DOCUMENT_COMPLETION, TEXT_DOCUMENT_DID_CHANGE,
+from lsprotocol.types import (COMPLETION_ITEM_RESOLVE, INITIALIZED, PROGRESS,
+                               TEXT_DOCUMENT_COMPLETION, TEXT_DOCUMENT_DIAGNOSTIC,
+                               TEXT_DOCUMENT_DID_CHANGE,
                                TEXT_DOCUMENT_DID_CLOSE, TEXT_DOCUMENT_DID_OPEN,
                                TEXT_DOCUMENT_REFERENCES,
-                               TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL)
+                               TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL,
+                               TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL_DELTA,
+                               TEXT_DOCUMENT_SEMANTIC_TOKENS_RANGE,
+                               WORKSPACE_DIAGNOSTIC)
 
 # Datatypes passed in commands/responses/notifications
-from lsprotocol.types import (CompletionItem, CompletionList, CompletionOptions,
+from lsprotocol.types import (CompletionItem, CompletionItemKind, CompletionList, CompletionOptions,
                               CompletionParams, ConfigurationItem,
                               # document didChange/didOpen notifications
                               DidOpenTextDocumentParams, 
+                              InitializedParams,
                               DidChangeTextDocumentParams,
                               
                               # Returning diagnostics when issues detected with source file
@@ -42,12 +51,23 @@ from lsprotocol.types import (CompletionItem, CompletionList, CompletionOptions,
                               Range, 
                               DidCloseTextDocumentParams,
 
+                              # Diagnostics the client asks for
+                              DiagnosticOptions, DocumentDiagnosticParams, ProgressParams,
+                              RelatedFullDocumentDiagnosticReport,
+                              RelatedUnchangedDocumentDiagnosticReport,
+                              WorkspaceDiagnosticParams, WorkspaceDiagnosticReport,
+                              WorkspaceDiagnosticReportPartialResult,
+                              WorkspaceFullDocumentDiagnosticReport,
+                              WorkspaceUnchangedDocumentDiagnosticReport,
+
                               MessageType, Position,
                               Registration, RegistrationParams,
-                              SemanticTokens, SemanticTokensLegend, SemanticTokensParams,
+                              SemanticTokens, SemanticTokensDelta, SemanticTokensDeltaParams,
+                              SemanticTokensLegend, SemanticTokensParams, SemanticTokensRangeParams,
                               Unregistration, UnregistrationParams,
-                              WorkDoneProgressBegin, WorkDoneProgressEnd,
-                              WorkDoneProgressReport,
+                              WINDOW_WORK_DONE_PROGRESS_CANCEL,
+                              WorkDoneProgressBegin, WorkDoneProgressCancelParams,
+                              WorkDoneProgressEnd, WorkDoneProgressReport,
                               WorkspaceConfigurationParams)
 
 # textDocument/definition: return the location where a symbol is defined
@@ -55,181 +75,762 @@ from lsprotocol.types import ( TEXT_DOCUMENT_DEFINITION, # command alias
                                DefinitionParams,         # command params
                                LocationLink)             # response
 
+# textDocument/references: return the locations where a symbol is used
+from lsprotocol.types import ( ReferenceParams,          # command params
+                               Location)                 # response
+
 from pygls.server import LanguageServer
+from pygls.uris import from_fs_path, to_fs_path
+
+from .cancellation import Cancelled, CancellationStats, LatestRequests
+from .document import DocumentProtocol, GreetDocument
+from .index import Symbol, SessionIndex, WorkspaceIndex, location, read_source, scan_symbols
+from .logs import RateLimiter
+from .backends import Backend, DocumentState, get_backend
+from .parser import TokenType
+# The original regex checker, under the names it had when it lived here
+from .regex_parser import check_line as _check_line, parse as _parse_greet
+from .parse_service import ParseCache, ParseService, process_pool
+from .publisher import DiagnosticsPublisher
+from .scheduler import DiagnosticsScheduler
+from . import semantic_tokens
+from .semantic_tokens import SemanticTokensCache
+
+# Only needed for some commands, transports and settings, so imported where
+# they're used to keep them off the way to the first response
+if TYPE_CHECKING:
+    from .pull_diagnostics import ResultIds
+    from .stats import ServerStats
+    from .symbol_cache import SymbolCache
 
 COUNT_DOWN_START_IN_SECONDS = 10
 COUNT_DOWN_SLEEP_IN_SECONDS = 1
+DEBOUNCE_INTERVAL_IN_SECONDS = 0.3
+STATS_DUMP_INTERVAL_IN_SECONDS = 10
+# Least time between 'Parsing greeting...' messages in the client's log
+PARSE_LOG_INTERVAL_IN_SECONDS = 5
+# Most diagnostics published for one document; None for no limit
+MAX_DIAGNOSTICS = 1000
+# Most names returned by one completion request
+COMPLETION_LIMIT = 100
+# Locations gathered for a references request between chances to see it cancelled
+REFERENCES_CHECKPOINT_INTERVAL = 1000
+# Files checked together for a workspace diagnostics request, and reported together
+WORKSPACE_DIAGNOSTIC_CHUNK_SIZE = 64
+
+logger = logging.getLogger(__name__)
 
 
 class GreetLanguageServer(LanguageServer):
     CMD_PROGRESS = 'progress'
     CMD_REGISTER_COMPLETIONS = 'registerCompletions'
     CMD_UNREGISTER_COMPLETIONS = 'unregisterCompletions'
+    CMD_STATS = 'greet/stats'
 
     CONFIGURATION_SECTION = 'jsonServer'
 
-    def __init__(self, *args):
-        super().__init__(*args)
+    def __init__(self, *args, protocol_cls=DocumentProtocol, **kwargs):
+        # Per-method statistics, if enabled; needed by the protocol as it's created
+        self.stats: "ServerStats | None" = None
+        # where the statistics are written in Prometheus format; None to not write them
+        self.stats_path: str | None = None
+        # (decorator, name, options, function) for each feature and command registered,
+        # so that each session can register them again
+        self._registrations: List[Tuple[str, str, Any, Callable]] = []
+        super().__init__(*args, protocol_cls=protocol_cls, **kwargs)
+        self.backend: Backend = get_backend()
+        self.document_states: Dict[str, DocumentState] = {}
+        self.diagnostics_scheduler = DiagnosticsScheduler(DEBOUNCE_INTERVAL_IN_SECONDS)
+        self.diagnostics_publisher = DiagnosticsPublisher(self.publish_diagnostics)
+        self.max_diagnostics: int | None = MAX_DIAGNOSTICS
+        self._diagnostic_result_ids: "ResultIds | None" = None
+        self.parse_service = ParseService()
+        self.parse_cache = ParseCache()
+        self.parse_log = RateLimiter(PARSE_LOG_INTERVAL_IN_SECONDS)
+        self.index = SessionIndex(WorkspaceIndex())
+        # workspace folders already indexed, so a client opening one again doesn't redo it
+        self.indexed_roots: Set[str] = set()
+        self.semantic_tokens = SemanticTokensCache()
+        # the semantic tokens request being worked on for each document, which a newer one supersedes
+        self.semantic_tokens_requests = LatestRequests()
+        # what cancelling requests and superseded work saved
+        self.cancellations = CancellationStats()
+        # progress token -> the indexing task it reports on
+        self.indexing_tasks: Dict[str, asyncio.Task] = {}
+        # where scanned symbols persist between runs; None, unless the entry point sets it, to disable
+        self.symbol_cache_path: str | None = None
+        self._symbol_cache: "SymbolCache | None" = None
+        # Serving over TCP or WebSockets, the sessions of the clients connected;
+        # in a session, the server it belongs to
+        self.sessions: Set[GreetLanguageServer] = set()
+        self.parent: GreetLanguageServer | None = None
+
+    def feature(self, feature_name: str, options: Any = None):
+        register = super().feature(feature_name, options)
+
+        def decorator(f):
+            self._registrations.append(("feature", feature_name, options, f))
+            return register(f)
+        return decorator
+
+    def command(self, command_name: str):
+        register = super().command(command_name)
+
+        def decorator(f):
+            self._registrations.append(("command", command_name, None, f))
+            return register(f)
+        return decorator
+
+    @property
+    def diagnostic_result_ids(self) -> "ResultIds":
+        "the resultId of each open document's diagnostics, for clients that pull them"
+        if self._diagnostic_result_ids is None:
+            from .pull_diagnostics import ResultIds
+            self._diagnostic_result_ids = ResultIds()
+        return self._diagnostic_result_ids
+
+    @property
+    def symbol_cache(self) -> "SymbolCache | None":
+        "the on-disk symbol cache, opened on first use; None if disabled or unusable"
+        if self._symbol_cache is None and self.symbol_cache_path is not None:
+            import sqlite3
+            from .symbol_cache import SymbolCache
+            try:
+                self._symbol_cache = SymbolCache(self.symbol_cache_path)
+            except (OSError, sqlite3.Error):
+                logger.exception("Can't open symbol cache %s; continuing without it",
+                                 self.symbol_cache_path)
+                self.symbol_cache_path = None
+        return self._symbol_cache
+
+    def enable_stats(self, path: str | None = None,
+                     interval: float = STATS_DUMP_INTERVAL_IN_SECONDS):
+        """Start recording per-method statistics, writing them to path every interval
+           seconds and at shutdown.  Call once every feature has been registered and
+           before the server starts, so every handler and the transport are measured."""
+        from .stats import ServerStats
+        self.stats = ServerStats()
+        self.stats.instrument(self.lsp.fm)
+        self.stats_path = path
+        if path is not None:
+            self.loop.call_later(interval, self._dump_stats, interval)
+
+    def _dump_stats(self, interval: float | None = None):
+        try:
+            self.stats.dump(self.stats_path)
+        except OSError:
+            logger.exception("Can't write statistics to %s", self.stats_path)
+        if interval is not None:
+            self.loop.call_later(interval, self._dump_stats, interval)
+
+    def new_session(self) -> "GreetLanguageServer":
+        """Returns a server for one more client of this one.
+
+           It has the same features and settings, and its own open documents and
+           the state kept for them.  It shares this server's event loop, worker
+           pools, statistics and cancellation counts, symbol and parse caches, and
+           workspace index: the session's open documents are indexed in an overlay
+           the other sessions don't see.
+        """
+        from .sessions import SessionProtocol, restore_event_loop
+        session = GreetLanguageServer(self.name, self.version, loop=self.loop,
+                                      protocol_cls=SessionProtocol)
+        restore_event_loop(self.loop)
+        session.parent = self
+        for decorator, name, options, f in self._registrations:
+            if decorator == "feature":
+                session.lsp.fm.feature(name, options)(f)
+            else:
+                session.lsp.fm.command(name)(f)
+        session.stats = self.stats
+        if self.stats is not None:
+            self.stats.instrument(session.lsp.fm)
+
+        session.backend = self.backend
+        session.max_diagnostics = self.max_diagnostics
+        session.diagnostics_scheduler.debounce_interval = self.diagnostics_scheduler.debounce_interval
+        session.parse_log.interval = self.parse_log.interval
+        session.parse_service = self.parse_service
+        session.parse_cache = self.parse_cache
+        session.cancellations = self.cancellations
+        session.index = SessionIndex(self.index.shared)
+        session.indexed_roots = self.indexed_roots
+        session.symbol_cache_path = None
+        session._symbol_cache = self.symbol_cache
+        self.sessions.add(session)
+        return session
+
+    def end_session(self):
+        """The client has gone: stop the work pending for it and drop its state"""
+        if self.parent is None or self not in self.parent.sessions:
+            return
+        self.parent.sessions.discard(self)
+        for task in self.indexing_tasks.values():
+            task.cancel()
+        self.diagnostics_scheduler.cancel_all()
+        self.diagnostics_publisher.close()
+        logger.info("Session ended; %d remain", len(self.parent.sessions))
+
+    def start_tcp(self, host: str, port: int) -> None:
+        """Starts TCP server.  Each client that connects gets a session of its own,
+           and the server carries on when one disconnects."""
+        logger.info('Starting TCP server on %s:%s', host, port)
+
+        self._stop_event = Event()
+        self._server = self.loop.run_until_complete(
+            self.loop.create_server(lambda: self.new_session().lsp, host, port)
+        )
+        try:
+            self.loop.run_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.shutdown()
+
+    def start_ws(self, host: str, port: int) -> None:
+        """Starts WebSocket server, with a session for each client as start_tcp has."""
+        from pygls.server import WebSocketTransportAdapter
+        try:
+            from websockets.server import serve
+        except ImportError:
+            logger.error('Run `pip install pygls[ws]` to install `websockets`.')
+            sys.exit(1)
+
+        logger.info('Starting WebSocket server on %s:%s', host, port)
+
+        self._stop_event = Event()
+
+        async def connection_made(websocket, _):
+            session = self.new_session()
+            session.lsp._send_only_body = True  # Don't send headers within the payload
+            session.lsp.transport = WebSocketTransportAdapter(websocket, self.loop)
+            try:
+                async for message in websocket:
+                    session.lsp._procedure_handler(
+                        json.loads(message, object_hook=session.lsp._deserialize_message)
+                    )
+            finally:
+                session.end_session()
+
+        start_server = serve(connection_made, host, port, loop=self.loop)
+        self._server = start_server.ws_server
+        self.loop.run_until_complete(start_server)
+
+        try:
+            self.loop.run_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self._stop_event.set()
+            self.shutdown()
+
+    def shutdown(self):
+        for session in list(self.sessions):
+            session.end_session()
+        if self.stats is not None and self.stats_path is not None:
+            self._dump_stats()
+        self.parse_service.shutdown()
+        if self._symbol_cache is not None:
+            self._symbol_cache.close()
+        super().shutdown()
 
 
 greet_server = GreetLanguageServer('pygls-json-example', 'v0.1')
 
 
-def _parse(ls: GreetLanguageServer, params: DidOpenTextDocumentParams | DidChangeTextDocumentParams):
-    ls.show_message_log('Parsing greeting...')
+def _document_state(ls: GreetLanguageServer, uri: str) -> DocumentState:
+    state = ls.document_states.get(uri)
+    if state is None:
+        state = ls.document_states[uri] = ls.backend.document_state()
+    return state
+
+
+async def _check(ls: GreetLanguageServer, source: str) -> List[Diagnostic]:
+    "the diagnostics for the whole of source, from the parse cache if it's been checked before"
+    diagnostics = ls.parse_cache.get(ls.backend, source, ls.max_diagnostics)
+    if diagnostics is None:
+        diagnostics = await ls.parse_service.run(ls.backend.check, source, ls.max_diagnostics,
+                                                 token=ls.cancellations.token("parse"))
+        ls.parse_cache.put(ls.backend, source, ls.max_diagnostics, diagnostics)
+    return diagnostics
+
+
+def _client_pulls_diagnostics(ls: GreetLanguageServer) -> bool:
+    "True if the client asks for diagnostics, so they mustn't be pushed to it as well"
+    capabilities = getattr(ls.lsp, "client_capabilities", None)
+    text_document = getattr(capabilities, "text_document", None)
+    return getattr(text_document, "diagnostic", None) is not None
+
+
+async def _parse(ls: GreetLanguageServer, params: DidOpenTextDocumentParams | DidChangeTextDocumentParams):
+    # Not on every keystroke: that would double the traffic to the client
+    if ls.parse_log.allow():
+        ls.show_message_log('Parsing greeting...')
 
     text_doc = ls.workspace.get_document(params.text_document.uri)
+    uri, version = text_doc.uri, params.text_document.version
 
     source = text_doc.source
-    diagnostics = _parse_greet(source) if source else []
-
-    ls.publish_diagnostics(text_doc.uri, diagnostics)
-
-
-def _parse_greet(source: str) -> List[Diagnostic]:
-    """Parses a greeting file.  Generates diagnostic messages for any problems found"""
-    diagnostics: List[Diagnostic] = []
-
-    grammar = re.compile(r'^(Hello|Goodbye)\s+([a-zA-Z]+)\s*$')
-
-    lines = [line.rstrip() for line in source.splitlines()]
-    for line_num, line_contents in enumerate(lines):
-        if len(line_contents) == 0:
-            # Don't treat blank lines as an error
-            continue
-        
-        match = re.match(grammar, line_contents)
-        if match is None:
-            d = Diagnostic(
-                    range=Range(
-                        start=Position(line=line_num, character=0),
-                        end=Position(line=line_num, character=len(line_contents))
-                    ),
-                    message="Greeting must be either 'Hello <name>' or 'Goodbye <name>'",
-                    source=type(greet_server).__name__
-                )
-            diagnostics.append(d)
-
- 
-    return diagnostics
+    state = _document_state(ls, uri)
+    if state.is_valid:
+        # Only the edits need checking, so it's cheap enough to do inline
+        diagnostics = state.refresh(source, text_doc.line_index)[:ls.max_diagnostics]
+    else:
+        diagnostics = await _check(ls, source)
+        if not ls.diagnostics_scheduler.is_current(uri, version):
+            # The document changed while it was being parsed
+            return
+        if ls.max_diagnostics is None or len(diagnostics) < ls.max_diagnostics:
+            # Seeding needs every diagnostic, so a document with more than the
+            # limit is checked in full again after each edit
+            prepared = await ls.parse_service.run_in_thread(state.prepare, source)
+            if not ls.diagnostics_scheduler.is_current(uri, version):
+                return
+            state.seed(source, diagnostics, prepared)
+
+    if not ls.diagnostics_scheduler.is_current(uri, version):
+        return
+    if not _client_pulls_diagnostics(ls):
+        ls.diagnostics_publisher.publish(uri, diagnostics)
+
+    symbols = await ls.parse_service.run(scan_symbols, source, token=ls.cancellations.token("symbols"))
+    if ls.diagnostics_scheduler.is_current(uri, version):
+        ls.index.update(uri, symbols)
 
 
 @greet_server.feature(TEXT_DOCUMENT_DID_OPEN)
 async def did_open(ls, params: DidOpenTextDocumentParams):
     """Text document did open notification."""
     ls.show_message('Text Document Did Open')
-    _parse(ls, params)
+    uri = params.text_document.uri
+    _document_state(ls, uri).invalidate()
+    ls.diagnostics_scheduler.track(uri, params.text_document.version)
+    await _parse(ls, params)
 
 
 @greet_server.feature(TEXT_DOCUMENT_DID_CHANGE)
 def did_change(ls, params: DidChangeTextDocumentParams):
-    """Text document did change notification."""
-    _parse(ls, params)
+    """Text document did change notification.
+
+       Edits are applied to the document's parse state straight away, but parsing
+       waits for the debounce interval so that only the latest version is parsed
+       and published.
+    """
+    uri = params.text_document.uri
+    state = _document_state(ls, uri)
+    for change in params.content_changes:
+        state.apply_change(change)
+
+    ls.diagnostics_scheduler.schedule(uri, params.text_document.version,
+                                      lambda: _parse(ls, params))
 
 
 @greet_server.feature(TEXT_DOCUMENT_DID_CLOSE)
-def did_close(server: GreetLanguageServer, params: DidCloseTextDocumentParams):
-    """Text document did close notification."""
+async def did_close(server: GreetLanguageServer, params: DidCloseTextDocumentParams):
+    """Text document did close notification.  The file is read and scanned on the
+       parse service, as an open document is, rather than on the event loop."""
+    uri = params.text_document.uri
+    server.document_states.pop(uri, None)
+    server.diagnostics_scheduler.forget(uri)
+    server.diagnostics_publisher.forget(uri)
+    server.semantic_tokens.forget(uri)
+    if server._diagnostic_result_ids is not None:
+        server._diagnostic_result_ids.forget(uri)
+
+    # Unsaved edits are discarded on close, so the index reverts to what's on disk
+    server.index.remove(uri)
     server.show_message('Text Document Did Close')
+    source = await asyncio.get_running_loop().run_in_executor(
+        server.parse_service.executor, read_source, to_fs_path(uri))
+    if source is None:
+        server.index.shared.remove(uri)
+    else:
+        symbols = await server.parse_service.run(scan_symbols, source,
+                                                 token=server.cancellations.token("symbols"))
+        server.index.shared.update(uri, symbols)
+
+
+async def _document_diagnostics(ls: GreetLanguageServer, text_doc: GreetDocument,
+                                previous_result_id: str | None) -> Tuple[str, List[Diagnostic] | None]:
+    """returns the resultId of a document's diagnostics, and the diagnostics; or None
+       for them if they're what the client's previous result already has"""
+    source = text_doc.source
+    result_id = ls.diagnostic_result_ids.get(text_doc.uri, text_doc.version, source,
+                                             ls.backend.name, ls.max_diagnostics)
+    if result_id == previous_result_id:
+        return result_id, None
+    state = ls.document_states.get(text_doc.uri)
+    if state is not None and state.is_valid:
+        return result_id, state.refresh(source, text_doc.line_index)[:ls.max_diagnostics]
+    return result_id, await _check(ls, source)
+
+
+@greet_server.feature(TEXT_DOCUMENT_DIAGNOSTIC,
+                      DiagnosticOptions(inter_file_dependencies=False, workspace_diagnostics=True))
+async def document_diagnostic(ls: GreetLanguageServer, params: DocumentDiagnosticParams):
+    """A document's diagnostics, for a client that asks for them rather than having
+       them pushed.  If they're the same as the client's previous result, it's told
+       so instead of being sent them again."""
+    text_doc = ls.workspace.get_document(params.text_document.uri)
+    result_id, diagnostics = await _document_diagnostics(ls, text_doc, params.previous_result_id)
+    if diagnostics is None:
+        return RelatedUnchangedDocumentDiagnosticReport(result_id=result_id)
+    return RelatedFullDocumentDiagnosticReport(items=diagnostics, result_id=result_id)
+
+
+def _workspace_report(uri: str, version: int | None, result_id: str, diagnostics: List[Diagnostic] | None):
+    if diagnostics is None:
+        return WorkspaceUnchangedDocumentDiagnosticReport(uri=uri, result_id=result_id, version=version)
+    return WorkspaceFullDocumentDiagnosticReport(uri=uri, items=diagnostics, result_id=result_id,
+                                                 version=version)
+
+
+@greet_server.feature(WORKSPACE_DIAGNOSTIC)
+async def workspace_diagnostic(ls: GreetLanguageServer,
+                               params: WorkspaceDiagnosticParams) -> WorkspaceDiagnosticReport:
+    """The diagnostics of every .greet file in the workspace: open documents as
+       edited, the rest as they are on disk.  Files whose diagnostics are the same
+       as the client's previous result for them get an unchanged report.
+
+       Files on disk are checked WORKSPACE_DIAGNOSTIC_CHUNK_SIZE at a time on the
+       parse service's pool, unless the symbol cache has their diagnostics from an
+       earlier check of the same content, and fresh ones are added to it.  If the
+       client gave a partial result token, each chunk's reports are sent as soon
+       as they're ready, and the response itself is empty; otherwise they're all
+       in the response.
+    """
+    from .indexing import find_greet_files
+    from .pull_diagnostics import FileReport, diagnose_files
+    previous = {result.uri: result.value for result in params.previous_result_ids}
+    reports = []
+
+    def report(items):
+        if params.partial_result_token is None:
+            reports.extend(items)
+        elif items:
+            ls.send_notification(PROGRESS, ProgressParams(
+                token=params.partial_result_token,
+                value=WorkspaceDiagnosticReportPartialResult(items=items)))
+
+    open_reports = []
+    for uri, text_doc in list(ls.workspace.documents.items()):
+        result_id, diagnostics = await _document_diagnostics(ls, text_doc, previous.get(uri))
+        open_reports.append(_workspace_report(uri, text_doc.version, result_id, diagnostics))
+    report(open_reports)
+
+    uris = {path: from_fs_path(path) for path in find_greet_files(_workspace_roots(ls))}
+    paths = [path for path, uri in uris.items() if uri not in ls.workspace.documents]
+    cache = ls.symbol_cache
+    loop = asyncio.get_running_loop()
+    futures = []
+    for i in range(0, len(paths), WORKSPACE_DIAGNOSTIC_CHUNK_SIZE):
+        chunk = paths[i:i + WORKSPACE_DIAGNOSTIC_CHUNK_SIZE]
+        chunk_previous = {path: previous[uris[path]] for path in chunk if uris[path] in previous}
+        futures.append(loop.run_in_executor(ls.parse_service.executor, diagnose_files, chunk,
+                                            chunk_previous, ls.backend.name, ls.max_diagnostics,
+                                            cache.path if cache is not None else None))
+    try:
+        for future in asyncio.as_completed(futures):
+            file_reports: List[FileReport] = await future
+            report([_workspace_report(uris[r.path], None, r.result_id, r.diagnostics)
+                    for r in file_reports])
+            fresh = [(r.digest, r.fresh) for r in file_reports if r.fresh is not None]
+            if cache is not None and fresh:
+                cache.put_diagnostics(fresh, ls.backend, ls.max_diagnostics)
+    finally:
+        # Those not started yet, if the request's been cancelled
+        for future in futures:
+            future.cancel()
+
+    return WorkspaceDiagnosticReport(items=reports)
+
+
+def _name_at(doc: GreetDocument, position: Position) -> Tuple[str, Range] | None:
+    """returns the name at position in doc, and its range, or None if there isn't one"""
+    line = doc.line(position.line)
+
+    start = end = min(position.character, len(line))
+    while start > 0 and line[start - 1].isascii() and line[start - 1].isalpha():
+        start -= 1
+    while end < len(line) and line[end].isascii() and line[end].isalpha():
+        end += 1
+    if start == end:
+        return None
+
+    return line[start:end], Range(start=Position(line=position.line, character=start),
+                                  end=Position(line=position.line, character=end))
+
+
+async def _gather_locations(ls: GreetLanguageServer,
+                            documents: List[Tuple[str, List[Symbol]]]) -> List[Location]:
+    """returns the locations of the symbols in documents.  A popular name can have
+       very many, so every REFERENCES_CHECKPOINT_INTERVAL of them the event loop gets
+       a turn, and if the request has been cancelled meanwhile, it stops there."""
+    total = sum(len(symbols) for _, symbols in documents)
+    locations: List[Location] = []
+    try:
+        for uri, symbols in documents:
+            for symbol in symbols:
+                if locations and len(locations) % REFERENCES_CHECKPOINT_INTERVAL == 0:
+                    await asyncio.sleep(0)
+                locations.append(location(uri, symbol))
+    except asyncio.CancelledError:
+        ls.cancellations.record("references", len(locations), total)
+        raise
+    return locations
 
 
 @greet_server.feature(TEXT_DOCUMENT_REFERENCES)
-def references(ls: GreetLanguageServer):
+async def references(ls: GreetLanguageServer, params: ReferenceParams) -> List[Location] | None:
     """returns a list of 0 or more locations that reference the specified token"""
-    pass
+    doc = ls.workspace.get_document(params.text_document.uri)
+    found = _name_at(doc, params.position)
+    if found is None:
+        return None
+    name, _ = found
+
+    documents = ls.index.reference_symbols(name)
+    if params.context.include_declaration:
+        documents = ls.index.declaration_symbols(name) + documents
+    return await _gather_locations(ls, documents)
 
 
 @greet_server.feature(TEXT_DOCUMENT_DEFINITION)
-def definition(ls: GreetLanguageServer,  params: DefinitionParams) -> LocationLink | None:
-    """returns the location where the specified token is defined if found,
+def definition(ls: GreetLanguageServer,  params: DefinitionParams) -> List[LocationLink] | None:
+    """returns the locations where the specified token is defined if found,
        None otherwise
     """
-    origin_range = Range(start=params.position,
-                         end=Position(line=params.position.line, 
-                                      character=params.position.character+1))
-    
-    definition_range = Range(start=Position(line=0, character=6),
-                             end=Position(line=0, character=11))
-    
-    loc = LocationLink(target_uri=params.text_document.uri,
-                       origin_selection_range=origin_range,
-                       target_range=definition_range,
-                       target_selection_range=definition_range)
-    return loc
+    doc = ls.workspace.get_document(params.text_document.uri)
+    found = _name_at(doc, params.position)
+    if found is None:
+        return None
+    name, origin_range = found
 
+    locations = ls.index.definitions(name)
+    if not locations:
+        return None
+
+    return [LocationLink(target_uri=loc.uri,
+                         origin_selection_range=origin_range,
+                         target_range=loc.range,
+                         target_selection_range=loc.range)
+            for loc in locations]
+
+
+_SALUTATIONS = [TokenType.HELLO.value, TokenType.GOODBYE.value]
 
-# ---------------------------------------------------------------------------
-# Features from original skeleton
-# ---------------------------------------------------------------------------
 
-@greet_server.feature(TEXT_DOCUMENT_COMPLETION)
-def completion(ls: LanguageServer, params: CompletionParams):
-    return [
-        CompletionItem(label="hello"),
-        CompletionItem(label="world"),
-    ]
+def _completion_context(doc: GreetDocument, position: Position) -> Tuple[List[str], str]:
+    """returns the words on the line before the one being typed at position, and
+       the part of that one typed so far"""
+    before = doc.line(position.line)[:position.character]
+
+    start = len(before)
+    while start > 0 and before[start - 1].isascii() and before[start - 1].isalpha():
+        start -= 1
+    return before[:start].split(), before[start:]
+
+
+@greet_server.feature(TEXT_DOCUMENT_COMPLETION, CompletionOptions(resolve_provider=True))
+def completion(ls: GreetLanguageServer, params: CompletionParams) -> CompletionList:
+    """Completes salutations at the start of a line, and declared names after one.
+
+       At most COMPLETION_LIMIT names are returned, marked incomplete if there are
+       more, so the client asks again as the prefix grows.  Details are left for
+       completionItem/resolve to fill in for the items the user looks at.
+    """
+    doc = ls.workspace.get_document(params.text_document.uri)
+    words, prefix = _completion_context(doc, params.position)
+
+    if not words:
+        return CompletionList(is_incomplete=False, items=[
+            CompletionItem(label=salutation, kind=CompletionItemKind.Keyword)
+            for salutation in _SALUTATIONS
+            if salutation.casefold().startswith(prefix.casefold())
+        ])
+
+    if len(words) == 1 and words[0] in _SALUTATIONS:
+        names, more = ls.index.names_with_prefix(prefix, COMPLETION_LIMIT)
+        return CompletionList(is_incomplete=more, items=[
+            CompletionItem(label=name, kind=CompletionItemKind.Variable, data=name)
+            for name in names
+        ])
+
+    return CompletionList(is_incomplete=False, items=[])
+
+
+@greet_server.feature(COMPLETION_ITEM_RESOLVE)
+def completion_item_resolve(ls: GreetLanguageServer, item: CompletionItem) -> CompletionItem:
+    """Adds where a completed name is declared"""
+    if item.data is None:
+        return item
+
+    uris = sorted({loc.uri for loc in ls.index.definitions(item.data)})
+    if len(uris) == 1:
+        item.detail = f"Declared in {os.path.basename(to_fs_path(uris[0]))}"
+    elif uris:
+        item.detail = f"Declared in {len(uris)} files"
+        item.documentation = "\n".join(os.path.basename(to_fs_path(uri)) for uri in uris)
+    return item
+
+
+async def _encode_semantic_tokens(ls: GreetLanguageServer, uri: str) -> List[int] | None:
+    """returns the encoded semantic tokens of the document, or None if a newer request
+       for its tokens came in meanwhile: that one's answer is the one the client will use"""
+    doc = ls.workspace.get_document(uri)
+    token = ls.cancellations.token("semantic_tokens")
+    ls.semantic_tokens_requests.start(uri, token)
+    try:
+        return await ls.parse_service.run(semantic_tokens.encode, doc.source, token=token)
+    except Cancelled:
+        return None
+    finally:
+        ls.semantic_tokens_requests.finish(uri, token)
 
 
 @greet_server.feature(
     TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL,
     SemanticTokensLegend(
-        token_types = ["operator"],
+        token_types = semantic_tokens.TOKEN_TYPES,
         token_modifiers = []
     )
 )
-def semantic_tokens(ls: GreetLanguageServer, params: SemanticTokensParams):
+async def semantic_tokens_full(ls: GreetLanguageServer, params: SemanticTokensParams):
     """See https://microsoft.github.io/language-server-protocol/specification#textDocument_semanticTokens
     for details on how semantic tokens are encoded."""
 
-    TOKENS = re.compile('".*"(?=:)')
-
     uri = params.text_document.uri
-    doc = ls.workspace.get_document(uri)
-
-    last_line = 0
-    last_start = 0
+    data = await _encode_semantic_tokens(ls, uri)
+    if data is None:
+        return None
+    return SemanticTokens(data=data, result_id=ls.semantic_tokens.store(uri, data))
 
-    data = []
 
-    for lineno, line in enumerate(doc.lines):
-        last_start = 0
-
-        for match in TOKENS.finditer(line):
-            start, end = match.span()
-            data += [
-                (lineno - last_line),
-                (start - last_start),
-                (end - start),
-                0,
-                0
-            ]
-
-            last_line = lineno
-            last_start = start
-
-    return SemanticTokens(data=data)
+@greet_server.feature(TEXT_DOCUMENT_SEMANTIC_TOKENS_FULL_DELTA)
+async def semantic_tokens_delta(ls: GreetLanguageServer, params: SemanticTokensDeltaParams):
+    """returns the edits to the tokens last sent for the document, or all the tokens
+       if the client's previous result isn't the one cached"""
 
+    uri = params.text_document.uri
+    data = await _encode_semantic_tokens(ls, uri)
+    if data is None:
+        return None
+    previous = ls.semantic_tokens.previous(uri, params.previous_result_id)
+    result_id = ls.semantic_tokens.store(uri, data)
+    if previous is None:
+        return SemanticTokens(data=data, result_id=result_id)
+    return SemanticTokensDelta(edits=semantic_tokens.diff(previous, data), result_id=result_id)
+
+
+@greet_server.feature(TEXT_DOCUMENT_SEMANTIC_TOKENS_RANGE)
+def semantic_tokens_range(ls: GreetLanguageServer, params: SemanticTokensRangeParams):
+    """returns the tokens on the lines in the requested range, typically the
+       editor's viewport; the rest of the document isn't scanned"""
+
+    doc = ls.workspace.get_document(params.text_document.uri)
+    start, end = params.range.start.line, params.range.end.line
+    return SemanticTokens(data=semantic_tokens.encode(doc.text_of_lines(start, end), start))
+
+
+def _workspace_roots(ls: GreetLanguageServer) -> List[str]:
+    """returns the directories of the workspace folders, or the root if there are none"""
+    roots = [to_fs_path(folder.uri) for folder in ls.workspace.folders.values()]
+    if not roots and ls.workspace.root_path:
+        roots = [ls.workspace.root_path]
+    return roots
+
+
+async def _index_workspace(ls: GreetLanguageServer, on_progress: Callable[[int, int], None],
+                           roots: List[str] | None = None) -> int:
+    """Indexes every .greet file under roots, by default the workspace's, on a process
+       pool, reusing the cached symbols of files that haven't changed.  Returns the
+       number indexed.  What's on disk goes in the shared index, so open documents
+       aren't skipped: each session's overlay of them hides their shared entries
+       from that session only, and the other sessions see the file on disk.
+    """
+    from .indexing import find_greet_files, index_files
+    paths = find_greet_files(_workspace_roots(ls) if roots is None else roots)
+    executor = process_pool(ls.parse_service.max_workers)
+    try:
+        return await index_files(ls.index.shared, paths, executor, on_progress,
+                                 cache=ls.symbol_cache)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@greet_server.feature(INITIALIZED)
+async def initialized(ls: GreetLanguageServer, params: InitializedParams):
+    """Index the workspace in the background as soon as the client is ready.
+       Thanks to the symbol cache, only files changed since the last run are parsed,
+       and folders another client has already indexed are skipped."""
+    roots = [root for root in _workspace_roots(ls) if root not in ls.indexed_roots]
+    ls.indexed_roots.update(roots)
+    indexed = await _index_workspace(ls, lambda done, total: None, roots)
+    logger.info("Indexed %d workspace files", indexed)
 
 
 @greet_server.command(GreetLanguageServer.CMD_PROGRESS)
 async def progress(ls: GreetLanguageServer, *args):
-    """Create and start the progress on the client."""
+    """Index every .greet file in the workspace, reporting progress on the client."""
     token = str(uuid.uuid4())
     # Create
     await ls.progress.create_async(token)
     # Begin
-    ls.progress.begin(token, WorkDoneProgressBegin(title='Indexing', percentage=0))
+    ls.progress.begin(token, WorkDoneProgressBegin(title='Indexing', percentage=0, cancellable=True))
+
     # Report
-    for i in range(1, 10):
+    def report(done: int, total: int):
         ls.progress.report(
             token,
-            WorkDoneProgressReport(message=f'{i * 10}%', percentage= i * 10),
+            WorkDoneProgressReport(message=f'{done}/{total} files', percentage=done * 100 // total),
         )
-        await asyncio.sleep(2)
+
+    task = asyncio.ensure_future(_index_workspace(ls, report))
+    ls.indexing_tasks[token] = task
+    try:
+        await task
+    except asyncio.CancelledError:
+        ls.progress.end(token, WorkDoneProgressEnd(message='Cancelled'))
+        if token in ls.indexing_tasks:
+            # Not cancelled from the progress bar, so the command itself was cancelled
+            raise
+        return
+    finally:
+        ls.indexing_tasks.pop(token, None)
     # End
     ls.progress.end(token, WorkDoneProgressEnd(message='Finished'))
 
 
+@greet_server.feature(WINDOW_WORK_DONE_PROGRESS_CANCEL)
+def work_done_progress_cancel(ls: GreetLanguageServer, params: WorkDoneProgressCancelParams):
+    """The user cancelled a progress bar: stop the work it reports on."""
+    task = ls.indexing_tasks.pop(params.token, None)
+    if task is not None:
+        task.cancel()
+
+
+@greet_server.command(GreetLanguageServer.CMD_STATS)
+def show_stats(ls: GreetLanguageServer, *args):
+    """Per-method call counts, latency and queue wait histograms and payload sizes.
+       Returned as JSON, or as Prometheus text if the first argument is "prometheus";
+       None unless the server was started with --stats."""
+    if ls.stats is None:
+        return None
+    arguments = args[0] if args and args[0] else []
+    if arguments and arguments[0] == "prometheus":
+        return ls.stats.prometheus()
+    publisher = ls.diagnostics_publisher
+    return {**ls.stats.to_dict(),
+            "diagnostics": {"published": publisher.published, "unchanged": publisher.unchanged,
+                            "coalesced": publisher.coalesced},
+            "parse_cache": {"hits": ls.parse_cache.hits, "misses": ls.parse_cache.misses},
+            "cancellations": ls.cancellations.to_dict()}
+
+
+# ---------------------------------------------------------------------------
+# Features from original skeleton
+# ---------------------------------------------------------------------------
+
 @greet_server.command(GreetLanguageServer.CMD_REGISTER_COMPLETIONS)
 async def register_completions(ls: GreetLanguageServer, *args):
     """Register completions method on the client."""
@@ -0,0 +1,30 @@
+import asyncio
+
+from lsprotocol.types import EXIT
+from pygls.protocol import lsp_method
+
+from .document import DocumentProtocol
+
+
+class SessionProtocol(DocumentProtocol):
+    """The protocol for one of many clients served by the same process over TCP
+       or WebSockets.  Losing the connection, or the client's exit notification,
+       ends that client's session; the process carries on serving the others.
+    """
+
+    def connection_lost(self, exc):
+        self._server.end_session()
+
+    @lsp_method(EXIT)
+    def lsp_exit(self, *args) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+
+def restore_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """pygls makes a new event loop the current one whenever a server is created.
+       Sessions are created while loop is running, so close that one and put it back."""
+    stray = asyncio.get_event_loop_policy().get_event_loop()
+    if stray is not loop:
+        stray.close()
+    asyncio.set_event_loop(loop)
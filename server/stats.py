@@ -0,0 +1,167 @@
+import asyncio
+import functools
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple
+
+from lsprotocol.types import WORKSPACE_EXECUTE_COMMAND
+
+# Only imported once stats are enabled; the protocol that feeds them is in stats_protocol
+from .stats_protocol import received_at, received_bytes
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PROMETHEUS_PREFIX = "greet_lsp"
+
+
+class Histogram:
+    "Counts observations into fixed buckets, as a Prometheus histogram does"
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One count per bucket, plus one for observations beyond the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        "(upper bound, observations at or below it) for each bucket, ending with +Inf"
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative())}
+
+
+class MethodStats:
+    "What's recorded for each LSP method or command"
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.received = Histogram(SIZE_BUCKETS)
+        self.sent = Histogram(SIZE_BUCKETS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "errors": self.errors,
+                "latency_seconds": self.latency.to_dict(),
+                "queue_wait_seconds": self.queue_wait.to_dict(),
+                "received_bytes": self.received.to_dict(),
+                "sent_bytes": self.sent.to_dict()}
+
+
+class ServerStats:
+    """Per-method statistics for the handlers registered on a server.
+
+       Handlers are only timed once `instrument` has wrapped them, so a server
+       without stats runs its handlers exactly as registered.
+    """
+
+    def __init__(self):
+        self.methods: Dict[str, MethodStats] = {}
+        self.started = time.time()
+
+    def method(self, name: str) -> MethodStats:
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = self.methods[name] = MethodStats()
+        return stats
+
+    def _begin(self, name: str) -> Tuple[MethodStats, float]:
+        stats = self.method(name)
+        stats.calls += 1
+        now = time.perf_counter()
+        arrived = received_at.get()
+        if arrived is not None:
+            stats.queue_wait.observe(now - arrived)
+            stats.received.observe(received_bytes.get())
+        return stats, now
+
+    def wrap(self, name: str, handler: Callable) -> Callable:
+        "returns handler wrapped to record its calls under name; sync handlers stay sync"
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                stats, start = self._begin(name)
+                try:
+                    return await handler(*args, **kwargs)
+                except BaseException:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.latency.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            stats, start = self._begin(name)
+            try:
+                return handler(*args, **kwargs)
+            except BaseException:
+                stats.errors += 1
+                raise
+            finally:
+                stats.latency.observe(time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, feature_manager) -> None:
+        """wraps every feature and command registered with feature_manager.  Commands
+           are recorded as workspace/executeCommand/<command>."""
+        features = feature_manager.features
+        for name, handler in list(features.items()):
+            features[name] = self.wrap(name, handler)
+        commands = feature_manager.commands
+        for name, handler in list(commands.items()):
+            commands[name] = self.wrap(f"{WORKSPACE_EXECUTE_COMMAND}/{name}", handler)
+
+    def record_sent(self, name: str, size: int) -> None:
+        "record a response to, or notification of, method name of size bytes"
+        self.method(name).sent.observe(size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"uptime_seconds": time.time() - self.started,
+                "methods": {name: stats.to_dict() for name, stats in sorted(self.methods.items())}}
+
+    def prometheus(self) -> str:
+        "the statistics in the Prometheus text exposition format, one group of lines per metric"
+        methods = sorted(self.methods.items())
+        lines = []
+        for attribute, metric in [("calls", "calls_total"), ("errors", "errors_total")]:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} counter")
+            for name, stats in methods:
+                lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{method="{name}"}} {getattr(stats, attribute)}')
+
+        for attribute, metric in [("latency", "handler_seconds"), ("queue_wait", "queue_wait_seconds"),
+                                  ("received", "received_bytes"), ("sent", "sent_bytes")]:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} histogram")
+            for name, stats in methods:
+                histogram: Histogram = getattr(stats, attribute)
+                if histogram.count == 0:
+                    continue
+                label = f'method="{name}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{PROMETHEUS_PREFIX}_{metric}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f"{PROMETHEUS_PREFIX}_{metric}_sum{{{label}}} {histogram.sum}")
+                lines.append(f"{PROMETHEUS_PREFIX}_{metric}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        "writes the Prometheus text to path, replacing it atomically so readers never see half a file"
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, path)
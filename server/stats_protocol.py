@@ -0,0 +1,112 @@
+import json
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict
+
+from lsprotocol.types import WORKSPACE_EXECUTE_COMMAND
+from pygls.protocol import JsonRPCProtocol, LanguageServerProtocol
+
+if TYPE_CHECKING:
+    from .stats import ServerStats
+
+# When the message being handled arrived, and its size in bytes.  Set by the
+# protocol as each message is dispatched; tasks created by a handler inherit them.
+received_at: ContextVar[float | None] = ContextVar("received_at", default=None)
+received_bytes: ContextVar[int] = ContextVar("received_bytes", default=0)
+
+
+def _method_name(method: str, params) -> str:
+    "the name a message's statistics are recorded under: commands are told apart"
+    if method == WORKSPACE_EXECUTE_COMMAND:
+        return f"{method}/{getattr(params, 'command', '')}"
+    return method
+
+
+class _CountingTransport:
+    "Passes writes through to a transport, counting what's written"
+
+    def __init__(self, transport, protocol: "StatsProtocol"):
+        self._transport = transport
+        self._protocol = protocol
+
+    def write(self, data) -> None:
+        self._protocol.sent_bytes += len(data)
+        self._transport.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+
+class StatsProtocol(LanguageServerProtocol):
+    """The LSP protocol, recording when each message arrives and how big it and any
+       reply are for the server's `stats`.  When the server has no stats it does
+       nothing more than the protocol it extends.
+    """
+
+    def __init__(self, server, converter):
+        self._transport = None
+        # Bytes written to the transport so far
+        self.sent_bytes = 0
+        # id of each request awaiting a response -> the name it's recorded under
+        self._request_names: Dict[Any, str] = {}
+        super().__init__(server, converter)
+
+    @property
+    def _stats(self) -> "ServerStats | None":
+        return getattr(self._server, "stats", None)
+
+    @property
+    def transport(self):
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport):
+        if transport is not None and self._stats is not None:
+            transport = _CountingTransport(transport, self)
+        self._transport = transport
+
+    def _data_received(self, data: bytes):
+        if self._stats is None:
+            return super()._data_received(data)
+
+        # As the base class does, but noting each message's arrival and size
+        while len(data):
+            self._message_buf.append(data)
+            message = b''.join(self._message_buf)
+            found = JsonRPCProtocol.MESSAGE_PATTERN.fullmatch(message)
+
+            body = found.group('body') if found else b''
+            length = int(found.group('length')) if found else 1
+            if len(body) < length:
+                return
+
+            body, data = body[:length], body[length:]
+            self._message_buf = []
+
+            arrived = received_at.set(time.perf_counter())
+            size = received_bytes.set(length)
+            try:
+                self._procedure_handler(
+                    json.loads(body.decode(self.CHARSET),
+                               object_hook=self._deserialize_message))
+            finally:
+                received_at.reset(arrived)
+                received_bytes.reset(size)
+
+    def _handle_request(self, msg_id, method_name, params):
+        if self._stats is not None:
+            self._request_names[msg_id] = _method_name(method_name, params)
+        super()._handle_request(msg_id, method_name, params)
+
+    def _send_response(self, msg_id, result=None, error=None):
+        name = self._request_names.pop(msg_id, None)
+        before = self.sent_bytes
+        super()._send_response(msg_id, result, error)
+        if name is not None and self._stats is not None:
+            self._stats.record_sent(name, self.sent_bytes - before)
+
+    def notify(self, method: str, params=None):
+        before = self.sent_bytes
+        super().notify(method, params)
+        if self._stats is not None:
+            self._stats.record_sent(method, self.sent_bytes - before)
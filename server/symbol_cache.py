@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+from .backends import BACKENDS, DEFAULT_BACKEND, Backend, get_backend
+from .index import DocumentSymbols
+from .parser import GRAMMAR_VERSION
+
+# Let SQLite memory-map up to this much of the cache file rather than reading it
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def content_hash(content: bytes) -> bytes:
+    return hashlib.sha256(content).digest()
+
+
+def _encode(symbols: DocumentSymbols) -> bytes:
+    return json.dumps(symbols, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(data: bytes) -> DocumentSymbols:
+    declarations, references = json.loads(data)
+    return DocumentSymbols([tuple(s) for s in declarations], [tuple(s) for s in references])
+
+
+def read_diagnostics(cache_path: str | None, digests: List[bytes], backend: Backend,
+                     limit: int | None) -> Dict[bytes, List[Dict[str, Any]]]:
+    """the diagnostics the cache at cache_path holds for each of digests; none if
+       there's no cache there or it can't be read.  For workers, which only read it."""
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        cache = SymbolCache(cache_path, readonly=True)
+        try:
+            return cache.get_diagnostics(digests, backend, limit)
+        finally:
+            cache.close()
+    except sqlite3.Error:
+        # Checking everything is always right, if slower
+        return {}
+
+
+class CheckResult(NamedTuple):
+    path: str
+    # As JSON, the way LSP sends them: much quicker to pass between processes.
+    # None if the caller said the file was unchanged, so it wasn't checked.
+    diagnostics: List[Dict[str, Any]] | None
+    # why the file couldn't be checked, if it couldn't
+    error: str | None = None
+    # hash of the file's content, if it could be read
+    digest: bytes | None = None
+    # True if the file was checked, False if its diagnostics came from the cache
+    fresh: bool = False
+
+
+def check_files(paths: List[str], backend_name: str = DEFAULT_BACKEND, limit: int | None = None,
+                cache_path: str | None = None,
+                unchanged: Callable[[str, bytes], bool] | None = None) -> List[CheckResult]:
+    """Checks each file with the named backend, keeping at most limit diagnostics
+       per file, unless unchanged(path, content hash) is true for it, or the cache
+       at cache_path holds its diagnostics.  Runs in a worker, so takes and returns
+       picklable data; the caller stores fresh results.  Used by both `check` and
+       workspace diagnostic pulls."""
+    from pygls.protocol import default_converter
+
+    contents: Dict[str, bytes | str] = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                contents[path] = f.read()
+        except OSError as e:
+            contents[path] = str(e)
+    digests = {path: content_hash(content) for path, content in contents.items()
+               if isinstance(content, bytes)}
+    skipped = {path for path, digest in digests.items() if unchanged is not None and unchanged(path, digest)}
+    backend = get_backend(backend_name)
+    cached = read_diagnostics(cache_path, [digest for path, digest in digests.items() if path not in skipped],
+                              backend, limit)
+
+    unstructure = default_converter().unstructure
+    results: List[CheckResult] = []
+    for path, content in contents.items():
+        if isinstance(content, str):
+            results.append(CheckResult(path, [], content))
+            continue
+        digest = digests[path]
+        if path in skipped:
+            results.append(CheckResult(path, None, digest=digest))
+            continue
+        if digest in cached:
+            results.append(CheckResult(path, cached[digest], digest=digest))
+            continue
+        try:
+            source = content.decode("utf-8")
+        except UnicodeDecodeError as e:
+            results.append(CheckResult(path, [], str(e)))
+            continue
+        results.append(CheckResult(path, [unstructure(d) for d in backend.check(source, limit)],
+                                   digest=digest, fresh=True))
+    return results
+
+
+class SymbolCache:
+    """On-disk store of the symbols in each file, keyed by a hash of the file's
+       content and the grammar version, and of the diagnostics each backend found
+       in it, keyed by the hash and the backend's version.
+
+       Backed by a single SQLite file, memory-mapped where the platform allows.  A
+       file whose content hasn't changed since it was last scanned or checked (by
+       this or any earlier server, or `check`) needn't be parsed again.  Entries
+       for other versions are dropped when the cache is opened for writing.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path)
+        self._db.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        if not readonly:
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS symbols ("
+                             " hash BLOB NOT NULL, grammar INTEGER NOT NULL, data BLOB NOT NULL,"
+                             " PRIMARY KEY (hash, grammar)) WITHOUT ROWID")
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(diagnostics)")]
+            if columns and "version" not in columns:
+                # Written before diagnostics were keyed by backend version
+                self._db.execute("DROP TABLE diagnostics")
+            self._db.execute("CREATE TABLE IF NOT EXISTS diagnostics ("
+                             " hash BLOB NOT NULL, backend TEXT NOT NULL, version INTEGER NOT NULL,"
+                             " max INTEGER NOT NULL, data BLOB NOT NULL,"
+                             " PRIMARY KEY (hash, backend, version, max)) WITHOUT ROWID")
+            self._db.execute("DELETE FROM symbols WHERE grammar != ?", (GRAMMAR_VERSION,))
+            names = ", ".join("?" * len(BACKENDS))
+            self._db.execute(f"DELETE FROM diagnostics WHERE backend NOT IN ({names})", list(BACKENDS))
+            self._db.executemany("DELETE FROM diagnostics WHERE backend = ? AND version != ?",
+                                 [(backend.name, backend.version) for backend in BACKENDS.values()])
+            self._db.commit()
+
+    def get_many(self, hashes: Iterable[bytes]) -> Dict[bytes, DocumentSymbols]:
+        "returns the cached symbols for each of the given content hashes that's in the cache"
+        found: Dict[bytes, DocumentSymbols] = {}
+        for digest in hashes:
+            row = self._db.execute("SELECT data FROM symbols WHERE hash = ? AND grammar = ?",
+                                   (digest, GRAMMAR_VERSION)).fetchone()
+            if row is not None:
+                found[digest] = _decode(row[0])
+        return found
+
+    def put_many(self, entries: List[Tuple[bytes, DocumentSymbols]]) -> None:
+        "stores the symbols for each content hash"
+        self._db.executemany("INSERT OR REPLACE INTO symbols (hash, grammar, data) VALUES (?, ?, ?)",
+                             [(digest, GRAMMAR_VERSION, _encode(symbols)) for digest, symbols in entries])
+        self._db.commit()
+
+    def get_diagnostics(self, hashes: Iterable[bytes], backend: Backend,
+                        limit: int | None) -> Dict[bytes, List[Dict[str, Any]]]:
+        """returns, as JSON the way LSP sends them, the diagnostics this version of
+           backend found keeping at most limit, for each of the content hashes that's
+           in the cache"""
+        found: Dict[bytes, List[Dict[str, Any]]] = {}
+        for digest in hashes:
+            row = self._db.execute("SELECT data FROM diagnostics"
+                                   " WHERE hash = ? AND backend = ? AND version = ? AND max = ?",
+                                   (digest, backend.name, backend.version, limit or 0)).fetchone()
+            if row is not None:
+                found[digest] = json.loads(row[0])
+        return found
+
+    def put_diagnostics(self, entries: List[Tuple[bytes, List[Dict[str, Any]]]], backend: Backend,
+                        limit: int | None) -> None:
+        "stores the diagnostics, as JSON, this version of backend found for each content hash"
+        self._db.executemany("INSERT OR REPLACE INTO diagnostics (hash, backend, version, max, data)"
+                             " VALUES (?, ?, ?, ?, ?)",
+                             [(digest, backend.name, backend.version, limit or 0,
+                               json.dumps(diagnostics, separators=(",", ":")).encode("utf-8"))
+                              for digest, diagnostics in entries])
+        self._db.commit()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM symbols WHERE grammar = ?",
+                                (GRAMMAR_VERSION,)).fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
@@ -1,24 +1,236 @@
-from tree_sitter import Language, Parser
+import os
+import re
+import threading
+import warnings
+from typing import Iterator, List, Tuple
 
-Language.build_library(
-    'build/greet-parser.so',
+from lsprotocol.types import (Diagnostic, Position, Range,
+                              TextDocumentContentChangeEvent,
+                              TextDocumentContentChangeEvent_Type1)
+from tree_sitter import Language, Node, Parser, Tree
 
-    [
-        '../tree-sitter-greet'
-    ]
-)
+from . import parser as greet_parser
+from .line_cache import LineIndex
+from .parser import DIAGNOSTIC_SOURCE, Greeting, NameDefinition, TokenType, UnrecognisedStatement
 
-GREET_LANGUAGE = Language('build/greet-parser.so', 'greet')
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tree-sitter-greet")
+LIBRARY_PATH = os.path.join(GRAMMAR_DIR, "build", "greet-parser.so")
 
-parser = Parser()
-parser.set_language(GREET_LANGUAGE)
+_language: Language | None = None
+# A parser can't be used by two threads at once, and documents are parsed both
+# on the event loop and on the parse service's threads, so each has its own
+_local = threading.local()
 
-sample = bytes("""hello Petunia""", "utf8")
-tree = parser.parse(sample)
 
-root_node = tree.root_node
-assert root_node.type == "source_file"
-assert root_node.start_point == (0,0)
-assert root_node.end_point == (0,13)
+def load_language(library_path: str = LIBRARY_PATH) -> Language:
+    """Loads the greet grammar from the compiled library at library_path.  If the
+       library hasn't been built yet it's compiled from the grammar's generated C
+       source first, which needs a C compiler.
+    """
+    # py-tree-sitter deprecates loading libraries by path, but it's the only way
+    # to use a grammar that isn't published as a package
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        if not os.path.exists(library_path):
+            Language.build_library(library_path, [GRAMMAR_DIR])
+        return Language(library_path, "greet")
 
 
+def get_parser() -> Parser:
+    "returns the calling thread's tree-sitter parser, loading the grammar on first use"
+    global _language
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        if _language is None:
+            _language = load_language()
+        parser = Parser()
+        parser.set_language(_language)
+        _local.parser = parser
+    return parser
+
+
+Point = Tuple[int, int]   # (row, column in bytes), as tree-sitter counts them
+
+
+def _utf16_to_bytes(line: bytes, character: int) -> int:
+    "converts a column counted in UTF-16 code units, as LSP positions are, to bytes"
+    if line.isascii():
+        return min(character, len(line))
+    offset = 0
+    units = 0
+    for c in line.decode("utf-8", errors="replace"):
+        if units >= character:
+            break
+        units += 2 if ord(c) > 0xFFFF else 1
+        offset += len(c.encode("utf-8"))
+    return min(offset, len(line))
+
+
+def _bytes_to_utf16(line: bytes, column: int) -> int:
+    if line.isascii():
+        return column
+    return len(line[:column].decode("utf-8", errors="replace").encode("utf-16-le")) // 2
+
+
+_NEWLINE = re.compile(b"\n")
+
+
+class _RowIndex(LineIndex):
+    "A LineIndex of UTF-8 source, whose lines end at \\n alone, as tree-sitter counts rows"
+
+    @staticmethod
+    def _starts_between(text: bytes, start: int, end: int, to_end: bool) -> List[int]:
+        starts = [start] + [match.end() for match in _NEWLINE.finditer(text, start, end)]
+        if starts[-1] == end and not to_end:
+            starts.pop()
+        return starts
+
+
+class TreeSitterDocument:
+    """A document's source, and its syntax tree kept in step with each edit.
+
+       Edits are applied to the previous tree with `Tree.edit` before parsing
+       again, so tree-sitter only re-parses the parts of the document an edit
+       touched and reuses every other subtree.
+    """
+
+    def __init__(self, source: str):
+        self.source = source.encode("utf-8")
+        self.tree: Tree = get_parser().parse(self.source)
+        self._edited = False
+        # For converting tree-sitter columns back to LSP ones; computed when needed
+        self._ascii: bool | None = None
+        self._rows = _RowIndex(self.source)
+
+    def _locate(self, position: Position) -> Tuple[int, Point]:
+        "the byte offset and tree-sitter point of an LSP position"
+        rows = self._rows
+        if position.line >= len(rows):
+            # Past the end of the document
+            row = len(rows) - 1
+            return len(self.source), (row, len(self.source) - rows.line_start(row))
+        start = rows.line_start(position.line)
+        end = rows.line_start(position.line + 1)
+        if position.line < len(rows) - 1:
+            end -= 1   # the \n
+        column = _utf16_to_bytes(self.source[start:end], position.character)
+        return start + column, (position.line, column)
+
+    def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
+        "apply an edit received in a didChange notification"
+        text = change.text.encode("utf-8")
+        if not isinstance(change, TextDocumentContentChangeEvent_Type1):
+            # The whole document was replaced: nothing in the old tree is reusable
+            self.source = text
+            self.tree = get_parser().parse(self.source)
+            self._edited = False
+            self._ascii = None
+            self._rows = _RowIndex(self.source)
+            return
+
+        start_byte, start_point = self._locate(change.range.start)
+        old_end_byte, old_end_point = self._locate(change.range.end)
+        self.source = self.source[:start_byte] + text + self.source[old_end_byte:]
+        self._rows.apply_edit(start_byte, old_end_byte, text, self.source)
+
+        newlines = text.count(b"\n")
+        if newlines:
+            new_end_point = (start_point[0] + newlines, len(text) - text.rfind(b"\n") - 1)
+        else:
+            new_end_point = (start_point[0], start_point[1] + len(text))
+        self.tree.edit(start_byte=start_byte,
+                       old_end_byte=old_end_byte,
+                       new_end_byte=start_byte + len(text),
+                       start_point=start_point,
+                       old_end_point=old_end_point,
+                       new_end_point=new_end_point)
+        self._edited = True
+        self._ascii = None
+
+    def parse(self) -> Tree:
+        "returns the tree for the current source, re-parsing incrementally if it's been edited"
+        if self._edited:
+            self.tree = get_parser().parse(self.source, self.tree)
+            self._edited = False
+        return self.tree
+
+    def _position(self, point: Point) -> Position:
+        row, column = point
+        if self._ascii is None:
+            self._ascii = self.source.isascii()
+        if self._ascii:
+            return Position(line=row, character=column)
+
+        start = self._rows.line_start(row)
+        return Position(line=row, character=_bytes_to_utf16(self.source[start:start + column], column))
+
+    def diagnostics(self) -> List[Diagnostic]:
+        "returns a diagnostic for each ERROR and MISSING node in the document's tree"
+        diagnostics: List[Diagnostic] = []
+        for node in _error_nodes(self.parse().root_node):
+            diagnostics.append(Diagnostic(
+                range=Range(start=self._position(node.start_point),
+                            end=self._position(node.end_point)),
+                message=_message(node),
+                source=DIAGNOSTIC_SOURCE))
+        return diagnostics
+
+    def _token(self, node: Node, token_type: TokenType) -> greet_parser.Token:
+        start, end = self._position(node.start_point), self._position(node.end_point)
+        return greet_parser.Token(start.character, end.character, token_type,
+                                  node.text.decode("utf-8", errors="replace"), start.line)
+
+    def statements(self) -> List[NameDefinition | Greeting | UnrecognisedStatement]:
+        "returns the statements in the document's tree, with an unrecognised statement for each ERROR"
+        statements: List[NameDefinition | Greeting | UnrecognisedStatement] = []
+        for node in self.parse().root_node.children:
+            if node.is_error:
+                statements.append(UnrecognisedStatement([self._token(node, TokenType.UNRECOGNISED)]))
+                continue
+            name = node.child_by_field_name("name")
+            if name is None or name.is_missing:
+                statements.append(UnrecognisedStatement([self._token(node, TokenType.UNRECOGNISED)]))
+            elif node.type == "name_declaration":
+                statements.append(NameDefinition(
+                    self._token(node.child_by_field_name("keyword"), TokenType.NAME_KEYWORD),
+                    self._token(name, TokenType.NAME)))
+            else:
+                salutation = node.child_by_field_name("salutation")
+                statements.append(Greeting(self._token(salutation, TokenType[salutation.type.upper()]),
+                                           self._token(name, TokenType.NAME)))
+        return statements
+
+
+def _error_nodes(root: Node) -> Iterator[Node]:
+    "yields the ERROR and MISSING nodes in document order, without descending into ERRORs"
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.is_error or node.is_missing:
+            yield node
+        elif node.has_error:
+            stack.extend(reversed(node.children))
+
+
+def _message(node: Node) -> str:
+    if node.is_missing:
+        return f"Syntax error: missing {node.type}"
+    first = node.children[0].type if node.children else None
+    if first == "name_keyword":
+        return "Name declaration must be 'name: <name>'"
+    if first in ("hello", "goodbye"):
+        return "Greeting must be either 'Hello <name>' or 'Goodbye <name>'"
+    return "Syntax error"
+
+
+def parse(source: str) -> List[Diagnostic]:
+    "parses source from scratch, returning its diagnostics"
+    return TreeSitterDocument(source).diagnostics()
+
+
+if __name__ == "__main__":
+    tree = get_parser().parse(b"hello Petunia")
+    root_node = tree.root_node
+    assert root_node.type == "source_file"
+    assert root_node.start_point == (0,0)
+    assert root_node.end_point == (0,13)
@@ -0,0 +1,41 @@
+import pytest
+from pygls.uris import from_fs_path
+from pygls.workspace import Workspace
+from lsprotocol.types import TextDocumentItem
+
+from server import server
+from server.index import scan_symbols
+
+
+@pytest.fixture
+def make_server(tmp_path):
+    """makes servers with an empty workspace in tmp_path, stopping their parse
+       service and closing the event loop each made for itself afterwards"""
+    made = []
+
+    def make_server():
+        ls = server.GreetLanguageServer("test-server", "v0")
+        ls.lsp.workspace = Workspace(from_fs_path(str(tmp_path)))
+        made.append(ls)
+        return ls
+
+    yield make_server
+    for ls in made:
+        ls.parse_service.shutdown()
+        ls.loop.close()
+
+
+@pytest.fixture
+def ls(make_server):
+    return make_server()
+
+
+def _open_document(ls, uri: str, text: str, version: int = 1):
+    "puts a document in ls's workspace and its symbols in the index, as opening it does"
+    ls.workspace.put_document(TextDocumentItem(uri=uri, language_id="greet", version=version, text=text))
+    ls.index.update(uri, scan_symbols(text))
+
+
+@pytest.fixture
+def open_document():
+    return _open_document
@@ -0,0 +1,122 @@
+import random
+
+import pytest
+from pygls.workspace import Document
+from lsprotocol.types import Position, Range, TextDocumentContentChangeEvent_Type1
+
+from server import parser as greet_parser
+from server import regex_parser
+from server.backends import BACKENDS, get_backend
+
+
+VALID = "name: Thelma\nHello Thelma\n  Goodbye   Louise\n\nname: Louise\n"
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    if request.param == "tree-sitter":
+        pytest.importorskip("tree_sitter")
+    if request.param == "lark":
+        pytest.importorskip("lark")
+    return get_backend(request.param)
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        get_backend("yacc")
+
+
+def test_greetings_are_valid(backend):
+    source = "Hello Thelma\nGoodbye Louise\n"
+
+    result = backend.parse(source)
+
+    assert result.diagnostics == []
+    assert backend.check(source) == []
+    assert result.statements == greet_parser.parse_statements(source)
+
+
+@pytest.mark.parametrize("name", ["scanner", "lark", "tree-sitter"])
+def test_declarations_are_statements(name):
+    if name == "tree-sitter":
+        pytest.importorskip("tree_sitter")
+
+    result = get_backend(name).parse(VALID)
+
+    assert result.diagnostics == []
+    assert result.statements == greet_parser.parse_statements(VALID)
+
+
+def test_invalid_line_reported(backend):
+    diagnostics = backend.check("Hello Thelma\nGoodbye 123\n")
+
+    assert [d.range.start.line for d in diagnostics] == [1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_document_state_matches_full_check(backend, seed):
+    rng = random.Random(seed)
+    doc = Document("file:///test.greet", VALID)
+    state = backend.document_state()
+    state.invalidate()
+
+    for _ in range(30):
+        lines = doc.lines
+        line = rng.randrange(len(lines))
+        position = Position(line=line, character=rng.randrange(len(lines[line].rstrip("\n")) + 1))
+        change = TextDocumentContentChangeEvent_Type1(
+            range=Range(start=position, end=position),
+            text=rng.choice(["x", "1", " ", "\n", "Hello ", "name: "]))
+        doc.apply_change(change)
+        state.apply_change(change)
+
+        if state.is_valid:
+            diagnostics = state.refresh(doc.source)
+        else:
+            diagnostics = backend.check(doc.source)
+            state.seed(doc.source, diagnostics)
+        assert diagnostics == backend.check(doc.source)
+
+
+def test_tree_sitter_state_needs_seeding_with_its_tree():
+    pytest.importorskip("tree_sitter")
+    backend = get_backend("tree-sitter")
+    state = backend.document_state()
+    assert not state.is_valid
+
+    # Made off the event loop, so it mustn't touch the state
+    prepared = state.prepare(VALID)
+    assert not state.is_valid
+
+    state.seed(VALID, backend.check(VALID), prepared)
+    assert state.is_valid
+    assert state.document is prepared
+    assert state.refresh(VALID) == []
+
+
+# Line breaks other than \r and \n, which str.splitlines() and so the line index end lines at too
+OTHER_LINE_BREAKS = ["Hello\x0cBob\n", "Hello Bob\x0bname: X\n", "Hello Bob\u2028Hello Ann\n",
+                     "Hello Bob\x1cHello 1\x85Hello Ann\u2029name: 2\n"]
+
+
+@pytest.mark.parametrize("name, check_line", [("regex", regex_parser.check_line),
+                                              ("scanner", greet_parser.check_line)])
+@pytest.mark.parametrize("source", OTHER_LINE_BREAKS)
+def test_document_state_agrees_with_full_check_on_line_breaks(name, check_line, source):
+    backend = get_backend(name)
+    doc = Document("file:///test.greet", "Hello Thelma\n")
+    state = backend.document_state()
+    state.seed(doc.source, backend.check(doc.source))
+
+    for change in [TextDocumentContentChangeEvent_Type1(
+                       range=Range(start=Position(line=1, character=0), end=Position(line=1, character=0)),
+                       text=source),
+                   TextDocumentContentChangeEvent_Type1(
+                       range=Range(start=Position(line=0, character=0), end=Position(line=0, character=5)),
+                       text="Goodbye")]:
+        doc.apply_change(change)
+        state.apply_change(change)
+
+        assert state.refresh(doc.source) == backend.check(doc.source)
+        assert backend.check(doc.source) == [
+            d for d in (check_line(i, line) for i, line in enumerate(doc.source.splitlines())) if d]
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+from lsprotocol.types import (Position, ReferenceContext, ReferenceParams, SemanticTokens,
+                              SemanticTokensParams, TextDocumentIdentifier, TextDocumentItem)
+
+from server import cancellation, parser, regex_parser, semantic_tokens, server
+from server.cancellation import Cancelled, CancellationStats, CancellationToken
+from server.index import scan_symbols
+from server.parse_service import THREAD, ParseService
+
+SOURCE = "name: Thelma\r\nHello Thelma\n\nWotcha Louise\rGoodbye  Louise\nHello\n" * 50
+
+
+def test_scanning_in_blocks_matches_scanning_at_once(monkeypatch):
+    monkeypatch.setattr(cancellation, "CHECKPOINT_CHARACTERS", 100)
+    token = CancellationToken()
+
+    assert semantic_tokens.encode(SOURCE, 3, token) == semantic_tokens.encode(SOURCE, 3)
+    assert parser.parse(SOURCE, token) == parser.parse(SOURCE)
+    assert scan_symbols(SOURCE, token) == scan_symbols(SOURCE)
+
+
+def test_cancelled_work_stops_at_a_checkpoint(monkeypatch):
+    monkeypatch.setattr(cancellation, "CHECKPOINT_CHARACTERS", 100)
+    monkeypatch.setattr(regex_parser, "CHECKPOINT_LINES", 10)
+    stats = CancellationStats()
+
+    for kind, work in [("tokens", semantic_tokens.encode), ("regex", regex_parser.parse)]:
+        token = stats.token(kind)
+        token.cancel()
+        with pytest.raises(Cancelled):
+            work(SOURCE, token=token)
+
+    assert stats.to_dict() == {"regex": {"cancelled": 1, "done": 0, "saved": len(SOURCE)},
+                               "tokens": {"cancelled": 1, "done": 0, "saved": len(SOURCE)}}
+
+
+@pytest.mark.asyncio
+async def test_work_cancelled_while_queued_is_all_saved():
+    service = ParseService(THREAD, max_workers=1, inline_threshold=0)
+    stats = CancellationStats()
+    release = threading.Event()
+    busy = asyncio.ensure_future(service.run(lambda source: release.wait(), SOURCE))
+    queued = asyncio.ensure_future(service.run(semantic_tokens.encode, SOURCE, token=stats.token("tokens")))
+    await asyncio.sleep(0.01)
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await busy
+
+    assert stats.to_dict() == {"tokens": {"cancelled": 1, "done": 0, "saved": len(SOURCE)}}
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_newer_semantic_tokens_request_supersedes_older(ls):
+    ls.parse_service = ParseService(THREAD, inline_threshold=0)
+    source = "Hello Thelma\n" * 200_000
+    ls.workspace.put_document(TextDocumentItem(uri="file:///a.greet", language_id="greet",
+                                               version=1, text=source))
+    params = SemanticTokensParams(text_document=TextDocumentIdentifier(uri="file:///a.greet"))
+
+    older, newer = await asyncio.gather(server.semantic_tokens_full(ls, params),
+                                        server.semantic_tokens_full(ls, params))
+
+    assert older is None
+    assert isinstance(newer, SemanticTokens)
+    assert ls.cancellations.to_dict()["semantic_tokens"]["saved"] > 0
+    ls.parse_service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_references_request_stops_gathering(ls):
+    uri = "file:///a.greet"
+    source = "name: Thelma\n" + "Hello Thelma\n" * 2500
+    ls.workspace.put_document(TextDocumentItem(uri=uri, language_id="greet", version=1, text=source))
+    ls.index.update(uri, scan_symbols(source))
+
+    request = asyncio.ensure_future(server.references(ls, ReferenceParams(
+        text_document=TextDocumentIdentifier(uri=uri), position=Position(line=0, character=7),
+        context=ReferenceContext(include_declaration=True))))
+    await asyncio.sleep(0)
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+
+    done = server.REFERENCES_CHECKPOINT_INTERVAL
+    assert ls.cancellations.to_dict() == {"references": {"cancelled": 1, "done": done, "saved": 2501 - done}}
@@ -0,0 +1,126 @@
+import json
+import os
+import re
+from urllib.parse import unquote, urlsplit
+
+import pytest
+from pygls.uris import to_fs_path
+
+from server import check
+from server.parse_service import process_pool
+
+
+# A URI's characters (RFC 3986): unreserved, reserved, and percent-encoded octets
+URI_REFERENCE = re.compile(r"(?:[A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=]|%[0-9A-Fa-f]{2})*")
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_check_files_reports_diagnostics_and_unreadable_files(tmp_path):
+    valid = _write(tmp_path, "valid.greet", "Hello Bob\n")
+    invalid = _write(tmp_path, "invalid.greet", "Hello Bob\nWotcha Al\n")
+    missing = str(tmp_path / "missing.greet")
+
+    results = check.check_files([valid, invalid, missing])
+
+    assert [r.path for r in results] == [valid, invalid, missing]
+    assert results[0].diagnostics == [] and results[0].error is None
+    assert results[1].diagnostics[0]["range"]["start"] == {"line": 1, "character": 0}
+    assert results[2].error is not None
+
+
+def test_diagnostics_cached_between_runs(tmp_path, capsys):
+    files = tmp_path / "files"
+    files.mkdir()
+    unchanged = _write(files, "a.greet", "Hello Bob\nWotcha Al\n")
+    changed = _write(files, "b.greet", "Hello Bob\n")
+    cache_file = str(tmp_path / "cache.sqlite3")
+
+    check.main([str(files), "--workers", "1", "--cache-file", cache_file])
+    _write(files, "b.greet", "Wotcha\n")
+    results = check.check_files([unchanged, changed], cache_path=cache_file)
+
+    assert [(r.fresh, len(r.diagnostics)) for r in results] == [(False, 1), (True, 1)]
+    assert results[0].diagnostics == check.check_files([unchanged])[0].diagnostics
+
+
+def test_pool_results_come_in_order(tmp_path):
+    paths = [_write(tmp_path, f"{n}.greet", "Wotcha\n" * n) for n in range(6)]
+
+    executor = process_pool(2)
+    try:
+        results = list(check.run_checks(paths, executor=executor, chunk_size=2))
+    finally:
+        executor.shutdown()
+
+    assert [len(r.diagnostics) for r in results] == list(range(6))
+
+
+def test_jsonl_output(tmp_path, capsys):
+    _write(tmp_path, "a.greet", "Hello Bob\n")
+    _write(tmp_path, "b.greet", "Wotcha\n")
+
+    status = check.main([str(tmp_path), "--workers", "1"])
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert status == 1
+    assert [len(r["diagnostics"]) for r in records] == [0, 1]
+
+
+def test_sarif_output(tmp_path, capsys):
+    _write(tmp_path, "a.greet", "Hello Bob\nWotcha\nGoodbye\n")
+    output = tmp_path / "results.sarif"
+
+    check.main([str(tmp_path), "--format", "sarif", "--output", str(output), "--workers", "1"])
+
+    log = json.loads(output.read_text())
+    results = log["runs"][0]["results"]
+    assert log["version"] == "2.1.0"
+    assert [r["locations"][0]["physicalLocation"]["region"]["startLine"] for r in results] == [2, 3]
+    assert "files/s" in capsys.readouterr().err
+
+
+def test_sarif_output_without_results(tmp_path):
+    output = tmp_path / "results.sarif"
+
+    check.main([_write(tmp_path, "a.greet", "Hello Bob\n"), "--format", "sarif", "--output", str(output)])
+
+    [run] = json.loads(output.read_text())["runs"]
+    assert run["results"] == []
+    assert run["tool"]["driver"]["rules"][0]["id"] == check.SARIF_RULE
+
+
+def test_sarif_locations_are_file_uris(tmp_path, monkeypatch):
+    directory = tmp_path / "my files #1"
+    directory.mkdir()
+    path = _write(directory, "a b%.greet", "Wotcha\n")
+    output = tmp_path / "results.sarif"
+    monkeypatch.chdir(tmp_path)
+
+    check.main([os.path.join("my files #1", "a b%.greet"), "--format", "sarif", "--output", str(output)])
+
+    [result] = json.loads(output.read_text())["runs"][0]["results"]
+    uri = result["locations"][0]["physicalLocation"]["artifactLocation"]["uri"]
+    assert URI_REFERENCE.fullmatch(uri)
+    parts = urlsplit(uri)
+    assert (parts.scheme, parts.netloc, parts.query, parts.fragment) == ("file", "", "", "")
+    assert unquote(parts.path) == path and to_fs_path(uri) == path
+
+
+@pytest.mark.parametrize("backend, column_kind, end_column", [("scanner", "unicodeCodePoints", 8),
+                                                              ("tree-sitter", "utf16CodeUnits", 9)])
+def test_sarif_column_kind_matches_backend(tmp_path, backend, column_kind, end_column):
+    if backend == "tree-sitter":
+        pytest.importorskip("tree_sitter")
+    path = _write(tmp_path, "a.greet", "Hello \U0001F600\n")
+    output = tmp_path / "results.sarif"
+
+    check.main([path, "--format", "sarif", "--output", str(output), "--workers", "1", "--backend", backend])
+
+    [run] = json.loads(output.read_text())["runs"]
+    assert run["columnKind"] == column_kind
+    assert run["results"][0]["locations"][0]["physicalLocation"]["region"]["endColumn"] == end_column
@@ -0,0 +1,55 @@
+from lsprotocol.types import CompletionItemKind, CompletionParams, Position, TextDocumentIdentifier
+
+from server import server
+
+
+def _complete(ls, uri: str, line: int, character: int):
+    return server.completion(ls, CompletionParams(
+        text_document=TextDocumentIdentifier(uri=uri),
+        position=Position(line=line, character=character)))
+
+
+def test_salutations_at_start_of_line(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\ngo\n")
+
+    result = _complete(ls, "file:///a.greet", 1, 2)
+
+    assert [item.label for item in result.items] == ["Goodbye"]
+    assert result.items[0].kind == CompletionItemKind.Keyword
+
+
+def test_declared_names_after_salutation(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\nname: Theo\n")
+    open_document(ls, "file:///b.greet", "name: Louise\nHello th\n")
+
+    result = _complete(ls, "file:///b.greet", 1, 8)
+
+    assert [item.label for item in result.items] == ["Thelma", "Theo"]
+    assert not result.is_incomplete
+
+
+def test_nothing_completed_after_a_name(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\nHello Thelma \n")
+
+    assert _complete(ls, "file:///a.greet", 1, 13).items == []
+
+
+def test_completion_is_paged(ls, open_document, monkeypatch):
+    monkeypatch.setattr(server, "COMPLETION_LIMIT", 2)
+    open_document(ls, "file:///a.greet", "name: Ann\nname: Anna\nname: Annie\nHello An\n")
+
+    result = _complete(ls, "file:///a.greet", 3, 8)
+
+    assert [item.label for item in result.items] == ["Ann", "Anna"]
+    assert result.is_incomplete
+
+
+def test_resolve_adds_declaring_files(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\n")
+    open_document(ls, "file:///b.greet", "Hello \n")
+    [item] = _complete(ls, "file:///b.greet", 0, 6).items
+    assert item.detail is None
+
+    resolved = server.completion_item_resolve(ls, item)
+
+    assert resolved.detail == "Declared in a.greet"
@@ -0,0 +1,190 @@
+import asyncio
+
+import pytest
+from pygls.uris import from_fs_path
+from lsprotocol.types import (DefinitionParams, DidCloseTextDocumentParams, Position, ReferenceContext,
+                              ReferenceParams, TextDocumentIdentifier)
+
+from server import server
+from server.cancellation import CancellationToken
+from server.index import SortedNames, WorkspaceIndex, scan_symbols
+from server.line_cache import LineIndex
+
+
+def test_scan_symbols():
+    source = "name: Thelma\nHello Thelma\n  name:  Louise\nname Bob\nGoodbye  Louise\n"
+
+    symbols = scan_symbols(source)
+
+    assert symbols.declarations == [("Thelma", 0, 6, 12), ("Louise", 2, 9, 15)]
+    assert symbols.references == [("Thelma", 1, 6, 12), ("Louise", 4, 9, 15)]
+
+
+@pytest.mark.parametrize("source", ["Hello Bob\x0cname: Bob\n", "Hello Bob\x0bname: X\n",
+                                    "Hello Bob\u2028Hello Ann\r\nname: Ann\x85Goodbye Ann\n"])
+def test_scan_symbols_lines_match_line_index(source):
+    index = LineIndex(source)
+
+    for symbols in [scan_symbols(source), scan_symbols(source, CancellationToken())]:
+        assert symbols.declarations and symbols.references
+        for name, line, start, end in symbols.declarations + symbols.references:
+            assert source[index.line_start(line) + start:index.line_start(line) + end] == name
+
+
+def test_definitions_across_documents():
+    index = WorkspaceIndex()
+    index.update("file:///a.greet", scan_symbols("name: Thelma\n"))
+    index.update("file:///b.greet", scan_symbols("Hello Thelma\nname: Thelma\n"))
+
+    locations = index.definitions("Thelma")
+
+    assert sorted((loc.uri, loc.range.start.line) for loc in locations) == [
+        ("file:///a.greet", 0),
+        ("file:///b.greet", 1),
+    ]
+    assert index.definitions("Louise") == []
+
+
+def test_update_replaces_document_entries():
+    index = WorkspaceIndex()
+    index.update("file:///a.greet", scan_symbols("name: Thelma\n"))
+    index.update("file:///a.greet", scan_symbols("name: Louise\n"))
+
+    assert index.definitions("Thelma") == []
+    assert len(index.definitions("Louise")) == 1
+
+
+def test_references_across_documents():
+    index = WorkspaceIndex()
+    index.update("file:///a.greet", scan_symbols("name: Thelma\nHello Thelma\n"))
+    index.update("file:///b.greet", scan_symbols("Goodbye Thelma\nHello Louise\n"))
+
+    locations = index.references("Thelma")
+
+    assert sorted((loc.uri, loc.range.start.line) for loc in locations) == [
+        ("file:///a.greet", 1),
+        ("file:///b.greet", 0),
+    ]
+
+    index.update("file:///b.greet", scan_symbols("Hello Louise\n"))
+    assert [loc.uri for loc in index.references("Thelma")] == ["file:///a.greet"]
+
+
+def test_remove_document():
+    index = WorkspaceIndex()
+    index.update("file:///a.greet", scan_symbols("name: Thelma\n"))
+    index.remove("file:///a.greet")
+
+    assert index.definitions("Thelma") == []
+    assert "file:///a.greet" not in index
+
+
+def test_sorted_names_with_prefix():
+    names = SortedNames()
+    for name in ["Thelma", "theo", "Louise", "Theodore", "Bob"]:
+        names.add(name)
+
+    assert names.with_prefix("the", 10) == (["Thelma", "theo", "Theodore"], False)
+    assert names.with_prefix("THE", 2) == (["Thelma", "theo"], True)
+    assert names.with_prefix("", 10) == (["Bob", "Louise", "Thelma", "theo", "Theodore"], False)
+    assert names.with_prefix("x", 10) == ([], False)
+
+    names.discard("theo")
+    names.discard("Nobody")
+    assert names.with_prefix("the", 10) == (["Thelma", "Theodore"], False)
+
+
+def test_declared_names_follow_documents():
+    index = WorkspaceIndex()
+    index.update("file:///a.greet", scan_symbols("name: Thelma\nname: Louise\n"))
+    index.update("file:///b.greet", scan_symbols("name: Thelma\n"))
+
+    index.update("file:///a.greet", scan_symbols("name: Bob\n"))
+    assert index.declared_names.with_prefix("", 10) == (["Bob", "Thelma"], False)
+
+    index.remove("file:///b.greet")
+    assert index.declared_names.with_prefix("", 10) == (["Bob"], False)
+
+
+def test_definition_found_in_other_document(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\n")
+    open_document(ls, "file:///b.greet", "Hello Thelma\n")
+
+    result = server.definition(ls, DefinitionParams(
+        text_document=TextDocumentIdentifier(uri="file:///b.greet"),
+        position=Position(line=0, character=8)))
+
+    assert len(result) == 1
+    assert result[0].target_uri == "file:///a.greet"
+    assert result[0].target_range.start == Position(line=0, character=6)
+    assert result[0].origin_selection_range.start == Position(line=0, character=6)
+    assert result[0].origin_selection_range.end == Position(line=0, character=12)
+
+
+def test_definition_of_undeclared_name_is_none(ls, open_document):
+    open_document(ls, "file:///a.greet", "Hello Thelma\n")
+
+    result = server.definition(ls, DefinitionParams(
+        text_document=TextDocumentIdentifier(uri="file:///a.greet"),
+        position=Position(line=0, character=8)))
+
+    assert result is None
+
+
+def _references(ls, uri: str, position: Position, include_declaration: bool):
+    return asyncio.run(server.references(ls, ReferenceParams(
+        text_document=TextDocumentIdentifier(uri=uri),
+        position=position,
+        context=ReferenceContext(include_declaration=include_declaration))))
+
+
+def test_references_from_declaration(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\n")
+    open_document(ls, "file:///b.greet", "Hello Thelma\nGoodbye Thelma\n")
+
+    result = _references(ls, "file:///a.greet", Position(line=0, character=7), False)
+
+    assert sorted((loc.uri, loc.range.start.line) for loc in result) == [
+        ("file:///b.greet", 0),
+        ("file:///b.greet", 1),
+    ]
+
+
+def test_references_including_declaration(ls, open_document):
+    open_document(ls, "file:///a.greet", "name: Thelma\nHello Thelma\n")
+
+    result = _references(ls, "file:///a.greet", Position(line=1, character=7), True)
+
+    assert [loc.range.start.line for loc in result] == [0, 1]
+
+
+def test_closing_reverts_index_to_file_on_disk(ls, open_document, tmp_path):
+    path = tmp_path / "a.greet"
+    path.write_text("name: Thelma\n")
+    uri = from_fs_path(str(path))
+    open_document(ls, uri, "name: Louise\n")
+
+    asyncio.run(server.did_close(ls, DidCloseTextDocumentParams(text_document=TextDocumentIdentifier(uri=uri))))
+
+    assert [loc.uri for loc in ls.index.definitions("Thelma")] == [uri]
+    assert ls.index.definitions("Louise") == []
+
+    open_document(ls, uri, "name: Louise\n")
+    path.unlink()
+    asyncio.run(server.did_close(ls, DidCloseTextDocumentParams(text_document=TextDocumentIdentifier(uri=uri))))
+
+    assert ls.index.definitions("Thelma") == []
+    assert uri not in ls.index
+
+
+def test_indexing_workspace_keeps_open_documents_unsaved_contents(ls, open_document, tmp_path):
+    path = tmp_path / "a.greet"
+    path.write_text("name: Thelma\n")
+    uri = from_fs_path(str(path))
+    open_document(ls, uri, "name: Louise\n")
+
+    assert asyncio.run(server._index_workspace(ls, lambda done, total: None)) == 1
+
+    assert ls.index.definitions("Thelma") == []
+    assert [loc.uri for loc in ls.index.definitions("Louise")] == [uri]
+    assert [loc.uri for loc in ls.index.shared.definitions("Thelma")] == [uri]
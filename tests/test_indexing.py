@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pygls.uris import from_fs_path
+
+from server.index import WorkspaceIndex
+from server.indexing import find_greet_files, index_files
+from server.parse_service import process_pool
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / "a.greet").write_text("name: Thelma\nHello Thelma\n")
+    (tmp_path / "sub" / "b.greet").write_text("name: Louise\nGoodbye Thelma\n")
+    (tmp_path / "sub" / "notes.txt").write_text("name: Nobody\n")
+    (tmp_path / ".hidden" / "c.greet").write_text("name: Hidden\n")
+    return tmp_path
+
+
+def test_find_greet_files_skips_hidden_and_other_files(workspace):
+    paths = find_greet_files([str(workspace)])
+
+    assert sorted(paths) == [str(workspace / "a.greet"), str(workspace / "sub" / "b.greet")]
+
+
+@pytest.mark.asyncio
+async def test_index_files_populates_index_and_reports_progress(workspace):
+    index = WorkspaceIndex()
+    paths = find_greet_files([str(workspace)])
+    progress = []
+
+    with ThreadPoolExecutor() as executor:
+        indexed = await index_files(index, paths, executor, lambda done, total: progress.append((done, total)),
+                                    chunk_size=1)
+
+    assert indexed == 2
+    assert progress == [(1, 2), (2, 2)]
+    assert [loc.uri for loc in index.definitions("Louise")] == [from_fs_path(str(workspace / "sub" / "b.greet"))]
+    assert len(index.references("Thelma")) == 2
+
+
+@pytest.mark.asyncio
+async def test_index_files_skips_open_documents(workspace):
+    index = WorkspaceIndex()
+    paths = find_greet_files([str(workspace)])
+    open_uri = from_fs_path(str(workspace / "a.greet"))
+
+    with ThreadPoolExecutor() as executor:
+        indexed = await index_files(index, paths, executor, lambda done, total: None,
+                                    is_open=lambda uri: uri == open_uri)
+
+    assert indexed == 1
+    assert open_uri not in index
+
+
+@pytest.mark.asyncio
+async def test_index_files_on_process_pool(workspace):
+    index = WorkspaceIndex()
+    paths = find_greet_files([str(workspace)])
+
+    executor = process_pool(max_workers=1)
+    try:
+        indexed = await index_files(index, paths, executor, lambda done, total: None)
+    finally:
+        executor.shutdown()
+
+    assert indexed == 2
+    assert len(index.definitions("Thelma")) == 1
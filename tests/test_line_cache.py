@@ -0,0 +1,193 @@
+import random
+
+import pytest
+from pygls.workspace import Document
+from lsprotocol.types import (ClientCapabilities, InitializeParams, Position, Range,
+                              TextDocumentContentChangeEvent_Type1,
+                              TextDocumentContentChangeEvent_Type2, TextDocumentSyncKind)
+
+from server import server
+from server.document import GreetDocument
+from server.line_cache import LineCache, LineIndex, line_count, line_spans
+
+
+SOURCE = """Hello Thelma
+Goodbye L0u1se
+name: Bobby
+
+Wotcha Thelma
+Hello Louise
+"""
+
+EDIT_TEXTS = ["", "x", "1", " ", "Hello ", "Goodbye", "\n", "Hello Bob\n", "\nWotcha\n", "name: Fred\nHello Fred"]
+
+
+def _edit(doc: Document, cache: LineCache, start: Position, end: Position, text: str):
+    change = TextDocumentContentChangeEvent_Type1(range=Range(start=start, end=end), text=text)
+    doc.apply_change(change)
+    cache.apply_change(change)
+
+
+def _random_position(rng: random.Random, doc: Document) -> Position:
+    lines = doc.lines
+    if not lines or rng.random() < 0.1:
+        # Edits may also start just past the last line
+        return Position(line=len(lines), character=0)
+    line = rng.randrange(len(lines))
+    return Position(line=line, character=rng.randrange(len(lines[line].rstrip("\n")) + 1))
+
+
+def test_server_asks_for_edits_as_ranges():
+    # pygls's default, which the line cache depends on
+    session = server.greet_server.new_session()
+    result = session.lsp.lsp_initialize(InitializeParams(capabilities=ClientCapabilities()))
+    session.end_session()
+
+    assert result.capabilities.text_document_sync.change == TextDocumentSyncKind.Incremental
+
+
+def test_refresh_matches_full_parse_on_open():
+    cache = LineCache(server._check_line)
+
+    assert cache.refresh(SOURCE) == server._parse_greet(SOURCE)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_edits_match_full_parse(seed):
+    rng = random.Random(seed)
+    doc = Document("file:///test.greet", SOURCE)
+    cache = LineCache(server._check_line)
+    cache.refresh(doc.source)
+
+    for _ in range(50):
+        start = _random_position(rng, doc)
+        end = _random_position(rng, doc)
+        if (end.line, end.character) < (start.line, start.character):
+            start, end = end, start
+        _edit(doc, cache, start, end, rng.choice(EDIT_TEXTS))
+
+        assert cache.refresh(doc.source) == server._parse_greet(doc.source)
+
+
+def test_untouched_diagnostics_are_reused():
+    doc = Document("file:///test.greet", SOURCE)
+    cache = LineCache(server._check_line)
+    before = cache.refresh(doc.source)
+
+    # Fix the second line; the error on line 4 is untouched
+    _edit(doc, cache, Position(line=1, character=9), Position(line=1, character=14), "Louise")
+    after = cache.refresh(doc.source)
+
+    assert after == server._parse_greet(doc.source)
+    assert len(after) == len(before) - 1
+    assert after[-1] is before[-1]
+
+
+def test_full_change_revalidates_document():
+    doc = Document("file:///test.greet", SOURCE)
+    cache = LineCache(server._check_line)
+    cache.refresh(doc.source)
+
+    change = TextDocumentContentChangeEvent_Type2(text="Hello Bob\nHi")
+    doc.apply_change(change)
+    cache.apply_change(change)
+
+    assert cache.refresh(doc.source) == server._parse_greet(doc.source)
+
+
+@pytest.mark.parametrize("text", ["", "\n", "a", "a\n", "a\nb", "a\n\nb\n", "a\r\nb\rc\n",
+                                  "a\r\n", "a\x0cb\u2028c", "\r\r\n\n"])
+def test_line_spans_split_as_splitlines(text):
+    assert [text[start:end] for start, end in line_spans(text)] == text.splitlines()
+    assert line_count(text) == len(text.splitlines())
+
+
+def _line_starts(text: str):
+    "the offsets lines start at, by splitting text: a reference for LineIndex"
+    starts = [0]
+    for line in text.splitlines(True):
+        starts.append(starts[-1] + len(line))
+    if text and text[-1] not in "\r\n\v\f\x1c\x1d\x1e\x85\u2028\u2029":
+        starts.pop()
+    return starts
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_line_index_edits_match_splitting_the_text(seed):
+    rng = random.Random(seed)
+    pieces = ["", "a", "bc", "\n", "\r", "\r\n", "\u2028", "x\ny", "\n\n"]
+    text = "".join(rng.choice(pieces) for _ in range(20))
+    index = LineIndex(text)
+    for _ in range(100):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(len(text), start + 5))
+        replacement = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+        text = text[:start] + replacement + text[end:]
+        index.apply_edit(start, end, replacement, text)
+
+        starts = _line_starts(text)
+        assert [index.line_start(n) for n in range(len(index))] == starts
+        assert index.line_count == len(text.splitlines())
+        offset = rng.randint(0, len(text))
+        position = index.position_at(offset)
+        assert starts[position.line] <= offset
+        assert index.offset_at(position) == offset
+
+
+def test_line_index_positions_and_lines():
+    text = "Hello Bob\r\nname: Bob\n\nGoodbye"
+    index = LineIndex(text)
+
+    assert len(index) == 4
+    assert index.position_at(11) == Position(line=1, character=0)
+    assert index.position_at(len(text)) == Position(line=3, character=7)
+    assert index.offset_at(Position(line=0, character=50)) == 11
+    assert index.offset_at(Position(line=9, character=0)) == len(text)
+    assert [index.line(text, n) for n in range(5)] == ["Hello Bob", "name: Bob", "", "Goodbye", ""]
+    assert index.line(text, 0, keepends=True) == "Hello Bob\r\n"
+
+
+def _utf16_offset(source: str, position: Position) -> int:
+    "the offset of an LSP position in source, counting the UTF-16 code units of its line"
+    lines = source.splitlines(keepends=True)
+    start = sum(len(line) for line in lines[:position.line])
+    line = lines[position.line] if position.line < len(lines) else ""
+    for length in range(len(line) + 1):
+        if len(line[:length].encode("utf-16-le")) // 2 >= position.character:
+            return start + length
+    return start + len(line)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greet_document_edits_count_utf16_units(seed):
+    rng = random.Random(seed)
+    expected = SOURCE + "Hello \U0001f600 Bob\n\U0001f600a\U0001f600 Bob\n"
+    actual = GreetDocument("file:///a.greet", expected)
+    for _ in range(50):
+        start = _random_position(rng, actual)
+        end = _random_position(rng, actual)
+        if (end.line, end.character) < (start.line, start.character):
+            start, end = end, start
+        change = TextDocumentContentChangeEvent_Type1(range=Range(start=start, end=end),
+                                                      text=rng.choice(EDIT_TEXTS + ["\U0001f600"]))
+        start_offset = _utf16_offset(expected, start)
+        end_offset = max(start_offset, _utf16_offset(expected, end))
+        expected = expected[:start_offset] + change.text + expected[end_offset:]
+        actual.apply_change(change)
+
+        assert actual.source == expected
+        assert [actual.line(n) for n in range(len(actual.lines))] == \
+            [line.rstrip("\r\n") for line in actual.lines]
+        position = _random_position(rng, actual)
+        assert actual.offset_at_position(position) == _utf16_offset(expected, position)
+
+
+def test_greet_document_edit_after_surrogate_pairs():
+    doc = GreetDocument("file:///a.greet", "\U0001f600a\U0001f600\n")
+
+    # Character 3 is after the first emoji's two code units and the "a"
+    assert doc.offset_at_position(Position(line=0, character=3)) == 2
+    doc.apply_change(TextDocumentContentChangeEvent_Type1(
+        range=Range(start=Position(line=0, character=3), end=Position(line=0, character=5)), text="b"))
+
+    assert doc.source == "\U0001f600ab\n"
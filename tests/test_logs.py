@@ -0,0 +1,36 @@
+import atexit
+import logging
+
+from server import logs
+from server.logs import RateLimiter
+
+
+def test_rate_limiter_allows_once_per_interval():
+    now = [0.0]
+    limiter = RateLimiter(5, clock=lambda: now[0])
+
+    allowed = []
+    for now[0] in (0, 1, 4.9, 5, 6, 11):
+        allowed.append(limiter.allow())
+
+    assert allowed == [True, False, False, True, False, True]
+    assert limiter.suppressed == 3
+
+
+def test_records_are_written_by_the_listener(tmp_path):
+    path = tmp_path / "server.log"
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        listener = logs.configure("INFO", str(path))
+        logging.getLogger("test").info("written %s", "later")
+        logging.getLogger("test").debug("not written")
+        atexit.unregister(listener.stop)
+        listener.stop()
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
+
+    text = path.read_text()
+    assert "written later" in text
+    assert "not written" not in text
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from server import server
+from server.parse_service import PROCESS, THREAD, ParseService
+
+
+def _thread_name(source: str) -> str:
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_small_sources_are_parsed_inline():
+    service = ParseService(THREAD, inline_threshold=100)
+
+    assert await service.run(_thread_name, "Hello Bob") == threading.current_thread().name
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_large_sources_are_parsed_on_the_pool():
+    service = ParseService(THREAD, inline_threshold=100)
+
+    assert (await service.run(_thread_name, "Hello Bob\n" * 20)).startswith("greet-parse")
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_matches_inline_parse():
+    source = "Hello Bob\nWotcha Bob\n" * 100
+    service = ParseService(PROCESS, max_workers=1, inline_threshold=0)
+
+    assert await service.run(server._parse_greet, source) == server._parse_greet(source)
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", [THREAD, PROCESS])
+async def test_unpicklable_results_are_made_on_a_thread(mode):
+    service = ParseService(mode, inline_threshold=100)
+
+    assert await service.run_in_thread(_thread_name, "Hello Bob") == threading.current_thread().name
+    assert await service.run_in_thread(_thread_name, "Hello Bob\n" * 20) != threading.current_thread().name
+    service.shutdown()
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        ParseService("fibre")
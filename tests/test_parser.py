@@ -1,6 +1,10 @@
 import pytest
 from server import server
-from server.lark_parser import parse, GreetSyntaxError
+from server import parser as greet_parser
+from server import regex_parser
+from server.parser import TokenType, NameDefinition, Greeting, UnrecognisedStatement
+from server.lark_parser import (parse, parse_errors, get_parser, EARLEY, LALR,
+                                GreetSyntaxError, GreetMalformedName, GreetMalformedGreeting)
 from lsprotocol.types import Diagnostic, Range, Position
 
 error_examples = [
@@ -28,6 +32,69 @@ def test_parse_valid_greeting():
     parse(greeting)
 
 
+@pytest.mark.parametrize("algorithm", [EARLEY, LALR])
+def test_parse_valid_source_with_each_algorithm(algorithm):
+    source = "name: Thelma\nname: Louise\n\nHello Thelma\nGoodbye Louise\n"
+    parse(source, algorithm)
+
+
+def test_parser_built_once_per_algorithm():
+    assert get_parser(LALR) is get_parser(LALR)
+    assert get_parser(LALR) is not get_parser(EARLEY)
+
+
+def test_parse_errors_valid_source_has_none():
+    assert parse_errors("name: Thelma\nHello Thelma\n") == []
+
+
+def test_parse_errors_reports_every_error():
+    source = "Hello Bob\nhello Bob\nname: Fred24\nGoodbye Fred\nHello Bob Smith\nHello"
+
+    errors = parse_errors(source)
+
+    assert [(type(e), e.args[1]) for e in errors] == [
+        (GreetMalformedGreeting, 2),
+        (GreetMalformedName, 3),
+        (GreetMalformedGreeting, 5),
+        (GreetMalformedGreeting, 6),
+    ]
+
+
+@pytest.mark.parametrize("source, error", [
+    ("Hello 24\nHello Bob\nHello Ann\n", GreetMalformedGreeting),
+    ("Goodbye 3\nname: Ok\nHello Bob\n", GreetMalformedGreeting),
+    ("name: 3\nHello Bob\nname: Ann\n", GreetMalformedName),
+])
+def test_parse_errors_bad_name_only_reported_on_its_line(source, error):
+    errors = parse_errors(source)
+
+    assert [(type(e), e.args[1]) for e in errors] == [(error, 1)]
+
+
+def test_parse_errors_one_per_bad_line():
+    source = "Hello 24\nHello Bob\nname: 3\nname: Ann\nGoodbye 7\nHello Ann\n"
+
+    errors = parse_errors(source)
+
+    assert [(type(e), e.args[1]) for e in errors] == [
+        (GreetMalformedGreeting, 1),
+        (GreetMalformedName, 3),
+        (GreetMalformedGreeting, 5),
+    ]
+
+
+def test_parse_errors_empty_source():
+    errors = parse_errors("")
+
+    assert len(errors) == 1
+    assert isinstance(errors[0], GreetSyntaxError)
+
+
+def test_unknown_algorithm_rejected():
+    with pytest.raises(ValueError):
+        get_parser("cyk")
+
+
 @pytest.mark.parametrize("greeting", [("Hello Thelma"), ("Goodbye Louise")])
 def test_valid_greeting_accepted(greeting):
 
@@ -53,4 +120,60 @@ def test_invalid_greeting_rejected(greeting):
     assert start.character == 0
     assert end.line == 0
     assert end.character == len(greeting)
-    
\ No newline at end of file
+
+
+def test_streamed_diagnostics_match_line_by_line_check():
+    source = "Hello Thelma  \r\n\n  \nWotcha Thelma \rGoodbye L0u1se\n Hello Louise"
+    expected = [d for line_num, line in enumerate(source.splitlines())
+                if (d := regex_parser.check_line(line_num, line)) is not None]
+
+    assert list(regex_parser.iter_diagnostics(source)) == expected
+    assert len(expected) == 3
+
+
+def test_diagnostics_stop_at_limit():
+    source = "Wotcha\n" * 10
+
+    assert len(regex_parser.parse(source)) == 10
+    assert [d.range.start.line for d in regex_parser.parse(source, limit=3)] == [0, 1, 2]
+
+
+# -------------------------------------------------------------------
+# Single-pass scanner & parser (server/parser.py)
+# -------------------------------------------------------------------
+
+def test_scan_produces_tokens_per_line():
+    tokens = greet_parser._scan("name: Thelma\n  Hello  Thelma\n")
+
+    assert [(t.line, t.start_col, t.end_col, t.token_type, t.token_value) for t in tokens] == [
+        (0, 0, 5, TokenType.NAME_KEYWORD, "name:"),
+        (0, 6, 12, TokenType.NAME, "Thelma"),
+        (1, 2, 7, TokenType.HELLO, "Hello"),
+        (1, 9, 15, TokenType.NAME, "Thelma"),
+    ]
+
+
+def test_scan_keyword_prefix_is_a_name():
+    tokens = greet_parser._scan("Helloo")
+
+    assert tokens[0].token_type == TokenType.NAME
+
+
+def test_parse_statements():
+    statements = greet_parser.parse_statements("name: Thelma\nGoodbye Thelma\nGoodbye L0u1se\n")
+
+    assert [type(s) for s in statements] == [NameDefinition, Greeting, UnrecognisedStatement]
+    assert statements[1].name.token_value == "Thelma"
+
+
+@pytest.mark.parametrize("greeting", [("Wotcha Thelma"), ("Goodbye L0u1se"), ("Goodbye Louise again")])
+def test_greet_parser_rejects_invalid_greeting(greeting):
+    result = greet_parser.parse(greeting)
+
+    assert len(result) == 1
+    assert result[0].message == "Greeting must be either 'Hello <name>' or 'Goodbye <name>'"
+    assert result[0].range.end.character == len(greeting)
+
+
+def test_greet_parser_accepts_valid_source():
+    assert greet_parser.parse("name: Thelma\n\nHello Thelma\nGoodbye Thelma\n") == []
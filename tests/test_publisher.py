@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from lsprotocol.types import Diagnostic, Position, Range
+
+from server.publisher import DiagnosticsPublisher
+
+
+def _diagnostic(message: str) -> Diagnostic:
+    return Diagnostic(range=Range(start=Position(line=0, character=0), end=Position(line=0, character=1)),
+                      message=message)
+
+
+@pytest.mark.asyncio
+async def test_identical_diagnostics_are_published_once():
+    sent = []
+    publisher = DiagnosticsPublisher(lambda uri, diagnostics: sent.append((uri, diagnostics)))
+
+    publisher.publish("file:///a.greet", [_diagnostic("bad")])
+    publisher.publish("file:///a.greet", [_diagnostic("bad")])
+    publisher.publish("file:///a.greet", [])
+    publisher.publish("file:///a.greet", [])
+
+    assert [diagnostics for _, diagnostics in sent] == [[_diagnostic("bad")], []]
+    assert publisher.unchanged == 2
+
+
+@pytest.mark.asyncio
+async def test_forgotten_documents_are_published_again():
+    sent = []
+    publisher = DiagnosticsPublisher(lambda uri, diagnostics: sent.append(uri))
+
+    publisher.publish("file:///a.greet", [])
+    publisher.forget("file:///a.greet")
+    publisher.publish("file:///a.greet", [])
+
+    assert len(sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_sent_in_batches():
+    sent = []
+    publisher = DiagnosticsPublisher(lambda uri, diagnostics: sent.append(uri),
+                                     burst=2, interval=0.02, batch_size=3)
+
+    for n in range(8):
+        publisher.publish(f"file:///{n}.greet", [_diagnostic(str(n))])
+    # Queued again before its batch is sent
+    publisher.publish("file:///5.greet", [_diagnostic("changed")])
+    assert sent == ["file:///0.greet", "file:///1.greet"]
+
+    await asyncio.sleep(0.03)
+    assert len(sent) == 5
+    await asyncio.sleep(0.05)
+    assert sorted(sent) == sorted(f"file:///{n}.greet" for n in range(8))
+    assert publisher.coalesced == 1
+    assert publisher.published == 8
@@ -0,0 +1,133 @@
+import asyncio
+
+from pygls.uris import from_fs_path
+from lsprotocol.types import (PROGRESS, ClientCapabilities, DiagnosticClientCapabilities,
+                              DocumentDiagnosticParams, InitializeParams, PreviousResultId,
+                              RelatedFullDocumentDiagnosticReport,
+                              RelatedUnchangedDocumentDiagnosticReport,
+                              TextDocumentClientCapabilities, TextDocumentIdentifier,
+                              WorkspaceDiagnosticParams,
+                              WorkspaceFullDocumentDiagnosticReport,
+                              WorkspaceUnchangedDocumentDiagnosticReport)
+
+from server import server
+from server.pull_diagnostics import diagnose_files, result_id
+
+
+def _pull(ls, uri: str, previous_result_id: str | None = None):
+    return asyncio.run(server.document_diagnostic(ls, DocumentDiagnosticParams(
+        text_document=TextDocumentIdentifier(uri=uri), previous_result_id=previous_result_id)))
+
+
+def test_unchanged_document_gets_unchanged_report(ls, open_document):
+    open_document(ls, "file:///a.greet", "Hello Bob\nWotcha Bob\n")
+
+    first = _pull(ls, "file:///a.greet")
+    assert isinstance(first, RelatedFullDocumentDiagnosticReport)
+    assert [d.range.start.line for d in first.items] == [1]
+
+    again = _pull(ls, "file:///a.greet", first.result_id)
+    assert isinstance(again, RelatedUnchangedDocumentDiagnosticReport)
+    assert again.result_id == first.result_id
+
+    open_document(ls, "file:///a.greet", "Hello Bob\n", version=2)
+    edited = _pull(ls, "file:///a.greet", first.result_id)
+    assert isinstance(edited, RelatedFullDocumentDiagnosticReport)
+    assert edited.items == []
+    assert edited.result_id != first.result_id
+
+
+def test_result_ids_outlive_the_server(ls, make_server, open_document):
+    open_document(ls, "file:///a.greet", "Hello Bob\nWotcha Bob\n")
+    previous_id = _pull(ls, "file:///a.greet").result_id
+
+    # After reconnecting, a client's previous results still count
+    reconnected = make_server()
+    open_document(reconnected, "file:///a.greet", "Hello Bob\nWotcha Bob\n")
+    assert isinstance(_pull(reconnected, "file:///a.greet", previous_id), RelatedUnchangedDocumentDiagnosticReport)
+
+
+def _pull_workspace(ls, previous=(), partial_result_token=None):
+    return asyncio.run(server.workspace_diagnostic(ls, WorkspaceDiagnosticParams(
+        previous_result_ids=[PreviousResultId(uri=uri, value=value) for uri, value in previous],
+        partial_result_token=partial_result_token)))
+
+
+def test_workspace_pull_reports_open_documents_as_edited(ls, open_document, tmp_path):
+    for name, text in [("a", "Hello Bob\n"), ("b", "Wotcha Bob\n"), ("c", "Hello Bob\n")]:
+        (tmp_path / f"{name}.greet").write_text(text)
+    open_uri = from_fs_path(str(tmp_path / "c.greet"))
+    open_document(ls, open_uri, "Hello Bob\nWotcha\n")
+
+    first = {report.uri: report for report in _pull_workspace(ls).items}
+    assert len(first) == 3
+    assert all(isinstance(report, WorkspaceFullDocumentDiagnosticReport) for report in first.values())
+    assert [len(first[from_fs_path(str(tmp_path / f"{name}.greet"))].items) for name in "abc"] == [0, 1, 1]
+    assert first[open_uri].version == 1
+
+    (tmp_path / "a.greet").write_text("Wotcha Bob\n")
+    second = {report.uri: report for report in _pull_workspace(
+        ls, [(uri, report.result_id) for uri, report in first.items()]).items}
+    assert [type(second[from_fs_path(str(tmp_path / f"{name}.greet"))]) for name in "abc"] == [
+        WorkspaceFullDocumentDiagnosticReport, WorkspaceUnchangedDocumentDiagnosticReport,
+        WorkspaceUnchangedDocumentDiagnosticReport]
+
+
+def test_diagnose_files_leaves_out_unreadable_and_skips_unchanged_files(tmp_path):
+    unchanged = tmp_path / "a.greet"
+    changed = tmp_path / "b.greet"
+    unchanged.write_text("Wotcha\n")
+    changed.write_text("Hello Bob\nWotcha\n")
+    previous = {str(unchanged): result_id("scanner", None, b"Wotcha\n")}
+
+    reports = diagnose_files([str(tmp_path / "missing.greet"), str(unchanged), str(changed)],
+                             previous, "scanner", None)
+
+    assert [(r.path, r.diagnostics is None) for r in reports] == [(str(unchanged), True), (str(changed), False)]
+    assert reports[0].result_id == previous[str(unchanged)]
+    assert len(reports[1].diagnostics) == 1 and reports[1].fresh is not None
+
+
+def test_workspace_pull_caches_diagnostics_of_files_on_disk(ls, tmp_path):
+    (tmp_path / "a.greet").write_text("Hello Bob\nWotcha Bob\n")
+    ls.symbol_cache_path = str(tmp_path / "cache" / "symbols.sqlite3")
+
+    [first] = _pull_workspace(ls).items
+    [second] = _pull_workspace(ls).items
+    [report] = diagnose_files([str(tmp_path / "a.greet")], {}, ls.backend.name, ls.max_diagnostics,
+                              ls.symbol_cache.path)
+    ls.symbol_cache.close()
+
+    assert len(first.items) == 1
+    assert second.items == first.items and second.result_id == first.result_id
+    assert report.fresh is None
+    assert report.diagnostics == first.items
+
+
+def test_workspace_pull_streams_partial_results(ls, tmp_path, monkeypatch):
+    for i in range(5):
+        (tmp_path / f"file{i}.greet").write_text("Hello Bob\n")
+    monkeypatch.setattr(server, "WORKSPACE_DIAGNOSTIC_CHUNK_SIZE", 2)
+    sent = []
+    monkeypatch.setattr(ls, "send_notification", lambda method, params: sent.append((method, params)))
+
+    result = _pull_workspace(ls, partial_result_token="pull")
+
+    assert result.items == []
+    assert {method for method, _ in sent} == {PROGRESS}
+    # Chunks are sent as they're done, in whatever order that is
+    assert sorted(len(params.value.items) for _, params in sent) == [1, 2, 2]
+    assert sorted(report.uri for _, params in sent for report in params.value.items) == [
+        from_fs_path(str(tmp_path / f"file{i}.greet")) for i in range(5)]
+
+
+def test_pull_diagnostics_advertised_and_not_pushed(ls, open_document):
+    # A session has the features registered on the server
+    session = server.greet_server.new_session()
+    result = session.lsp.lsp_initialize(InitializeParams(capabilities=ClientCapabilities(
+        text_document=TextDocumentClientCapabilities(diagnostic=DiagnosticClientCapabilities()))))
+    session.end_session()
+
+    assert result.capabilities.diagnostic_provider.workspace_diagnostics
+    assert server._client_pulls_diagnostics(session)
+    assert not server._client_pulls_diagnostics(ls)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from server.scheduler import DiagnosticsScheduler
+
+
+@pytest.mark.asyncio
+async def test_only_latest_version_is_parsed():
+    scheduler = DiagnosticsScheduler(debounce_interval=0.01)
+    parsed = []
+
+    for version in range(1, 6):
+        scheduler.schedule("file:///a.greet", version, lambda v=version: parsed.append(v))
+    await asyncio.sleep(0.05)
+
+    assert parsed == [5]
+    assert scheduler.skipped == 4
+    assert scheduler.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_documents_are_scheduled_independently():
+    scheduler = DiagnosticsScheduler(debounce_interval=0.01)
+    parsed = []
+
+    scheduler.schedule("file:///a.greet", 1, lambda: parsed.append("a"))
+    scheduler.schedule("file:///b.greet", 1, lambda: parsed.append("b"))
+    await asyncio.sleep(0.05)
+
+    assert sorted(parsed) == ["a", "b"]
+    assert scheduler.skipped == 0
+
+
+@pytest.mark.asyncio
+async def test_running_parse_is_cancelled_when_superseded():
+    scheduler = DiagnosticsScheduler(debounce_interval=0)
+    finished = []
+
+    async def slow_parse(version):
+        await asyncio.sleep(0.05)
+        finished.append(version)
+
+    scheduler.schedule("file:///a.greet", 1, lambda: slow_parse(1))
+    await asyncio.sleep(0.01)
+    assert not scheduler.is_current("file:///a.greet", 2)
+
+    scheduler.schedule("file:///a.greet", 2, lambda: slow_parse(2))
+    await asyncio.sleep(0.1)
+
+    assert finished == [2]
+    assert scheduler.skipped == 1
+    assert scheduler.is_current("file:///a.greet", 2)
+
+
+@pytest.mark.asyncio
+async def test_forget_cancels_pending_work():
+    scheduler = DiagnosticsScheduler(debounce_interval=0.01)
+    parsed = []
+
+    scheduler.schedule("file:///a.greet", 1, lambda: parsed.append(1))
+    scheduler.forget("file:///a.greet")
+    await asyncio.sleep(0.05)
+
+    assert parsed == []
+    assert not scheduler.is_current("file:///a.greet", 1)
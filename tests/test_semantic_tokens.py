@@ -0,0 +1,107 @@
+import asyncio
+import random
+
+from lsprotocol.types import (Position, Range, SemanticTokens, SemanticTokensDelta,
+                              SemanticTokensDeltaParams, SemanticTokensParams,
+                              SemanticTokensRangeParams, TextDocumentIdentifier)
+
+from server import server
+from server.semantic_tokens import KEYWORD, NAME, SALUTATION, diff, encode
+
+
+def _decode(data):
+    "turns encoded tokens back into absolute (line, start, length, type) tuples"
+    tokens = []
+    line = start = 0
+    for i in range(0, len(data), 5):
+        delta_line, delta_start, length, token_type, _ = data[i:i + 5]
+        if delta_line:
+            line += delta_line
+            start = delta_start
+        else:
+            start += delta_start
+        tokens.append((line, start, length, token_type))
+    return tokens
+
+
+def test_encode_greet_token_types():
+    source = "name: Thelma\n  Hello Thelma\n\nGoodbye  Louise\nHello Goodbye\n"
+
+    assert _decode(encode(source)) == [
+        (0, 0, 5, KEYWORD), (0, 6, 6, NAME),
+        (1, 2, 5, SALUTATION), (1, 8, 6, NAME),
+        (3, 0, 7, SALUTATION), (3, 9, 6, NAME),
+        (4, 0, 5, SALUTATION), (4, 6, 7, NAME),
+    ]
+
+
+def test_encode_skips_unrecognised_tokens():
+    assert _decode(encode("Hello 123 Thelma\n")) == [(0, 0, 5, SALUTATION), (0, 10, 6, NAME)]
+
+
+def test_encode_with_line_offset():
+    assert _decode(encode("Hello Thelma\n", 7)) == [(7, 0, 5, SALUTATION), (7, 6, 6, NAME)]
+
+
+def _apply(data, edits):
+    data = list(data)
+    for edit in reversed(edits):
+        data[edit.start:edit.start + edit.delete_count] = edit.data or []
+    return data
+
+
+def test_diff_reproduces_current():
+    rng = random.Random(7)
+    for _ in range(200):
+        previous = [rng.randrange(3) for _ in range(rng.randrange(20))]
+        current = list(previous)
+        for _ in range(rng.randrange(4)):
+            pos = rng.randrange(len(current) + 1)
+            if current and rng.random() < 0.5:
+                del current[pos:pos + rng.randrange(1, 4)]
+            else:
+                current[pos:pos] = [rng.randrange(3) for _ in range(rng.randrange(1, 4))]
+
+        assert _apply(previous, diff(previous, current)) == current
+
+
+def test_diff_of_identical_data_is_empty():
+    assert diff([1, 2, 3], [1, 2, 3]) == []
+
+
+URI = "file:///a.greet"
+
+
+def test_delta_from_previous_result(ls, open_document):
+    open_document(ls, URI, "name: Thelma\nHello Thelma\n")
+    full = asyncio.run(server.semantic_tokens_full(
+        ls, SemanticTokensParams(text_document=TextDocumentIdentifier(uri=URI))))
+
+    open_document(ls, URI, "name: Thelma\nHello Thelma\nGoodbye Thelma\n", 2)
+    delta = asyncio.run(server.semantic_tokens_delta(ls, SemanticTokensDeltaParams(
+        text_document=TextDocumentIdentifier(uri=URI), previous_result_id=full.result_id)))
+
+    assert isinstance(delta, SemanticTokensDelta)
+    assert delta.result_id != full.result_id
+    assert _apply(full.data, delta.edits) == encode("name: Thelma\nHello Thelma\nGoodbye Thelma\n")
+
+
+def test_delta_from_unknown_result_sends_everything(ls, open_document):
+    open_document(ls, URI, "Hello Thelma\n")
+
+    result = asyncio.run(server.semantic_tokens_delta(ls, SemanticTokensDeltaParams(
+        text_document=TextDocumentIdentifier(uri=URI), previous_result_id="stale")))
+
+    assert isinstance(result, SemanticTokens)
+    assert result.data == encode("Hello Thelma\n")
+
+
+def test_range_only_covers_requested_lines(ls, open_document):
+    open_document(ls, URI, "name: Thelma\nHello Thelma\nGoodbye Thelma\nHello Louise\n")
+
+    result = server.semantic_tokens_range(ls, SemanticTokensRangeParams(
+        text_document=TextDocumentIdentifier(uri=URI),
+        range=Range(start=Position(line=1, character=0), end=Position(line=2, character=3))))
+
+    assert _decode(result.data) == [(1, 0, 5, SALUTATION), (1, 6, 6, NAME),
+                                    (2, 0, 7, SALUTATION), (2, 8, 6, NAME)]
@@ -51,7 +51,7 @@ async def test_completions(client: LanguageClient):
         items = results
 
     labels = [item.label for item in items]
-    assert labels == ["hello", "world"]
+    assert labels == ["Hello", "Goodbye"]
 
 
 @pytest.mark.skip(reason="awaiting resolution of pytest-lsp issues")
@@ -0,0 +1,69 @@
+from lsprotocol.types import TEXT_DOCUMENT_COMPLETION, TextDocumentItem
+from pygls.workspace import Workspace
+
+from benchmarks.load_test import run_load_test
+from server.index import SessionIndex, WorkspaceIndex, scan_symbols
+from server.parse_service import ParseCache
+from server.server import greet_server
+
+
+def test_open_documents_are_only_seen_by_their_session():
+    shared = WorkspaceIndex()
+    shared.update("file:///a.greet", scan_symbols("name: Thelma\n"))
+    shared.update("file:///b.greet", scan_symbols("name: Theo\n"))
+    editing, other = SessionIndex(shared), SessionIndex(shared)
+
+    # Unsaved: a.greet now declares Louise instead, and there's a new document
+    editing.update("file:///a.greet", scan_symbols("name: Louise\nname: Theo\n"))
+    editing.update("file:///new.greet", scan_symbols("name: Thea\n"))
+
+    assert editing.definitions("Thelma") == []
+    assert sorted(loc.uri for loc in editing.definitions("Theo")) == ["file:///a.greet", "file:///b.greet"]
+    assert editing.names_with_prefix("th", 10) == (["Thea", "Theo"], False)
+    assert editing.names_with_prefix("", 2) == (["Louise", "Thea"], True)
+    assert other.names_with_prefix("th", 10) == (["Thelma", "Theo"], False)
+
+    editing.remove("file:///a.greet")
+    assert [loc.uri for loc in editing.definitions("Thelma")] == ["file:///a.greet"]
+
+
+def test_parse_cache_evicts_least_recently_used():
+    cache = ParseCache(size=2, characters=10)
+    cache.put("backend", "a", None, [])
+    cache.put("backend", "b", None, [])
+    cache.get("backend", "a", None)
+    cache.put("backend", "c", None, [])
+
+    assert cache.get("backend", "b", None) is None
+    assert cache.get("backend", "a", None) == []
+    assert cache.get("other", "a", None) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    cache.put("backend", "0123456789", None, [])
+    assert len(cache) == 1
+
+
+def test_sessions_share_the_index_and_caches_but_not_documents():
+    first, second = greet_server.new_session(), greet_server.new_session()
+    for session in (first, second):
+        session.lsp.workspace = Workspace("file:///tmp")
+
+    first.workspace.put_document(TextDocumentItem(uri="file:///a.greet", language_id="greet",
+                                                  version=1, text="Hello"))
+
+    assert TEXT_DOCUMENT_COMPLETION in second.lsp.fm.features
+    assert "file:///a.greet" not in second.workspace.documents
+    assert first.index.shared is second.index.shared is greet_server.index.shared
+    assert first.parse_cache is second.parse_cache is greet_server.parse_cache
+    assert greet_server.sessions == {first, second}
+
+    first.end_session()
+    assert greet_server.sessions == {second}
+    second.end_session()
+
+
+def test_many_clients_over_tcp():
+    result = run_load_test(clients=4, rounds=5, files=5, lines=50)
+
+    assert result.problems == []
+    assert len(result.latencies["completion"]) >= 4 * 6
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.startup import DEFERRED_MODULES, ROOT, import_times
+
+# Imports the server and answers initialize
+_INITIALIZE = """
+import sys
+from lsprotocol.types import ClientCapabilities, InitializeParams
+from server.server import greet_server
+greet_server.lsp.lsp_initialize(InitializeParams(capabilities=ClientCapabilities()))
+print(sorted(sys.modules))
+"""
+
+
+def _modules_after(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+                          capture_output=True, text=True, check=True).stdout
+
+
+# How long startup takes is measured against budgets by benchmarks/startup.py;
+# the times vary too much between machines and runs to test here
+
+
+def test_optional_modules_deferred_at_startup():
+    times = import_times()
+
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+
+
+def test_optional_modules_deferred_until_needed_after_initialize():
+    modules = _modules_after(_INITIALIZE)
+
+    assert [module for module in DEFERRED_MODULES if f"'{module}'" in modules] == []
+
+
+def test_worker_processes_dont_import_the_server():
+    # Spawned workers import the entry point module afresh
+    modules = _modules_after("import sys, server.__main__; print(sorted(sys.modules))")
+
+    assert "'pygls.server'" not in modules
+    assert "'server.server'" not in modules
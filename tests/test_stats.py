@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from server.server import GreetLanguageServer
+from server.stats import Histogram, ServerStats, received_at, received_bytes
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("1", 2), ("10", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 56.5
+
+
+def test_wrapped_handlers_are_counted_and_stay_sync_or_async():
+    stats = ServerStats()
+
+    def sync_handler(ls, params):
+        return params
+
+    async def async_handler(ls, params):
+        raise ValueError(params)
+
+    wrapped_sync = stats.wrap("sync", sync_handler)
+    wrapped_async = stats.wrap("async", async_handler)
+    assert not asyncio.iscoroutinefunction(wrapped_sync)
+    assert asyncio.iscoroutinefunction(wrapped_async)
+
+    assert wrapped_sync(None, 1) == 1
+    with pytest.raises(ValueError):
+        asyncio.run(wrapped_async(None, 2))
+
+    assert (stats.methods["sync"].calls, stats.methods["sync"].errors) == (1, 0)
+    assert (stats.methods["async"].calls, stats.methods["async"].errors) == (1, 1)
+    assert stats.methods["async"].latency.count == 1
+
+
+def test_queue_wait_and_size_come_from_the_message():
+    stats = ServerStats()
+    handler = stats.wrap("method", lambda ls, params: None)
+
+    arrived = received_at.set(0.0)
+    size = received_bytes.set(123)
+    try:
+        handler(None, None)
+    finally:
+        received_at.reset(arrived)
+        received_bytes.reset(size)
+
+    method = stats.methods["method"]
+    assert method.queue_wait.count == 1
+    assert method.queue_wait.sum > 0
+    assert method.received.sum == 123
+
+
+def test_prometheus_text():
+    stats = ServerStats()
+    stats.wrap("textDocument/didChange", lambda ls, params: None)(None, None)
+    stats.record_sent("textDocument/publishDiagnostics", 100)
+
+    text = stats.prometheus()
+
+    assert 'greet_lsp_calls_total{method="textDocument/didChange"} 1' in text
+    assert 'greet_lsp_handler_seconds_count{method="textDocument/didChange"} 1' in text
+    assert 'greet_lsp_sent_bytes_bucket{method="textDocument/publishDiagnostics",le="256"} 1' in text
+
+
+class _Transport:
+    def __init__(self):
+        self.written = b""
+
+    def write(self, data):
+        self.written += data
+
+
+def test_server_records_requests_and_responses():
+    ls = GreetLanguageServer("test", "v0")
+
+    @ls.command("echo")
+    def echo(ls, args):
+        return args
+
+    ls.enable_stats()
+    ls.lsp.connection_made(_Transport())
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "workspace/executeCommand",
+                       "params": {"command": "echo", "arguments": ["hi"]}}).encode()
+    ls.lsp.data_received(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+
+    assert b'"result": ["hi"]' in ls.lsp.transport.written
+    method = ls.stats.methods["workspace/executeCommand/echo"]
+    assert method.calls == 1
+    assert method.received.sum == len(body)
+    assert method.sent.sum == len(ls.lsp.transport.written)
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from server import symbol_cache
+from server.backends import ScannerBackend, get_backend
+from server.index import WorkspaceIndex, scan_symbols
+from server.indexing import index_files, scan_files
+from server.symbol_cache import SymbolCache, content_hash
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SymbolCache(str(tmp_path / "cache" / "symbols.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_round_trip(cache):
+    symbols = scan_symbols("name: Thelma\nHello Thelma\n")
+    digest = content_hash(b"name: Thelma\nHello Thelma\n")
+
+    cache.put_many([(digest, symbols)])
+
+    assert cache.get_many([digest, content_hash(b"other")]) == {digest: symbols}
+
+
+def test_other_grammar_versions_are_dropped(cache, monkeypatch):
+    digest = content_hash(b"name: Thelma\n")
+    cache.put_many([(digest, scan_symbols("name: Thelma\n"))])
+    cache.close()
+
+    monkeypatch.setattr(symbol_cache, "GRAMMAR_VERSION", symbol_cache.GRAMMAR_VERSION + 1)
+    reopened = SymbolCache(cache.path)
+
+    assert reopened.get_many([digest]) == {}
+    assert len(reopened) == 0
+    reopened.close()
+
+
+def test_diagnostics_round_trip(cache):
+    digest = content_hash(b"Wotcha\n")
+    diagnostics = [{"range": {"start": {"line": 0, "character": 0}, "end": {"line": 0, "character": 6}},
+                    "message": "Unknown salutation"}]
+
+    scanner = get_backend("scanner")
+
+    cache.put_diagnostics([(digest, diagnostics)], scanner, None)
+
+    assert cache.get_diagnostics([digest], scanner, None) == {digest: diagnostics}
+    assert cache.get_diagnostics([digest], scanner, 10) == {}
+    assert cache.get_diagnostics([digest], get_backend("lark"), None) == {}
+    assert symbol_cache.read_diagnostics(cache.path, [digest], scanner, 0) == {digest: diagnostics}
+    assert symbol_cache.read_diagnostics(cache.path + ".missing", [digest], scanner, None) == {}
+
+
+def test_other_backend_versions_are_dropped(cache, monkeypatch):
+    digest = content_hash(b"Wotcha\n")
+    scanner, regex = get_backend("scanner"), get_backend("regex")
+    cache.put_diagnostics([(digest, [])], scanner, None)
+    cache.put_diagnostics([(digest, [])], regex, None)
+    cache.close()
+
+    monkeypatch.setattr(ScannerBackend, "version", ScannerBackend.version + 1)
+    reopened = SymbolCache(cache.path)
+    assert reopened.get_diagnostics([digest], scanner, None) == {}
+    monkeypatch.undo()
+
+    # Gone for good, not just hidden; the other backend's are kept
+    assert reopened.get_diagnostics([digest], scanner, None) == {}
+    assert reopened.get_diagnostics([digest], regex, None) == {digest: []}
+    reopened.close()
+
+
+def test_unchanged_files_come_from_cache(cache, tmp_path):
+    unchanged = tmp_path / "a.greet"
+    changed = tmp_path / "b.greet"
+    unchanged.write_text("name: Thelma\n")
+    changed.write_text("name: Louise\n")
+    paths = [str(unchanged), str(changed)]
+
+    index = WorkspaceIndex()
+    with ThreadPoolExecutor() as executor:
+        asyncio.run(index_files(index, paths, executor, lambda done, total: None, cache=cache))
+    assert len(cache) == 2
+
+    changed.write_text("name: Louise\nname: Bob\n")
+    results = {r.path: r for r in scan_files(paths, cache.path)}
+
+    assert not results[str(unchanged)].fresh
+    assert results[str(unchanged)].symbols == scan_symbols("name: Thelma\n")
+    assert results[str(changed)].fresh
+    assert results[str(changed)].symbols == scan_symbols("name: Louise\nname: Bob\n")
+
+
+def test_scan_files_without_cache_file(tmp_path):
+    path = tmp_path / "a.greet"
+    path.write_text("name: Thelma\n")
+
+    [result] = scan_files([str(path)], str(tmp_path / "missing.sqlite3"))
+
+    assert result.fresh
+    assert result.symbols.declarations == [("Thelma", 0, 6, 12)]
@@ -0,0 +1,201 @@
+import glob
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+from pygls.workspace import Document
+from lsprotocol.types import (Position, Range,
+                              TextDocumentContentChangeEvent_Type1,
+                              TextDocumentContentChangeEvent_Type2)
+
+tree_sitter_parser = pytest.importorskip("server.tree_sitter_parser")
+from server.tree_sitter_parser import Parser, TreeSitterDocument
+
+
+SOURCE = """name: Thelma
+Hello Thelma
+Goodbye Louise
+
+name: Louise
+"""
+
+EDIT_TEXTS = ["", "x", "1", " ", "Hello ", "Goodbye", "\n", "name: ", "Hello Bob\n", "é", "name: Fred\nHello Fred"]
+
+
+def _corpus_cases():
+    "the (name, input, expected tree) of each case in the grammar's tree-sitter corpus"
+    header = re.compile(r"^=+\n(.*?)\n=+\n", re.MULTILINE)
+    for path in sorted(glob.glob(os.path.join(tree_sitter_parser.GRAMMAR_DIR, "test", "corpus", "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            parts = header.split(f.read())[1:]
+        for name, body in zip(parts[::2], parts[1::2]):
+            source, expected = re.split(r"^-{3,}\n", body, maxsplit=1, flags=re.MULTILINE)
+            yield pytest.param(source.strip("\n") + "\n", " ".join(expected.split()), id=name)
+
+
+# Enough of tree-sitter's dsl.js to evaluate grammar.js, which only uses these, to grammar.json
+_DSL = """
+const norm = v => typeof v === 'string' ? {type: 'STRING', value: v}
+  : v instanceof RegExp ? {type: 'PATTERN', value: v.source} : v;
+global.seq = (...m) => ({type: 'SEQ', members: m.map(norm)});
+global.choice = (...m) => ({type: 'CHOICE', members: m.map(norm)});
+global.repeat = c => ({type: 'REPEAT', content: norm(c)});
+global.field = (name, c) => ({type: 'FIELD', name, content: norm(c)});
+global.grammar = g => {
+  const $ = new Proxy({}, {get: (_, name) => ({type: 'SYMBOL', name})});
+  const rules = {};
+  for (const [k, f] of Object.entries(g.rules)) rules[k] = norm(f($));
+  return {name: g.name, rules, extras: [{type: 'PATTERN', value: '\\\\s'}],
+          conflicts: [], precedences: [], externals: [], inline: [], supertypes: []};
+};
+console.log(JSON.stringify(require(process.argv[1])));
+"""
+
+
+def _generated(name: str):
+    with open(os.path.join(tree_sitter_parser.GRAMMAR_DIR, "src", name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def language(tmp_path_factory):
+    "the grammar compiled from src/parser.c as it is now, not a library built from an older one"
+    return tree_sitter_parser.load_language(str(tmp_path_factory.mktemp("greet") / "greet.so"))
+
+
+def _random_position(rng: random.Random, doc: Document) -> Position:
+    lines = doc.lines
+    if not lines or rng.random() < 0.1:
+        return Position(line=len(lines), character=0)
+    line = rng.randrange(len(lines))
+    return Position(line=line, character=rng.randrange(len(lines[line].rstrip("\n")) + 1))
+
+
+def test_valid_source_has_no_diagnostics():
+    assert tree_sitter_parser.parse(SOURCE) == []
+
+
+def test_errors_are_reported():
+    diagnostics = tree_sitter_parser.parse("name: Thelma\nHello 123\nGoodbye Thelma\nname:\n")
+
+    assert [(d.range.start.line, d.range.start.character, d.message) for d in diagnostics] == [
+        (1, 0, "Greeting must be either 'Hello <name>' or 'Goodbye <name>'"),
+        (3, 5, "Syntax error: missing name"),
+    ]
+
+
+@pytest.mark.parametrize("source, expected", list(_corpus_cases()))
+def test_corpus(language, source, expected):
+    # The cases `tree-sitter test` runs, for when the CLI isn't installed
+    parser = Parser()
+    parser.set_language(language)
+    tree = parser.parse(source.encode("utf-8"))
+
+    assert tree.root_node.sexp() == expected
+
+
+def test_grammar_json_is_grammar_js():
+    # src/ is written by `tree-sitter generate`, which needs the CLI; this at least
+    # checks its first step, which evaluates grammar.js with node
+    if shutil.which("node") is None:
+        pytest.skip("node isn't installed")
+    result = subprocess.run(["node", "-e", _DSL, os.path.join(tree_sitter_parser.GRAMMAR_DIR, "grammar.js")],
+                            capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout) == _generated("grammar.json")
+
+
+def _node_types(rules, rule):
+    "the (type, named) of the nodes rule can produce where it's used, looking through hidden rules"
+    if rule["type"] == "SYMBOL":
+        if rule["name"].startswith("_"):
+            return _node_types(rules, rules[rule["name"]])
+        return {(rule["name"], True)}
+    if rule["type"] == "STRING":
+        return {(rule["value"], False)}
+    return set().union(*(_node_types(rules, member) for member in rule.get("members", [rule.get("content")])))
+
+
+def _fields(rule):
+    "each field in rule, with the rule it names"
+    if rule["type"] == "FIELD":
+        return {rule["name"]: rule["content"]}
+    fields = {}
+    for member in rule.get("members", [rule["content"]] if "content" in rule else []):
+        fields.update(_fields(member))
+    return fields
+
+
+def test_generated_tables_agree_with_grammar(language):
+    rules = _generated("grammar.json")["rules"]
+    named = {name for name in rules if not name.startswith("_")}
+    fields = {name: {field: sorted(_node_types(rules, content))
+                     for field, content in _fields(rules[name]).items()}
+              for name in named}
+    node_types = {entry["type"]: entry for entry in _generated("node-types.json")}
+
+    assert set(node_types) == named
+    assert {name: {field: sorted((t["type"], t["named"]) for t in info["types"])
+                   for field, info in node_types[name].get("fields", {}).items()}
+            for name in named} == fields
+    visible = {language.node_kind_for_id(i) for i in range(language.node_kind_count)
+               if language.node_kind_is_visible(i) and language.node_kind_is_named(i)}
+    assert visible - {"ERROR"} == named
+    assert {language.field_name_for_id(i) for i in range(1, language.field_count + 1)} == {
+        field for name in named for field in fields[name]}
+
+
+def test_name_declarations_in_tree():
+    tree = TreeSitterDocument("name: Thelma\nHello Thelma\n").parse()
+
+    declaration, greeting = tree.root_node.children
+    assert declaration.type == "name_declaration"
+    assert declaration.child_by_field_name("name").text == b"Thelma"
+    assert greeting.type == "greeting"
+
+
+def test_edit_reparses_incrementally():
+    doc = TreeSitterDocument(SOURCE)
+    first = doc.parse()
+
+    doc.apply_change(TextDocumentContentChangeEvent_Type1(
+        range=Range(start=Position(line=1, character=6), end=Position(line=1, character=12)),
+        text="123"))
+    tree = doc.parse()
+
+    assert tree is not first
+    assert [r.start_point[0] for r in first.changed_ranges(tree)] == [1]
+    assert len(doc.diagnostics()) == 1
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_edits_match_full_parse(seed):
+    rng = random.Random(seed)
+    doc = Document("file:///test.greet", SOURCE)
+    ts_doc = TreeSitterDocument(SOURCE)
+
+    for _ in range(50):
+        start = _random_position(rng, doc)
+        end = _random_position(rng, doc)
+        if (end.line, end.character) < (start.line, start.character):
+            start, end = end, start
+        change = TextDocumentContentChangeEvent_Type1(range=Range(start=start, end=end),
+                                                      text=rng.choice(EDIT_TEXTS))
+        doc.apply_change(change)
+        ts_doc.apply_change(change)
+
+        assert ts_doc.source == doc.source.encode("utf-8")
+        assert ts_doc.parse().root_node.sexp() == TreeSitterDocument(doc.source).parse().root_node.sexp()
+        assert ts_doc.diagnostics() == tree_sitter_parser.parse(doc.source)
+
+
+def test_full_change_replaces_document():
+    doc = TreeSitterDocument(SOURCE)
+
+    doc.apply_change(TextDocumentContentChangeEvent_Type2(text="Hello 123\n"))
+
+    assert len(doc.diagnostics()) == 1
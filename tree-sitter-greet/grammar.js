@@ -4,8 +4,17 @@ module.exports = grammar({
   name: 'greet',
 
   rules: {
-    // TODO: add the actual grammar rules
-    source_file: $ => repeat($.greeting),
+    source_file: $ => repeat($._statement),
+
+    _statement: $ => choice(
+      $.name_declaration,
+      $.greeting
+    ),
+
+    name_declaration: $ => seq(
+      field('keyword', $.name_keyword),
+      field('name', $.name)
+    ),
 
     greeting: $ => seq(
       field('salutation', $._salutation),
@@ -17,10 +26,11 @@ module.exports = grammar({
       $.goodbye
     ),
 
+    name_keyword: $ => 'name:',
+
     hello: $ => /[Hh]ello/,
     goodbye: $ => /[Gg]oodbye/,
     
     name: $ => /[A-Za-z]+/
   }
 });
-
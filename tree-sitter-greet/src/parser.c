@@ -6,32 +6,38 @@
 #endif
 
 #define LANGUAGE_VERSION 14
-#define STATE_COUNT 7
+#define STATE_COUNT 9
 #define LARGE_STATE_COUNT 4
-#define SYMBOL_COUNT 8
+#define SYMBOL_COUNT 11
 #define ALIAS_COUNT 0
-#define TOKEN_COUNT 4
+#define TOKEN_COUNT 5
 #define EXTERNAL_TOKEN_COUNT 0
-#define FIELD_COUNT 2
+#define FIELD_COUNT 3
 #define MAX_ALIAS_SEQUENCE_LENGTH 2
-#define PRODUCTION_ID_COUNT 2
+#define PRODUCTION_ID_COUNT 3
 
 enum {
-  sym_hello = 1,
-  sym_goodbye = 2,
-  sym_name = 3,
-  sym_source_file = 4,
-  sym_greeting = 5,
-  sym__salutation = 6,
-  aux_sym_source_file_repeat1 = 7,
+  sym_name_keyword = 1,
+  sym_hello = 2,
+  sym_goodbye = 3,
+  sym_name = 4,
+  sym_source_file = 5,
+  sym__statement = 6,
+  sym_name_declaration = 7,
+  sym_greeting = 8,
+  sym__salutation = 9,
+  aux_sym_source_file_repeat1 = 10,
 };
 
 static const char * const ts_symbol_names[] = {
   [ts_builtin_sym_end] = "end",
+  [sym_name_keyword] = "name_keyword",
   [sym_hello] = "hello",
   [sym_goodbye] = "goodbye",
   [sym_name] = "name",
   [sym_source_file] = "source_file",
+  [sym__statement] = "_statement",
+  [sym_name_declaration] = "name_declaration",
   [sym_greeting] = "greeting",
   [sym__salutation] = "_salutation",
   [aux_sym_source_file_repeat1] = "source_file_repeat1",
@@ -39,10 +45,13 @@ static const char * const ts_symbol_names[] = {
 
 static const TSSymbol ts_symbol_map[] = {
   [ts_builtin_sym_end] = ts_builtin_sym_end,
+  [sym_name_keyword] = sym_name_keyword,
   [sym_hello] = sym_hello,
   [sym_goodbye] = sym_goodbye,
   [sym_name] = sym_name,
   [sym_source_file] = sym_source_file,
+  [sym__statement] = sym__statement,
+  [sym_name_declaration] = sym_name_declaration,
   [sym_greeting] = sym_greeting,
   [sym__salutation] = sym__salutation,
   [aux_sym_source_file_repeat1] = aux_sym_source_file_repeat1,
@@ -53,6 +62,10 @@ static const TSSymbolMetadata ts_symbol_metadata[] = {
     .visible = false,
     .named = true,
   },
+  [sym_name_keyword] = {
+    .visible = true,
+    .named = true,
+  },
   [sym_hello] = {
     .visible = true,
     .named = true,
@@ -69,6 +82,14 @@ static const TSSymbolMetadata ts_symbol_metadata[] = {
     .visible = true,
     .named = true,
   },
+  [sym__statement] = {
+    .visible = false,
+    .named = true,
+  },
+  [sym_name_declaration] = {
+    .visible = true,
+    .named = true,
+  },
   [sym_greeting] = {
     .visible = true,
     .named = true,
@@ -84,22 +105,28 @@ static const TSSymbolMetadata ts_symbol_metadata[] = {
 };
 
 enum {
-  field_name = 1,
-  field_salutation = 2,
+  field_keyword = 1,
+  field_name = 2,
+  field_salutation = 3,
 };
 
 static const char * const ts_field_names[] = {
   [0] = NULL,
+  [field_keyword] = "keyword",
   [field_name] = "name",
   [field_salutation] = "salutation",
 };
 
 static const TSFieldMapSlice ts_field_map_slices[PRODUCTION_ID_COUNT] = {
   [1] = {.index = 0, .length = 2},
+  [2] = {.index = 2, .length = 2},
 };
 
 static const TSFieldMapEntry ts_field_map_entries[] = {
   [0] =
+    {field_keyword, 0},
+    {field_name, 1},
+  [2] =
     {field_name, 1},
     {field_salutation, 0},
 };
@@ -120,6 +147,8 @@ static const TSStateId ts_primary_state_ids[STATE_COUNT] = {
   [4] = 4,
   [5] = 5,
   [6] = 6,
+  [7] = 7,
+  [8] = 8,
 };
 
 static bool ts_lex(TSLexer *lexer, TSStateId state) {
@@ -127,67 +156,83 @@ static bool ts_lex(TSLexer *lexer, TSStateId state) {
   eof = lexer->eof(lexer);
   switch (state) {
     case 0:
-      if (eof) ADVANCE(12);
+      if (eof) ADVANCE(16);
       if (lookahead == 'G' ||
-          lookahead == 'g') ADVANCE(9);
+          lookahead == 'g') ADVANCE(13);
       if (lookahead == 'H' ||
-          lookahead == 'h') ADVANCE(3);
+          lookahead == 'h') ADVANCE(5);
+      if (lookahead == 'n') ADVANCE(2);
       if (lookahead == '\t' ||
           lookahead == '\n' ||
           lookahead == '\r' ||
           lookahead == ' ') SKIP(0)
       END_STATE();
     case 1:
-      if (lookahead == 'b') ADVANCE(10);
+      if (lookahead == ':') ADVANCE(17);
       END_STATE();
     case 2:
-      if (lookahead == 'd') ADVANCE(1);
+      if (lookahead == 'a') ADVANCE(10);
       END_STATE();
     case 3:
-      if (lookahead == 'e') ADVANCE(5);
+      if (lookahead == 'b') ADVANCE(14);
       END_STATE();
     case 4:
-      if (lookahead == 'e') ADVANCE(14);
+      if (lookahead == 'd') ADVANCE(3);
       END_STATE();
     case 5:
-      if (lookahead == 'l') ADVANCE(6);
+      if (lookahead == 'e') ADVANCE(8);
       END_STATE();
     case 6:
-      if (lookahead == 'l') ADVANCE(8);
+      if (lookahead == 'e') ADVANCE(19);
       END_STATE();
     case 7:
-      if (lookahead == 'o') ADVANCE(2);
+      if (lookahead == 'e') ADVANCE(1);
       END_STATE();
     case 8:
-      if (lookahead == 'o') ADVANCE(13);
+      if (lookahead == 'l') ADVANCE(9);
       END_STATE();
     case 9:
-      if (lookahead == 'o') ADVANCE(7);
+      if (lookahead == 'l') ADVANCE(12);
       END_STATE();
     case 10:
-      if (lookahead == 'y') ADVANCE(4);
+      if (lookahead == 'm') ADVANCE(7);
       END_STATE();
     case 11:
+      if (lookahead == 'o') ADVANCE(4);
+      END_STATE();
+    case 12:
+      if (lookahead == 'o') ADVANCE(18);
+      END_STATE();
+    case 13:
+      if (lookahead == 'o') ADVANCE(11);
+      END_STATE();
+    case 14:
+      if (lookahead == 'y') ADVANCE(6);
+      END_STATE();
+    case 15:
       if (lookahead == '\t' ||
           lookahead == '\n' ||
           lookahead == '\r' ||
-          lookahead == ' ') SKIP(11)
+          lookahead == ' ') SKIP(15)
       if (('A' <= lookahead && lookahead <= 'Z') ||
-          ('a' <= lookahead && lookahead <= 'z')) ADVANCE(15);
+          ('a' <= lookahead && lookahead <= 'z')) ADVANCE(20);
       END_STATE();
-    case 12:
+    case 16:
       ACCEPT_TOKEN(ts_builtin_sym_end);
       END_STATE();
-    case 13:
+    case 17:
+      ACCEPT_TOKEN(sym_name_keyword);
+      END_STATE();
+    case 18:
       ACCEPT_TOKEN(sym_hello);
       END_STATE();
-    case 14:
+    case 19:
       ACCEPT_TOKEN(sym_goodbye);
       END_STATE();
-    case 15:
+    case 20:
       ACCEPT_TOKEN(sym_name);
       if (('A' <= lookahead && lookahead <= 'Z') ||
-          ('a' <= lookahead && lookahead <= 'z')) ADVANCE(15);
+          ('a' <= lookahead && lookahead <= 'z')) ADVANCE(20);
       END_STATE();
     default:
       return false;
@@ -201,73 +246,101 @@ static const TSLexMode ts_lex_modes[STATE_COUNT] = {
   [3] = {.lex_state = 0},
   [4] = {.lex_state = 0},
   [5] = {.lex_state = 0},
-  [6] = {.lex_state = 11},
+  [6] = {.lex_state = 0},
+  [7] = {.lex_state = 15},
+  [8] = {.lex_state = 15},
 };
 
 static const uint16_t ts_parse_table[LARGE_STATE_COUNT][SYMBOL_COUNT] = {
   [0] = {
     [ts_builtin_sym_end] = ACTIONS(1),
+    [sym_name_keyword] = ACTIONS(1),
     [sym_hello] = ACTIONS(1),
     [sym_goodbye] = ACTIONS(1),
   },
   [1] = {
-    [sym_source_file] = STATE(5),
+    [sym_source_file] = STATE(6),
+    [sym__statement] = STATE(2),
+    [sym_name_declaration] = STATE(2),
     [sym_greeting] = STATE(2),
-    [sym__salutation] = STATE(6),
+    [sym__salutation] = STATE(7),
     [aux_sym_source_file_repeat1] = STATE(2),
     [ts_builtin_sym_end] = ACTIONS(3),
-    [sym_hello] = ACTIONS(5),
-    [sym_goodbye] = ACTIONS(5),
+    [sym_name_keyword] = ACTIONS(5),
+    [sym_hello] = ACTIONS(7),
+    [sym_goodbye] = ACTIONS(7),
   },
   [2] = {
+    [sym__statement] = STATE(3),
+    [sym_name_declaration] = STATE(3),
     [sym_greeting] = STATE(3),
-    [sym__salutation] = STATE(6),
+    [sym__salutation] = STATE(7),
     [aux_sym_source_file_repeat1] = STATE(3),
-    [ts_builtin_sym_end] = ACTIONS(7),
-    [sym_hello] = ACTIONS(5),
-    [sym_goodbye] = ACTIONS(5),
+    [ts_builtin_sym_end] = ACTIONS(9),
+    [sym_name_keyword] = ACTIONS(5),
+    [sym_hello] = ACTIONS(7),
+    [sym_goodbye] = ACTIONS(7),
   },
   [3] = {
+    [sym__statement] = STATE(3),
+    [sym_name_declaration] = STATE(3),
     [sym_greeting] = STATE(3),
-    [sym__salutation] = STATE(6),
+    [sym__salutation] = STATE(7),
     [aux_sym_source_file_repeat1] = STATE(3),
-    [ts_builtin_sym_end] = ACTIONS(9),
-    [sym_hello] = ACTIONS(11),
-    [sym_goodbye] = ACTIONS(11),
+    [ts_builtin_sym_end] = ACTIONS(11),
+    [sym_name_keyword] = ACTIONS(13),
+    [sym_hello] = ACTIONS(16),
+    [sym_goodbye] = ACTIONS(16),
   },
 };
 
 static const uint16_t ts_small_parse_table[] = {
   [0] = 1,
-    ACTIONS(14), 3,
+    ACTIONS(19), 4,
       ts_builtin_sym_end,
+      sym_name_keyword,
       sym_hello,
       sym_goodbye,
-  [6] = 1,
-    ACTIONS(16), 1,
+  [7] = 1,
+    ACTIONS(21), 4,
       ts_builtin_sym_end,
-  [10] = 1,
-    ACTIONS(18), 1,
+      sym_name_keyword,
+      sym_hello,
+      sym_goodbye,
+  [14] = 1,
+    ACTIONS(23), 1,
+      ts_builtin_sym_end,
+  [18] = 1,
+    ACTIONS(25), 1,
+      sym_name,
+  [22] = 1,
+    ACTIONS(27), 1,
       sym_name,
 };
 
 static const uint32_t ts_small_parse_table_map[] = {
   [SMALL_STATE(4)] = 0,
-  [SMALL_STATE(5)] = 6,
-  [SMALL_STATE(6)] = 10,
+  [SMALL_STATE(5)] = 7,
+  [SMALL_STATE(6)] = 14,
+  [SMALL_STATE(7)] = 18,
+  [SMALL_STATE(8)] = 22,
 };
 
 static const TSParseActionEntry ts_parse_actions[] = {
   [0] = {.entry = {.count = 0, .reusable = false}},
   [1] = {.entry = {.count = 1, .reusable = false}}, RECOVER(),
   [3] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_source_file, 0),
-  [5] = {.entry = {.count = 1, .reusable = true}}, SHIFT(6),
-  [7] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_source_file, 1),
-  [9] = {.entry = {.count = 1, .reusable = true}}, REDUCE(aux_sym_source_file_repeat1, 2),
-  [11] = {.entry = {.count = 2, .reusable = true}}, REDUCE(aux_sym_source_file_repeat1, 2), SHIFT_REPEAT(6),
-  [14] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_greeting, 2, .production_id = 1),
-  [16] = {.entry = {.count = 1, .reusable = true}},  ACCEPT_INPUT(),
-  [18] = {.entry = {.count = 1, .reusable = true}}, SHIFT(4),
+  [5] = {.entry = {.count = 1, .reusable = true}}, SHIFT(8),
+  [7] = {.entry = {.count = 1, .reusable = true}}, SHIFT(7),
+  [9] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_source_file, 1),
+  [11] = {.entry = {.count = 1, .reusable = true}}, REDUCE(aux_sym_source_file_repeat1, 2),
+  [13] = {.entry = {.count = 2, .reusable = true}}, REDUCE(aux_sym_source_file_repeat1, 2), SHIFT_REPEAT(8),
+  [16] = {.entry = {.count = 2, .reusable = true}}, REDUCE(aux_sym_source_file_repeat1, 2), SHIFT_REPEAT(7),
+  [19] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_greeting, 2, .production_id = 2),
+  [21] = {.entry = {.count = 1, .reusable = true}}, REDUCE(sym_name_declaration, 2, .production_id = 1),
+  [23] = {.entry = {.count = 1, .reusable = true}},  ACCEPT_INPUT(),
+  [25] = {.entry = {.count = 1, .reusable = true}}, SHIFT(4),
+  [27] = {.entry = {.count = 1, .reusable = true}}, SHIFT(5),
 };
 
 #ifdef __cplusplus